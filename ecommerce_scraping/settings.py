@@ -124,3 +124,143 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Scrapers
+# Shared keep-alive HTTP client used by every scraper (product_hunt/scrapers/http_client.py)
+SCRAPER_HTTP = {
+    'POOL_CONNECTIONS': 10,
+    'POOL_MAXSIZE': 20,
+    'CONNECT_TIMEOUT': 5,
+    'READ_TIMEOUT': 10,
+    'MAX_RETRIES': 2,
+}
+
+# Per-host politeness limits (token bucket: RATE requests/second, BURST back-to-back requests),
+# shared by every scraper thread in the process (product_hunt/scrapers/rate_limiter.py). Retries
+# take tokens too. The buckets live in memory, so each process has its own budget: web workers,
+# crawl_keywords and refresh_scheduler running together send up to RATE x processes requests per
+# second to a host. Divide RATE by the number of scraping processes when running several.
+SCRAPER_RATE_LIMITS = {
+    'default': {'RATE': 1.0, 'BURST': 2},
+    'www.amazon.com': {'RATE': 0.5, 'BURST': 2},
+    'www.ebay.com': {'RATE': 1.0, 'BURST': 3},
+    'www.newegg.com': {'RATE': 1.0, 'BURST': 3},
+}
+
+# 'async' crawls sites and pagination concurrently on an event loop (product_hunt/scrapers/async_engine.py);
+# 'threaded' runs one thread per site and is also the fallback when aiohttp is not installed.
+SCRAPER_ENGINE = 'async'
+SCRAPER_ASYNC = {
+    'PER_HOST_CONCURRENCY': 4,
+    'TOTAL_CONCURRENCY': 64,
+    'KEYWORD_CONCURRENCY': 32,
+    'PREFETCH_PAGES': True,
+}
+
+# HTML parser backend used by the scrapers: 'lxml' (native lxml tree), 'bs4-lxml', 'html.parser'
+# or 'selectolax' (requires the optional selectolax package). See product_hunt/scrapers/parsers.py
+# and `python manage.py compare_parsers`.
+SCRAPER_PARSER = 'lxml'
+
+# Parse only the containers each site spec declares as regions (result items, pagination) and skip
+# the scripts, navigation and ads around them. Set to False to build the full DOM of every page.
+SCRAPER_PARTIAL_PARSE = True
+
+# On-disk cache of fetched search pages (product_hunt/scrapers/page_cache.py). Pages younger than
+# TTL_SECONDS are not refetched; REPLAY serves only cached pages, e.g. to re-extract after a
+# selector change without touching the marketplaces. zstd needs the optional zstandard package.
+SCRAPER_PAGE_CACHE = {
+    'ENABLED': True,
+    'DIRECTORY': BASE_DIR / '.page_cache',
+    'TTL_SECONDS': 600,
+    'MAX_BYTES': 256 * 1024 * 1024,
+    'COMPRESSION': 'zstd',
+    'SKIP_UNCHANGED_PARSE': True,
+    'REPLAY': False,
+}
+
+# Pages can be parsed in a shared pool of worker processes (product_hunt/scrapers/parse_pool.py) so
+# extraction uses every core instead of being serialized by the GIL; fetching stays in threads and
+# coroutines. It is off unless enabled here or with crawl_keywords/refresh_scheduler --parse-workers N, so
+# web workers do not each start a pool; `benchmark_parsing --workers 0 N` shows whether it pays off on
+# a machine. WORKERS defaults to the CPU count; the pool is not used with fewer than two workers.
+SCRAPER_PARSE_POOL = {
+    'ENABLED': False,
+    'WORKERS': None,
+    'START_METHOD': None,
+    'MAX_TASKS_PER_CHILD': None,
+}
+
+# Rows per INSERT when storing scraped products (product_hunt/ingestion.py)
+INGEST_BATCH_SIZE = 500
+
+# Background scrape jobs (product_hunt/jobs.py): crawls running at the same time per process, and how
+# long a job may stay queued or running before it is presumed lost with its process and failed.
+SCRAPE_JOB_WORKERS = 4
+SCRAPE_JOB_TIMEOUT_SECONDS = 15 * 60
+
+# Concurrent crawls of the same keyword are coalesced (product_hunt/singleflight.py); a process
+# not renewing its crawl lease for this long (it renews every third of it) is presumed dead and the lease
+# is taken over.
+CRAWL_LEASE_SECONDS = 300
+
+# scrape_and_store serves stored keyword results younger than SOFT_TTL_SECONDS as they are, serves
+# them while refreshing in the background up to HARD_TTL_SECONDS, and recrawls older or missing
+# keywords before answering (product_hunt/freshness.py).
+KEYWORD_FRESHNESS = {
+    'SOFT_TTL_SECONDS': 6 * 60 * 60,
+    'HARD_TTL_SECONDS': 7 * 24 * 60 * 60,
+    'REFRESH_RETRY_SECONDS': 300,
+}
+
+# Requests to get_keyword_data and search_products are counted per keyword (product_hunt/popularity.py),
+# buffered for FLUSH_SECONDS per process; a request's weight halves every HALF_LIFE_SECONDS.
+KEYWORD_POPULARITY = {
+    'FLUSH_SECONDS': 10,
+    'FLUSH_SIZE': 1000,
+    'HALF_LIFE_SECONDS': 24 * 60 * 60,
+}
+
+# `python manage.py refresh_scheduler` (product_hunt/refresh_scheduler.py) refreshes the stored keywords
+# with the highest popularity x staleness every INTERVAL_SECONDS, spending at most
+# SITE_REQUESTS_PER_HOUR on each site. Sites are charged the requests the refreshes actually sent (retries
+# included, page cache hits not); PAGES_PER_CRAWL requests per site are held back while a refresh runs.
+REFRESH_SCHEDULER = {
+    'INTERVAL_SECONDS': 60,
+    'SITE_REQUESTS_PER_HOUR': {'default': 120, 'Amazon': 60},
+    'PAGES_PER_CRAWL': 2,
+    'MIN_STALENESS': 0.8,
+    'MIN_POPULARITY': 0.5,
+}
+
+# Bulk keyword crawls (`python manage.py crawl_keywords`, product_hunt/bulk_crawl.py): keywords crawled
+# at the same time, and at the same time on any one site. Requests still obey SCRAPER_RATE_LIMITS.
+CRAWL_KEYWORD_CONCURRENCY = 32
+CRAWL_SITE_CONCURRENCY = 8
+
+# Caches
+# 'responses' holds serialized get_keyword_data/search_products payloads (product_hunt/response_cache.py)
+# and the generation counters ingests bump to invalidate them. It must be shared by the web workers and
+# by crawl_keywords/refresh_scheduler, so it lives on disk; use Redis or memcached across hosts. Bumps
+# only ever set new values, so they need no atomic incr and work on any backend.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.response_cache',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 2000, 'CULL_FREQUENCY': 10},
+    },
+}
+RESPONSE_CACHE_ALIAS = 'responses'
+
+# Product list APIs return keyset-paginated pages (?limit=&cursor=&fields=, product_hunt/pagination.py)
+PRODUCT_PAGE_SIZE = 50
+PRODUCT_MAX_PAGE_SIZE = 500
+
+# Default weights of the database-side product ranking (product_hunt/ranking.py); requests
+# may override them with ?w_price=&w_sentiment=&w_reviews=&site_weights=amazon:1.2,ebay:0.8
+RANKING_WEIGHTS = {'price': 1.0, 'sentiment': 1.0, 'reviews': 0.25}
+RANKING_SITE_WEIGHTS = {}
@@ -1,6 +1,8 @@
 from django.contrib import admin
-from .models import Website, Product
+from .models import CrawlRun, Website, Product, ScrapeJob
 # Register your models here.
 
 admin.site.register(Website)
 admin.site.register(Product)
+admin.site.register(ScrapeJob)
+admin.site.register(CrawlRun)
@@ -0,0 +1,278 @@
+import hashlib
+import json
+import multiprocessing
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+from ..scrapers.parse_pool import ParsePool
+from ..scrapers.parsers import available_parsers, get_parser_backend
+from ..scrapers.sites import get_site
+
+try:
+    import resource
+except ImportError:  # not available on Windows; RSS is then not reported
+    resource = None
+
+# The bundled pages are synthetic: written to the markup the site specs select, at realistic sizes,
+# not captured from the live sites (see fixtures/README.md).
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+
+
+def load_fixtures(fixtures_dir=None, sites=None):
+    """
+    Reads the search pages listed in the fixture manifest.
+
+    Parameters:
+        fixtures_dir (str or Path, optional): Directory holding ``manifest.json`` and the pages.
+        sites (list, optional): Site names to keep (case-insensitive). Defaults to all.
+
+    Returns:
+        list: One dict per page with ``site``, ``file``, ``html``, the expected ``items``
+        count and ``next_page`` URL.
+    """
+    fixtures_dir = Path(fixtures_dir or FIXTURES_DIR)
+    manifest = json.loads((fixtures_dir / 'manifest.json').read_text())
+    wanted = {name.lower() for name in sites} if sites else None
+    fixtures = []
+    for entry in manifest:
+        if wanted is not None and entry['site'].lower() not in wanted:
+            continue
+        html = (fixtures_dir / entry['file']).read_text(encoding='utf-8')
+        fixtures.append({**entry, 'html': html})
+    return fixtures
+
+
+def corpus_digest(fixtures):
+    """
+    Fingerprints the fixture pages so results are only compared across identical corpora.
+    """
+    digest = hashlib.sha256()
+    for fixture in sorted(fixtures, key=lambda fixture: fixture['file']):
+        digest.update(fixture['file'].encode())
+        digest.update(fixture['html'].encode())
+    return digest.hexdigest()[:16]
+
+
+def build_scraper(site_name, parser, partial=None):
+    site = get_site(site_name)
+    return site.scraper_class(site.search_url, parser=parser, partial=partial)
+
+
+def parse_and_extract(scraper, html):
+    soup = scraper.parse_html(html)
+    return soup, scraper.extract_items(soup)
+
+
+def measure_throughput(scraper, html, repeat):
+    """
+    Parses and extracts one page ``repeat`` times.
+
+    Returns:
+        dict: Median parse and extract milliseconds, pages/sec and items/sec.
+    """
+    parse_times, extract_times = [], []
+    items = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        soup = scraper.parse_html(html)
+        parsed = time.perf_counter()
+        items = len(scraper.extract_items(soup))
+        parse_times.append(parsed - started)
+        extract_times.append(time.perf_counter() - parsed)
+    total = sum(parse_times) + sum(extract_times)
+    return {
+        'items': items,
+        'parse_ms': statistics.median(parse_times) * 1000,
+        'extract_ms': statistics.median(extract_times) * 1000,
+        'total_ms': statistics.median([p + e for p, e in zip(parse_times, extract_times)]) * 1000,
+        'pages_per_sec': repeat / total,
+        'items_per_sec': repeat * items / total,
+    }
+
+
+def measure_fields(scraper, html, repeat):
+    """
+    Times the extraction of each field of the scraper's site spec on its own over every item
+    of the page.
+
+    Returns:
+        dict: Microseconds per item for each field.
+    """
+    soup = scraper.parse_html(html)
+    items = scraper.select_items(soup)
+    fields = {}
+    if not items:
+        return fields
+    for field in scraper.SPEC.fields:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for item in items:
+                scraper.extract_field(item, field)
+        fields[field] = (time.perf_counter() - started) / (repeat * len(items)) * 1_000_000
+    return fields
+
+
+def max_rss_bytes():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == 'darwin' else usage * 1024  # kilobytes on Linux
+
+
+def _rss_probe(connection, site_name, parser, partial, html):
+    before = max_rss_bytes()
+    scraper = build_scraper(site_name, parser, partial)
+    parse_and_extract(scraper, html)
+    connection.send(max_rss_bytes() - before)
+    connection.close()
+
+
+def measure_memory(scraper, site_name, parser, html):
+    """
+    Measures the peak memory of parsing and extracting one page.
+
+    Returns:
+        dict: ``peak_python_bytes`` traced by tracemalloc, and ``peak_rss_delta_bytes``, the
+        growth of the resident set in a forked process, which also covers the C-level trees
+        of lxml and selectolax (None where fork or resource are unavailable).
+    """
+    tracemalloc.start()
+    try:
+        parse_and_extract(scraper, html)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    rss_delta = None
+    if resource is not None and 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=_rss_probe, args=(sender, site_name, parser, scraper.partial, html))
+        process.start()
+        sender.close()
+        if receiver.poll(60):
+            rss_delta = receiver.recv()
+        process.join()
+    return {'peak_python_bytes': peak, 'peak_rss_delta_bytes': rss_delta}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_parse_benchmark(sites=None, parsers=None, repeat=20, fixtures_dir=None, memory=True, partial=None):
+    """
+    Benchmarks every scraper over its fixture pages with each parser backend.
+    Nothing is fetched and nothing is written to the database or the page cache.
+
+    Parameters:
+        sites (list, optional): Site names to benchmark. Defaults to every fixture site.
+        parsers (list, optional): Parser backends. Defaults to every available one.
+        repeat (int, optional): Timed runs per page.
+        fixtures_dir (str or Path, optional): Alternative fixture corpus.
+        memory (bool, optional): Also measure peak memory.
+        partial (bool, optional): Parse only the site specs' regions. Defaults to
+            settings.SCRAPER_PARTIAL_PARSE.
+
+    Returns:
+        dict: Run metadata and one result per (site, parser, page), JSON serializable.
+    """
+    fixtures = load_fixtures(fixtures_dir, sites)
+    parsers = [name for name in (parsers or available_parsers()) if name in available_parsers()]
+    results = []
+    for fixture in fixtures:
+        for parser in parsers:
+            scraper = build_scraper(fixture['site'], parser, partial)
+            soup, items = parse_and_extract(scraper, fixture['html'])  # warm up selectors and caches
+            case = {
+                'site': fixture['site'],
+                'parser': get_parser_backend(parser).name,
+                'fixture': fixture['file'],
+                'fixture_digest': corpus_digest([fixture]),
+                'partial_parse': scraper.partial,
+                'expected_items': fixture['items'],
+                'next_page_ok': scraper.get_next_page_url(soup) == fixture.get('next_page'),
+            }
+            case.update(measure_throughput(scraper, fixture['html'], repeat))
+            case['field_us_per_item'] = measure_fields(scraper, fixture['html'], max(1, repeat // 4))
+            if memory:
+                case.update(measure_memory(scraper, fixture['site'], parser, fixture['html']))
+            case['items_ok'] = case['items'] == fixture['items']
+            results.append(case)
+    return {
+        'benchmark': 'parsing',
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'corpus': corpus_digest(fixtures),
+        'results': results,
+    }
+
+
+def measure_pool_scaling(worker_counts, sites=None, parser=None, pages=200, fixtures_dir=None):
+    """
+    Measures parse throughput through a ParsePool with each number of workers, with every
+    page submitted at once as the crawl's I/O threads would.
+
+    Parameters:
+        worker_counts (list): Worker counts to try; 0 parses inline in this process.
+        sites (list, optional): Site names whose fixtures are parsed. Defaults to all.
+        parser (str, optional): Parser backend. Defaults to settings.SCRAPER_PARSER.
+        pages (int, optional): Pages parsed per worker count, cycling through the fixtures.
+        fixtures_dir (str or Path, optional): Alternative fixture corpus.
+
+    Returns:
+        list: One dict per worker count with ``workers``, ``seconds`` and ``pages_per_sec``.
+    """
+    fixtures = load_fixtures(fixtures_dir, sites)
+    scrapers = {fixture['site']: build_scraper(fixture['site'], parser) for fixture in fixtures}
+    work = [fixtures[number % len(fixtures)] for number in range(pages)]
+    results = []
+    for workers in worker_counts:
+        pool = ParsePool(workers) if workers else None
+        try:
+            if pool is not None:
+                pool.extract_page(scrapers[work[0]['site']], work[0]['html'])  # wait for the warm-up
+            started = time.perf_counter()
+            if pool is None:
+                for fixture in work:
+                    scrapers[fixture['site']].extract_page(fixture['html'])
+            else:
+                futures = [pool.submit(scrapers[fixture['site']], fixture['html']) for fixture in work]
+                for future in futures:
+                    pool.unpack(future.result())
+            seconds = time.perf_counter() - started
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        results.append({'workers': workers, 'seconds': seconds, 'pages_per_sec': pages / seconds})
+    return results
+
+
+def compare_runs(current, baseline):
+    """
+    Pairs up the cases of two runs.
+
+    Returns:
+        list: ``(case, baseline_case, pages_per_sec_change)`` for cases run over the same
+        fixture page in both runs, the change being a fraction (0.1 = 10% faster).
+    """
+    previous = {(case['site'], case['parser'], case.get('fixture_digest')): case for case in baseline['results']}
+    pairs = []
+    for case in current['results']:
+        old = previous.get((case['site'], case['parser'], case['fixture_digest']))
+        if old:
+            pairs.append((case, old, case['pages_per_sec'] / old['pages_per_sec'] - 1))
+    return pairs
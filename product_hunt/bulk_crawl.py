@@ -0,0 +1,340 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .crawler import ENGINE_ASYNC, get_engine_name, save_site_results
+from .ingestion import get_ingest_batch_size
+from .models import CrawlRun, CrawlRunKeyword
+from .scrapers.sites import SITES, build_search_url
+from .singleflight import normalize_keyword
+
+DEFAULT_CRAWL_MAX_PAGES = 2
+DEFAULT_CRAWL_SITE_CONCURRENCY = 8
+DEFAULT_CRAWL_KEYWORD_CONCURRENCY = 32
+
+# Per-site checkpoint statuses, stored in CrawlRunKeyword.progress
+SITE_SUCCEEDED = 'succeeded'
+SITE_EMPTY = 'empty'        # no products were scraped, e.g. no results or the fetch failed
+SITE_FAILED = 'failed'      # the products could not be stored
+
+MAX_KEYWORD_LENGTH = CrawlRunKeyword._meta.get_field('keyword').max_length
+
+
+class CrawlRunError(Exception):
+    pass
+
+
+def read_keywords(lines):
+    """
+    Reads keywords, one per line, skipping blank lines and ``#`` comments.
+
+    Returns:
+        list: The normalized keywords without duplicates, in input order.
+    """
+    keywords = {}
+    for line in lines:
+        keyword = normalize_keyword(line)
+        if not keyword or keyword.startswith('#'):
+            continue
+        if len(keyword) > MAX_KEYWORD_LENGTH:
+            logging.warning(f"Skipping keyword longer than {MAX_KEYWORD_LENGTH} characters: {keyword[:40]}...")
+            continue
+        keywords.setdefault(keyword, None)
+    return list(keywords)
+
+
+def default_run_name(source, keywords):
+    """
+    Names a run after its input and keywords, so crawling the same list again resumes it.
+    """
+    digest = hashlib.sha1('\n'.join(keywords).encode()).hexdigest()[:10]
+    return f"{source}-{digest}"
+
+
+def prepare_run(name, keywords, sites, restart=False, retry_failed=False):
+    """
+    Creates or resumes the CrawlRun called ``name`` and checkpoints its keywords.
+
+    Parameters:
+        name (str): The run name.
+        keywords (list): Keywords to crawl; ones the run already has are kept as they are.
+        sites (list): Sites to crawl. A resumed run must crawl the same sites.
+        restart (bool, optional): Forget the progress of the run and crawl every keyword again.
+        retry_failed (bool, optional): Crawl keywords that failed in an earlier attempt again.
+
+    Returns:
+        tuple: ``(run, entries)``, the CrawlRunKeyword rows still to crawl, in input order.
+
+    Raises:
+        CrawlRunError: If the run exists and crawls other sites.
+
+    Keywords left running by an interrupted process are crawled again; their sites that
+    were already stored are skipped.
+    """
+    site_names = [site.name for site in sites]
+    with transaction.atomic():
+        run, created = CrawlRun.objects.get_or_create(name=name, defaults={'sites': site_names})
+        if not created and run.sites != site_names:
+            raise CrawlRunError(f"Crawl run {name} crawls {', '.join(run.sites)}; start a new run for other sites")
+        if restart:
+            run.keywords.all().delete()
+        existing = set(run.keywords.values_list('keyword', flat=True))
+        position = (run.keywords.aggregate(last=Max('position'))['last'] or 0) + 1
+        CrawlRunKeyword.objects.bulk_create(
+            [CrawlRunKeyword(run=run, keyword=keyword, position=position + offset)
+             for offset, keyword in enumerate(keyword for keyword in keywords if keyword not in existing)],
+            batch_size=get_ingest_batch_size(),
+        )
+        run.keywords.filter(status=CrawlRunKeyword.STATUS_RUNNING).update(status=CrawlRunKeyword.STATUS_PENDING)
+        statuses = [CrawlRunKeyword.STATUS_PENDING]
+        if retry_failed:
+            statuses.append(CrawlRunKeyword.STATUS_FAILED)
+        run.status = CrawlRun.STATUS_RUNNING
+        run.finished_at = None
+        run.save(update_fields=['status', 'finished_at', 'updated_at'])
+    entries = list(run.keywords.filter(status__in=statuses).order_by('position'))
+    return run, entries
+
+
+class CrawlStats:
+    """
+    Throughput of a crawl since it started, updated from every crawler thread.
+    """
+
+    def __init__(self, total):
+        self.total = total
+        self.started = time.monotonic()
+        self.keywords = self.failed = self.pages = self.items = self.rows_written = 0
+        self.lock = threading.Lock()
+
+    def add(self, entry, pages, items, rows_written):
+        with self.lock:
+            self.keywords += 1
+            self.failed += entry.status == CrawlRunKeyword.STATUS_FAILED
+            self.pages += pages
+            self.items += items
+            self.rows_written += rows_written
+
+    def summary(self):
+        with self.lock:
+            elapsed = time.monotonic() - self.started
+            minutes = max(elapsed, 1e-9) / 60
+            return (
+                f"{self.keywords}/{self.total} keywords ({self.failed} failed), {self.pages} pages, "
+                f"{self.items} items, {self.rows_written} rows written in {elapsed:.0f}s: "
+                f"{self.keywords / minutes:.1f} keywords/min, {self.pages / minutes:.1f} pages/min, "
+                f"{self.items / minutes:.0f} items/min"
+            )
+
+
+class BulkCrawler:
+
+    def __init__(self, run, sites=None, concurrency=None, site_concurrency=None, max_pages=None, engine=None,
+                 on_keyword_done=None):
+        """
+        Initializes a crawler for the keywords of a CrawlRun, using the existing scrapers.
+
+        Args:
+            run (CrawlRun): The run whose progress is checkpointed.
+            sites (list, optional): Sites to crawl. Defaults to every registered site.
+            concurrency (int, optional): Keywords crawled at the same time. Defaults to
+                ``settings.CRAWL_KEYWORD_CONCURRENCY``.
+            site_concurrency (int, optional): Keywords crawled at the same time on any one
+                site. Defaults to ``settings.CRAWL_SITE_CONCURRENCY``.
+            max_pages (int, optional): Search pages scraped per keyword and site. Defaults to 2.
+            engine (str, optional): 'async' or 'threaded'. Defaults to ``settings.SCRAPER_ENGINE``.
+            on_keyword_done (callable, optional): Called as ``on_keyword_done(entry, stats)``
+                once a keyword has been stored and checkpointed.
+
+        Returns:
+            None
+
+        Every site of a keyword is checkpointed as soon as its products are stored, so an
+        interrupted crawl loses at most the keywords in flight. Requests still go through
+        the shared per-host rate limiter.
+        """
+        self.run = run
+        self.sites = sites or SITES
+        self.concurrency = concurrency or getattr(settings, 'CRAWL_KEYWORD_CONCURRENCY', DEFAULT_CRAWL_KEYWORD_CONCURRENCY)
+        self.site_concurrency = site_concurrency or getattr(settings, 'CRAWL_SITE_CONCURRENCY', DEFAULT_CRAWL_SITE_CONCURRENCY)
+        self.max_pages = max_pages or DEFAULT_CRAWL_MAX_PAGES
+        self.engine = engine or get_engine_name()
+        self.on_keyword_done = on_keyword_done
+        self.stats = None
+
+    def crawl(self, entries):
+        """
+        Crawls and stores the given CrawlRunKeyword rows, then marks the run finished if no
+        keyword is left to crawl.
+
+        Returns:
+            CrawlStats: The throughput of this crawl.
+        """
+        self.stats = CrawlStats(len(entries))
+        # Database writes run on a single writer thread, so SQLite sees one writer and the
+        # event loop never blocks on them.
+        writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='crawl-writer')
+        try:
+            if entries and self.engine == ENGINE_ASYNC:
+                try:
+                    self.crawl_async(entries, writer)
+                except ImportError as e:
+                    logging.warning(f'Async scraping engine unavailable ({str(e)}), using threads')
+                    self.crawl_threaded(entries, writer)
+            elif entries:
+                self.crawl_threaded(entries, writer)
+        finally:
+            writer.submit(connections.close_all)
+            writer.shutdown(wait=True)  # lets a checkpoint in progress complete
+        unfinished = self.run.keywords.filter(status__in=[CrawlRunKeyword.STATUS_PENDING, CrawlRunKeyword.STATUS_RUNNING])
+        if not unfinished.exists():
+            CrawlRun.objects.filter(pk=self.run.pk).update(
+                status=CrawlRun.STATUS_FINISHED, finished_at=timezone.now(), updated_at=timezone.now(),
+            )
+        return self.stats
+
+    def pending_sites(self, entry):
+        return [site for site in self.sites if entry.progress.get(site.name, {}).get('status') != SITE_SUCCEEDED]
+
+    def start_keyword(self, entry):
+        entry.status = CrawlRunKeyword.STATUS_RUNNING
+        entry.attempts += 1
+        CrawlRunKeyword.objects.filter(pk=entry.pk).update(status=entry.status, attempts=entry.attempts)
+
+    def store_site(self, entry, site, pages):
+        """
+        Stores the products scraped from one site for a keyword and checkpoints the site.
+        """
+        items = [item for page in pages for item in page.items]
+        if not items:
+            status, result = SITE_EMPTY, None
+        else:
+            result = save_site_results(site, entry.keyword, items)
+            status = SITE_FAILED if result is None else SITE_SUCCEEDED
+        entry.progress[site.name] = {
+            'status': status,
+            'pages': len(pages),
+            'items': len(items),
+            'rows_written': result.rows_written if result is not None else 0,
+        }
+        CrawlRunKeyword.objects.filter(pk=entry.pk).update(progress=entry.progress)
+        return entry.progress[site.name]
+
+    def store_keyword(self, entry, site_pages):
+        """
+        Stores and checkpoints every site crawled for a keyword, then records the keyword's outcome.
+
+        Parameters:
+            entry (CrawlRunKeyword): The keyword.
+            site_pages (dict): Maps site names to the PageResults scraped for the keyword.
+        """
+        pages = items = rows_written = 0
+        try:
+            for site in self.sites:
+                if site.name in site_pages:
+                    stored = self.store_site(entry, site, site_pages[site.name])
+                    pages += stored['pages']
+                    items += stored['items']
+                    rows_written += stored['rows_written']
+            progress = [entry.progress.get(site.name, {}) for site in self.sites]
+            failed = any(site_progress.get('status') == SITE_FAILED for site_progress in progress)
+            if failed or not any(site_progress.get('items') for site_progress in progress):
+                entry.status = CrawlRunKeyword.STATUS_FAILED
+                entry.error = 'Failed to store products' if failed else 'Failed to scrape data'
+            else:
+                entry.status = CrawlRunKeyword.STATUS_SUCCEEDED
+                entry.error = ''
+        except Exception as e:
+            logging.error(f"Error storing crawl of '{entry.keyword}': {str(e)}")
+            entry.status = CrawlRunKeyword.STATUS_FAILED
+            entry.error = str(e)
+        entry.pages = sum(site_progress.get('pages', 0) for site_progress in entry.progress.values())
+        entry.items = sum(site_progress.get('items', 0) for site_progress in entry.progress.values())
+        entry.rows_written = sum(site_progress.get('rows_written', 0) for site_progress in entry.progress.values())
+        entry.finished_at = timezone.now()
+        CrawlRunKeyword.objects.filter(pk=entry.pk).update(
+            status=entry.status, error=entry.error, pages=entry.pages, items=entry.items,
+            rows_written=entry.rows_written, finished_at=entry.finished_at,
+        )
+        self.stats.add(entry, pages, items, rows_written)
+        if self.on_keyword_done is not None:
+            try:
+                self.on_keyword_done(entry, self.stats)
+            except Exception as e:
+                logging.error(f"Error reporting crawl progress: {str(e)}")
+
+    def crawl_async(self, entries, writer):
+        """
+        Crawls on one event loop with the async engine.
+        """
+        from .scrapers.async_engine import AsyncScrapeEngine
+
+        engine = AsyncScrapeEngine(
+            sites=self.sites,
+            max_pages=self.max_pages,
+            keyword_concurrency=self.concurrency,
+            site_concurrency=self.site_concurrency,
+        )
+        asyncio.run(self.run_async(engine, writer, entries))
+
+    async def run_async(self, engine, writer, entries):
+        loop = asyncio.get_running_loop()
+        queue = iter(entries)
+
+        async def worker(session):
+            for entry in queue:
+                try:
+                    sites = self.pending_sites(entry)
+                    await loop.run_in_executor(writer, self.start_keyword, entry)
+                    site_pages = await engine.scrape_keyword_pages(entry.keyword, session, sites)
+                    await loop.run_in_executor(writer, self.store_keyword, entry, site_pages)
+                except Exception as e:
+                    logging.error(f"An unexpected error occurred while crawling '{entry.keyword}': {str(e)}")
+
+        async with engine.create_session() as session:
+            await asyncio.gather(*(worker(session) for _ in range(min(engine.keyword_concurrency, len(entries)))))
+
+    def crawl_threaded(self, entries, writer):
+        """
+        Crawls with a pool of keyword threads, each running one thread per site like the
+        threaded engine.
+        """
+        site_limits = {site.name: threading.BoundedSemaphore(self.site_concurrency) for site in self.sites}
+
+        def crawl_entry(entry):
+            site_pages = {}
+
+            def run_scraper(site):
+                url = build_search_url(site, entry.keyword)
+                try:
+                    with site_limits[site.name]:
+                        site_pages[site.name] = site.scraper_class(url, max_pages=self.max_pages).scrape_pages()
+                except Exception as e:
+                    logging.error(f'An unexpected error occurred while scraping {url}: {str(e)}')
+                    site_pages[site.name] = []
+
+            try:
+                writer.submit(self.start_keyword, entry).result()
+                threads = [threading.Thread(target=run_scraper, args=(site,)) for site in self.pending_sites(entry)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                writer.submit(self.store_keyword, entry, site_pages).result()
+            except Exception as e:
+                logging.error(f"An unexpected error occurred while crawling '{entry.keyword}': {str(e)}")
+
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='crawl')
+        try:
+            for future in [executor.submit(crawl_entry, entry) for entry in entries]:
+                future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import threading
+
+import requests
+from django.conf import settings
+from django.db import connections
+
+from .scrapers.sites import SITES, build_search_url
+
+ENGINE_ASYNC = 'async'
+ENGINE_THREADED = 'threaded'
+
+
+def get_engine_name():
+    return getattr(settings, 'SCRAPER_ENGINE', ENGINE_ASYNC)
+
+
+def save_site_results(site, keyword, product_data):
+    """
+    Drops incomplete rows and stores the products scraped from one site.
+
+    Returns:
+        IngestResult or None: Rows written and time taken, or None if saving failed.
+    """
+    scraper = site.scraper_class(build_search_url(site, keyword))
+    return scraper.save_to_database(scraper.drop_placeholder_rows(product_data), keyword)
+
+
+def notify_site_done(on_site_done, keyword, site, result):
+    if on_site_done is None:
+        return
+    try:
+        on_site_done(keyword, site, result)
+    except Exception as e:
+        logging.error(f'Error reporting progress for {site.name}: {str(e)}')
+
+
+def crawl_keyword_threaded(keyword, sites=None, on_site_done=None):
+    """
+    Scrapes and stores ``keyword`` on every site with one thread per site.
+    """
+    def run_scraper(site):
+        url = build_search_url(site, keyword)
+        result = None
+        try:
+            scraper = site.scraper_class(url)
+            result = scraper.scrape(keyword)  # Pass the keyword to the scrape method
+        except requests.exceptions.RequestException as e:
+            logging.error(f'Network error occurred while scraping {url}: {str(e)}')
+        except Exception as e:
+            logging.error(f'An unexpected error occurred while scraping {url}: {str(e)}')
+        notify_site_done(on_site_done, keyword, site, result)
+        connections.close_all()  # this thread's connections would otherwise stay open
+
+    threads = []
+    for site in sites or SITES:
+        thread = threading.Thread(target=run_scraper, args=(site,))
+        threads.append(thread)
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+
+def crawl_keywords_async(keywords, sites=None, on_site_done=None):
+    """
+    Scrapes every keyword on every site concurrently on one event loop, then stores the results.
+    """
+    from .scrapers.async_engine import AsyncScrapeEngine
+
+    sites = sites or SITES
+    engine = AsyncScrapeEngine(sites=sites)
+    results = asyncio.run(engine.scrape_keywords(list(keywords)))
+    # The ORM is synchronous, so rows are written once the event loop has finished.
+    for keyword, site_results in results.items():
+        for site in sites:
+            result = save_site_results(site, keyword, site_results.get(site.name, []))
+            notify_site_done(on_site_done, keyword, site, result)
+
+
+def crawl_keyword(keyword, sites=None, engine=None, on_site_done=None):
+    """
+    Scrapes and stores ``keyword`` on every site using the configured engine.
+
+    Parameters:
+        keyword (str): The search keyword.
+        sites (list, optional): Sites to crawl. Defaults to every registered site.
+        engine (str, optional): 'async' or 'threaded'. Defaults to ``settings.SCRAPER_ENGINE``.
+        on_site_done (callable, optional): Called as ``on_site_done(keyword, site, ingest_result)``
+            as soon as each site has been stored; ``ingest_result`` is None if the site failed.
+
+    Falls back to the threaded engine when the async engine is unavailable.
+    """
+    crawl_keywords([keyword], sites=sites, engine=engine, on_site_done=on_site_done)
+
+
+def crawl_keywords(keywords, sites=None, engine=None, on_site_done=None):
+    """
+    Scrapes and stores several keywords, concurrently when the async engine is available.
+    """
+    engine = engine or get_engine_name()
+    if engine == ENGINE_ASYNC:
+        try:
+            crawl_keywords_async(keywords, sites=sites, on_site_done=on_site_done)
+            return
+        except ImportError as e:
+            logging.warning(f'Async scraping engine unavailable ({str(e)}), using threads')
+    for keyword in keywords:
+        crawl_keyword_threaded(keyword, sites=sites, on_site_done=on_site_done)
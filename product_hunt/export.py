@@ -0,0 +1,180 @@
+import csv
+import json
+import tempfile
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import search_index
+from .models import Product
+
+DEFAULT_EXPORT_CHUNK_SIZE = 2000
+MAX_EXPORT_CHUNK_SIZE = 20000
+
+# (column name in the export, queryset lookup)
+EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('name', 'name'),
+    ('price', 'price'),
+    ('price_cents', 'price_cents'),
+    ('currency', 'currency'),
+    ('reviews', 'reviews'),
+    ('product_url', 'product_url'),
+    ('image_url', 'image_url'),
+    ('website', 'website__name'),
+    ('sentiment_score', 'sentiment_score'),
+    ('sentiment_label', 'sentiment_label'),
+    ('keyword', 'keyword'),
+    ('scraped_at', 'scraped_at'),
+]
+COLUMN_NAMES = [name for name, _ in EXPORT_COLUMNS]
+# Parquet column types other than string; every column is nullable.
+PARQUET_TYPES = {'id': 'int64', 'price_cents': 'int64', 'sentiment_score': 'float64', 'scraped_at': 'timestamp'}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def parse_timestamp(value, end_of_day=False):
+    """
+    Parses an ISO date or datetime query parameter into an aware datetime. A date stands for
+    the start of that day, or its end with ``end_of_day``.
+    """
+    try:
+        # A bare date first: parse_datetime also accepts one, as midnight.
+        day = parse_date(value)
+        parsed = datetime.combine(day, time.max if end_of_day else time.min) if day else parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ExportError(f"Invalid date: {value}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_chunk_size(value):
+    """
+    Parses the ``chunk_size`` query parameter, capped at MAX_EXPORT_CHUNK_SIZE rows.
+    """
+    if not value:
+        return DEFAULT_EXPORT_CHUNK_SIZE
+    try:
+        chunk_size = int(value)
+    except ValueError:
+        raise ExportError("chunk_size must be an integer")
+    if chunk_size < 1:
+        raise ExportError("chunk_size must be positive")
+    return min(chunk_size, MAX_EXPORT_CHUNK_SIZE)
+
+
+def export_rows(keyword=None, website=None, since=None, until=None, chunk_size=None):
+    """
+    Streams the products matching the filters as tuples in EXPORT_COLUMNS order.
+
+    Parameters:
+        keyword (str, optional): Only products scraped for a matching keyword.
+        website (str, optional): Only products of this marketplace (case-insensitive name).
+        since (str, optional): ISO date/datetime; only products scraped at or after it.
+        until (str, optional): ISO date/datetime; only products scraped at or before it.
+        chunk_size (int, optional): Rows fetched from the database per round trip.
+
+    Returns:
+        iterator: Row tuples, fetched lazily so memory use does not grow with the result size.
+    """
+    products = Product.objects.all()
+    if keyword:
+        products = search_index.search(keyword, fields=('keyword',), queryset=products)
+    if website:
+        products = products.filter(website__name__iexact=website)
+    if since:
+        products = products.filter(scraped_at__gte=parse_timestamp(since))
+    if until:
+        products = products.filter(scraped_at__lte=parse_timestamp(until, end_of_day=True))
+    rows = products.order_by('id').values_list(*(lookup for _, lookup in EXPORT_COLUMNS))
+    return rows.iterator(chunk_size=chunk_size or DEFAULT_EXPORT_CHUNK_SIZE)
+
+
+def batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def json_value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def iter_ndjson(rows, chunk_size=DEFAULT_EXPORT_CHUNK_SIZE):
+    """
+    Encodes rows as newline-delimited JSON, one string per chunk of rows.
+    """
+    for batch in batched(rows, chunk_size):
+        yield ''.join(
+            json.dumps(dict(zip(COLUMN_NAMES, map(json_value, row))), ensure_ascii=False) + '\n'
+            for row in batch
+        )
+
+
+class _Echo:
+    """
+    File-like object whose write() returns the written value, for streaming csv output.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows, chunk_size=DEFAULT_EXPORT_CHUNK_SIZE):
+    """
+    Encodes rows as CSV with a header line, one string per chunk of rows.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMN_NAMES)
+    for batch in batched(rows, chunk_size):
+        yield ''.join(writer.writerow(map(json_value, row)) for row in batch)
+
+
+def parquet_schema(pa):
+    """
+    Returns the pyarrow schema of the Parquet export: one column per EXPORT_COLUMNS entry.
+    """
+    types = {'int64': pa.int64(), 'float64': pa.float64(), 'timestamp': pa.timestamp('us', tz='UTC')}
+    return pa.schema([(name, types.get(PARQUET_TYPES.get(name), pa.string())) for name in COLUMN_NAMES])
+
+
+def write_parquet(rows, chunk_size=DEFAULT_EXPORT_CHUNK_SIZE):
+    """
+    Writes rows to a temporary Parquet file, one row group per chunk, so only one chunk is
+    held in memory at a time. Requires pyarrow.
+
+    Every chunk is converted with the same explicit schema; types inferred per chunk would
+    differ when a column is empty in one chunk, e.g. a chunk of products without parsed prices.
+
+    Returns:
+        file: The temporary file, rewound to the start. It is deleted when closed.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError("Parquet export requires the pyarrow package")
+
+    schema = parquet_schema(pa)
+    output = tempfile.TemporaryFile()
+    writer = pq.ParquetWriter(output, schema)
+    try:
+        for batch in batched(rows, chunk_size):
+            columns = [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+    finally:
+        writer.close()
+    output.seek(0)
+    return output
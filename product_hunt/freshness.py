@@ -0,0 +1,103 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from . import search_index
+from .models import KeywordFreshness
+from .singleflight import normalize_keyword
+
+DEFAULT_KEYWORD_FRESHNESS_SETTINGS = {
+    'SOFT_TTL_SECONDS': 6 * 60 * 60,        # served as they are
+    'HARD_TTL_SECONDS': 7 * 24 * 60 * 60,   # served while a background refresh runs; older ones are recrawled first
+    'REFRESH_RETRY_SECONDS': 300,           # before a background refresh that did not store anything is retried
+}
+
+# Freshness states of a keyword's stored results
+FRESH = 'fresh'
+STALE = 'stale'
+EXPIRED = 'expired'
+MISSING = 'missing'
+
+
+def get_freshness_settings():
+    return {**DEFAULT_KEYWORD_FRESHNESS_SETTINGS, **getattr(settings, 'KEYWORD_FRESHNESS', {})}
+
+
+def keyword_state(keyword, now=None):
+    """
+    Tells how fresh the stored results of ``keyword`` are.
+
+    Parameters:
+        keyword (str): The search keyword.
+        now (datetime, optional): The time to judge by. Defaults to now.
+
+    Returns:
+        str: FRESH when the keyword was scraped within the soft TTL, STALE within the hard
+        TTL, EXPIRED beyond it, MISSING if it was never scraped.
+    """
+    row = KeywordFreshness.objects.filter(keyword=normalize_keyword(keyword)).only('scraped_at').first()
+    if row is None:
+        return MISSING
+    config = get_freshness_settings()
+    age = ((now or timezone.now()) - row.scraped_at).total_seconds()
+    if age < config['SOFT_TTL_SECONDS']:
+        return FRESH
+    if age < config['HARD_TTL_SECONDS']:
+        return STALE
+    return EXPIRED
+
+
+def needs_crawl(keyword):
+    """
+    Tells whether a request for ``keyword`` has to wait for a crawl: its results expired, it
+    was never scraped, or no products are stored for it any more (e.g. they were deleted).
+    """
+    if keyword_state(keyword) in (EXPIRED, MISSING):
+        return True
+    return not search_index.search(keyword, fields=('keyword',)).exists()
+
+
+def record_scrape(keyword, scraped_at=None):
+    """
+    Marks ``keyword`` as just scraped, ending any background refresh of it. Called when
+    products are stored for the keyword.
+    """
+    KeywordFreshness.objects.bulk_create(
+        [KeywordFreshness(keyword=normalize_keyword(keyword), scraped_at=scraped_at or timezone.now())],
+        update_conflicts=True, unique_fields=['keyword'], update_fields=['scraped_at', 'refreshing_since'],
+    )
+
+
+def claim_refresh(keyword, now=None):
+    """
+    Claims the background refresh of a stale keyword, so concurrent requests start only one.
+    A claim whose refresh has not stored anything lapses after REFRESH_RETRY_SECONDS.
+
+    Returns:
+        bool: True if the caller should start the refresh.
+    """
+    now = now or timezone.now()
+    retry_after = now - timedelta(seconds=get_freshness_settings()['REFRESH_RETRY_SECONDS'])
+    claimed = KeywordFreshness.objects.filter(
+        Q(refreshing_since__isnull=True) | Q(refreshing_since__lt=retry_after),
+        keyword=normalize_keyword(keyword),
+    ).update(refreshing_since=now)
+    return claimed == 1
+
+
+def refresh_in_background(keyword):
+    """
+    Queues a scrape job refreshing ``keyword`` unless one is already in flight.
+
+    Returns:
+        ScrapeJob or None: The queued job, or None if a refresh was already running.
+    """
+    from . import jobs  # jobs imports the scrapers, which store products through this module
+
+    if not claim_refresh(keyword):
+        return None
+    logging.info(f"Refreshing stale results for '{keyword}' in the background")
+    return jobs.enqueue_scrape(keyword)
@@ -0,0 +1,80 @@
+import re
+from urllib.parse import parse_qsl, urljoin, urlsplit
+
+# Marketplace listing ids, matched against the path (and, for Newegg, the query) of a product URL:
+#   Amazon   /Some-Title/dp/B08N5WRWNW, /gp/product/B08N5WRWNW, /gp/aw/d/B08N5WRWNW
+#   eBay     /itm/1234567890, /itm/some-title/1234567890
+#   Newegg   /p/N82E16814137632, /p/1FT-000P-00123, ?Item=N82E16814137632
+_amazon_asin_re = re.compile(r'/(?:dp|gp/product|gp/aw/d|exec/obidos/asin)/([A-Z0-9]{10})(?:[/?]|$)', re.IGNORECASE)
+_ebay_item_re = re.compile(r'/itm/(?:[^/]+/)?(\d{9,15})(?:[/?]|$)')
+_newegg_item_re = re.compile(r'/p/(N82E\d{11}|[0-9A-Z]{3}-[0-9A-Z]{4}-[0-9A-Z]{5})(?:[/?]|$)', re.IGNORECASE)
+_newegg_query_re = re.compile(r'^(?:N82E\d{11}|[0-9A-Z]{3}-[0-9A-Z]{4}-[0-9A-Z]{5})$', re.IGNORECASE)
+
+# Query parameters that identify a listing; every other parameter (tracking, sorting) is dropped.
+IDENTIFYING_PARAMS = {'item', 'itemid', 'id', 'asin', 'sku'}
+
+MAX_KEY_LENGTH = 255
+
+
+def unwrap_redirect(url):
+    """
+    Returns the product URL wrapped in a sponsored-result redirect such as Amazon's
+    ``/sspa/click?...&url=%2Fdp%2FB08N5WRWNW``, or ``url`` itself.
+    """
+    parts = urlsplit(url)
+    if '/sspa/click' in parts.path:
+        target = dict(parse_qsl(parts.query)).get('url')
+        if target:
+            return urljoin(url, target)
+    return url
+
+
+def normalize_url(url):
+    """
+    Normalizes a product URL for comparison: lowercase host without 'www.', no scheme,
+    fragment, trailing slash or non-identifying query parameters.
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = re.sub(r'/+', '/', parts.path).rstrip('/')
+    params = sorted((name.lower(), value) for name, value in parse_qsl(parts.query) if name.lower() in IDENTIFYING_PARAMS)
+    query = '&'.join(f'{name}={value}' for name, value in params)
+    return f"{host}{path}" + (f"?{query}" if query else '')
+
+
+def product_key(url):
+    """
+    Returns the canonical identity of a listing: the marketplace item id when the URL carries
+    one (ASIN, eBay item id, Newegg item number), else the normalized URL.
+
+    Parameters:
+        url (str): The scraped product URL.
+
+    Returns:
+        str: e.g. 'amazon:B08N5WRWNW', 'ebay:1234567890', 'newegg:N82E16814137632' or
+        'url:example.com/product/1'; None if ``url`` is empty.
+    """
+    if not url:
+        return None
+    url = unwrap_redirect(url)
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+
+    if 'amazon.' in host:
+        match = _amazon_asin_re.search(parts.path)
+        if match:
+            return f"amazon:{match.group(1).upper()}"
+    if 'ebay.' in host:
+        match = _ebay_item_re.search(parts.path)
+        if match:
+            return f"ebay:{match.group(1)}"
+    if 'newegg.' in host:
+        match = _newegg_item_re.search(parts.path)
+        if match:
+            return f"newegg:{match.group(1).upper()}"
+        item = dict((name.lower(), value) for name, value in parse_qsl(parts.query)).get('item')
+        if item and _newegg_query_re.match(item):
+            return f"newegg:{item.upper()}"
+    return f"url:{normalize_url(url)}"[:MAX_KEY_LENGTH]
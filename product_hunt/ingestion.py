@@ -0,0 +1,241 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import transaction
+
+from . import freshness, response_cache
+from .identity import product_key
+from .models import Product, Website
+from .prices import parse_price
+from .singleflight import normalize_keyword
+from .scrapers.utils import score_many, sentiment_label
+
+DEFAULT_INGEST_BATCH_SIZE = 500
+
+DEFAULT_SENTIMENT_LABEL = 'Neutral'
+
+IngestResult = namedtuple('IngestResult', ['website', 'keyword', 'rows_written', 'seconds'])
+
+# Fields refreshed when a listing already stored for the keyword is scraped again.
+UPSERT_FIELDS = [
+    'name', 'price', 'price_cents', 'currency', 'reviews', 'product_url', 'image_url',
+    'website', 'sentiment_score', 'sentiment_label',
+]
+
+_websites = {}
+_websites_lock = threading.Lock()
+
+
+def get_ingest_batch_size():
+    return getattr(settings, 'INGEST_BATCH_SIZE', DEFAULT_INGEST_BATCH_SIZE)
+
+
+def site_root(url):
+    """
+    Returns the scheme and host of ``url``, e.g. ``https://www.amazon.com/``.
+    """
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}/"
+
+
+def get_website(name, url):
+    """
+    Returns the Website row called ``name``, creating it on first use.
+
+    Parameters:
+        name (str): The marketplace name, e.g. 'Amazon'.
+        url (str): Any URL on the marketplace; only its root is stored.
+
+    Returns:
+        Website: The row, cached for the lifetime of the process.
+    """
+    website = _websites.get(name)
+    if website is None:
+        with _websites_lock:
+            website = _websites.get(name)
+            if website is None:
+                website = Website.objects.filter(name=name).order_by('id').first()
+                if website is None:
+                    website = Website.objects.create(name=name, url=site_root(url))
+                _websites[name] = website
+    return website
+
+
+def clear_website_cache():
+    with _websites_lock:
+        _websites.clear()
+
+
+def sentiment_values(score):
+    """
+    Converts a VADER score dict into the stored (compound score, label) pair.
+    """
+    return score['compound'], sentiment_label(score) or DEFAULT_SENTIMENT_LABEL
+
+
+def add_sentiment(product_data):
+    """
+    Fills in the sentiment score and label of scraped products that do not carry one yet,
+    scoring the distinct review texts of the whole batch at once.
+    """
+    missing = [product for product in product_data
+               if product.get('sentiment_score') is None or not product.get('sentiment_label')]
+    for product, score in zip(missing, score_many(product.get('reviews') for product in missing)):
+        product['sentiment_score'], product['sentiment_label'] = sentiment_values(score)
+    return product_data
+
+
+def rescore_sentiment(queryset=None, batch_size=None):
+    """
+    Recomputes stored sentiment for existing products and writes it back with bulk_update.
+
+    Parameters:
+        queryset (QuerySet, optional): Products to re-score. Defaults to all products.
+        batch_size (int, optional): Rows per UPDATE batch. Defaults to ``settings.INGEST_BATCH_SIZE``.
+
+    Returns:
+        int: The number of products whose stored sentiment changed.
+    """
+    batch_size = batch_size or get_ingest_batch_size()
+    queryset = (queryset if queryset is not None else Product.objects.all())
+    queryset = queryset.only('id', 'reviews', 'sentiment_score', 'sentiment_label').order_by('id')
+    updated = 0
+    batch = []
+
+    def flush():
+        scores = score_many(product.reviews for product in batch)
+        changed = []
+        for product, score in zip(batch, scores):
+            values = sentiment_values(score)
+            if (product.sentiment_score, product.sentiment_label) != values:
+                product.sentiment_score, product.sentiment_label = values
+                changed.append(product)
+        if changed:
+            with transaction.atomic():
+                Product.objects.bulk_update(changed, ['sentiment_score', 'sentiment_label'], batch_size=batch_size)
+        batch.clear()
+        return len(changed)
+
+    for product in queryset.iterator(chunk_size=batch_size):
+        batch.append(product)
+        if len(batch) >= batch_size:
+            updated += flush()
+    if batch:
+        updated += flush()
+    if updated:
+        response_cache.clear()
+    return updated
+
+
+def build_product(product, website, keyword):
+    price_cents, currency = parse_price(product['price'])
+    return Product(
+        name=product['name'],
+        price=product['price'],
+        price_cents=price_cents,
+        currency=currency,
+        reviews=product['reviews'],
+        product_url=product['product_url'],
+        product_key=product_key(product['product_url']),
+        image_url=product['image_url'],
+        website=website,
+        sentiment_score=product['sentiment_score'],
+        sentiment_label=product['sentiment_label'],
+        keyword=keyword,
+    )
+
+
+def changed_fields(stored, product):
+    """
+    Returns the UPSERT_FIELDS whose scraped value differs from the stored row.
+    """
+    fields = []
+    for field in UPSERT_FIELDS:
+        attname = Product._meta.get_field(field).attname
+        if getattr(stored, attname) != getattr(product, attname):
+            fields.append(field)
+    return fields
+
+
+def stored_products(keyword, keys, batch_size):
+    """
+    Loads the rows already stored for ``keyword`` under any of ``keys``, by product key.
+    """
+    stored = {}
+    only = ['product_key'] + [Product._meta.get_field(field).attname for field in UPSERT_FIELDS]
+    for start in range(0, len(keys), batch_size):
+        rows = Product.objects.filter(keyword=keyword, product_key__in=keys[start:start + batch_size]).only(*only)
+        stored.update((row.product_key, row) for row in rows)
+    return stored
+
+
+def ingest_products(website_name, website_url, product_data, keyword, batch_size=None):
+    """
+    Upserts scraped products by (keyword, product_key) with batched writes inside a single
+    transaction. Listings that are already stored unchanged are not written at all; new and
+    changed ones go through one ``bulk_create(update_conflicts=True)`` that only sets the
+    fields that changed. Sentiment is computed here, once, for any product that does not
+    carry it yet, and the scraped price text is parsed into ``price_cents`` and ``currency``.
+
+    Parameters:
+        website_name (str): The marketplace the products were scraped from.
+        website_url (str): A URL on that marketplace, used if its Website row must be created.
+        product_data (list): Product dicts as produced by the scrapers' extract_items().
+        keyword (str): The search keyword the products were found for.
+        batch_size (int, optional): Rows per INSERT. Defaults to ``settings.INGEST_BATCH_SIZE``.
+
+    Returns:
+        IngestResult: The website, keyword, number of rows inserted or updated and seconds taken.
+    """
+    started = time.perf_counter()
+    batch_size = batch_size or get_ingest_batch_size()
+    keyword = normalize_keyword(keyword)
+    website = get_website(website_name, website_url)
+    add_sentiment(product_data)
+
+    products = {}
+    for product in product_data:
+        product = build_product(product, website, keyword)
+        if product.product_key is None:
+            continue  # no URL, so nothing identifies the listing
+        products.setdefault(product.product_key, product)  # a listing can appear twice on a page
+
+    with transaction.atomic():
+        if products:
+            # Unchanged rows keep their scraped_at; the keyword records that they were seen.
+            # Writing first also takes SQLite's write lock up front, so concurrent ingests
+            # wait for each other instead of failing to upgrade a read lock.
+            freshness.record_scrape(keyword)
+        stored = stored_products(keyword, list(products), batch_size)
+        pending = []
+        update_fields = set()
+        for key, product in products.items():
+            if key in stored:
+                fields = changed_fields(stored[key], product)
+                if not fields:
+                    continue
+                update_fields.update(fields)
+            pending.append(product)
+
+        if update_fields:
+            Product.objects.bulk_create(
+                pending, batch_size=batch_size, update_conflicts=True,
+                unique_fields=['keyword', 'product_key'], update_fields=sorted(update_fields) + ['scraped_at'],
+            )
+        elif pending:
+            # Only new listings; a concurrent ingest may have stored some of them meanwhile.
+            Product.objects.bulk_create(pending, batch_size=batch_size, ignore_conflicts=True)
+        if pending:
+            names = [product.name for product in pending]
+            transaction.on_commit(lambda: response_cache.invalidate_for_ingest(keyword, names))
+
+    result = IngestResult(website_name, keyword, len(pending), time.perf_counter() - started)
+    logging.info(
+        f"Ingested {result.rows_written} new or changed {website_name} products for '{keyword}' "
+        f"({len(products) - len(pending)} unchanged) in {result.seconds:.3f}s"
+    )
+    return result
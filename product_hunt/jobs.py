@@ -0,0 +1,166 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import search_index
+from .crawler import crawl_keyword
+from .models import ScrapeJob
+from .scrapers.sites import SITES
+from .singleflight import crawl_once
+
+DEFAULT_SCRAPE_JOB_WORKERS = 4
+DEFAULT_SCRAPE_JOB_TIMEOUT_SECONDS = 15 * 60
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Returns the in-process worker pool that runs scrape jobs, creating it on first use.
+    The number of workers comes from ``settings.SCRAPE_JOB_WORKERS``.
+
+    Jobs left queued or running by a process that died are failed when the pool starts.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                fail_stale_jobs()
+                workers = getattr(settings, 'SCRAPE_JOB_WORKERS', DEFAULT_SCRAPE_JOB_WORKERS)
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scrape-job')
+    return _executor
+
+
+def fail_stale_jobs(queryset=None):
+    """
+    Fails queued jobs created, and running jobs started, more than
+    ``settings.SCRAPE_JOB_TIMEOUT_SECONDS`` ago.
+
+    Jobs run on threads of the process that queued them, so a job whose process exited or
+    crashed would otherwise stay queued or running forever. The timeout is well above the
+    time a crawl takes, as every request of it times out and is retried a bounded number of
+    times; a job that still finishes afterwards records its real outcome.
+
+    Parameters:
+        queryset (QuerySet, optional): The jobs to check. Defaults to every job.
+
+    Returns:
+        int: The number of jobs failed.
+    """
+    timeout = getattr(settings, 'SCRAPE_JOB_TIMEOUT_SECONDS', DEFAULT_SCRAPE_JOB_TIMEOUT_SECONDS)
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    queryset = queryset if queryset is not None else ScrapeJob.objects.all()
+    stale = queryset.filter(
+        Q(status=ScrapeJob.STATUS_QUEUED, created_at__lt=cutoff)
+        | Q(status=ScrapeJob.STATUS_RUNNING, started_at__lt=cutoff)
+    )
+    failed = 0
+    for job in stale:
+        for site_progress in job.progress.values():
+            if site_progress.get('status') in (ScrapeJob.STATUS_QUEUED, ScrapeJob.STATUS_RUNNING):
+                site_progress['status'] = ScrapeJob.STATUS_FAILED
+        # Conditional on the status read, so a job finishing meanwhile keeps its outcome.
+        failed += ScrapeJob.objects.filter(pk=job.pk, status=job.status).update(
+            status=ScrapeJob.STATUS_FAILED,
+            progress=job.progress,
+            error=f'Scrape job timed out after {timeout} seconds',
+            finished_at=timezone.now(),
+        )
+    if failed:
+        logging.warning(f'Failed {failed} stale scrape job(s)')
+    return failed
+
+
+def enqueue_scrape(keyword):
+    """
+    Records a queued ScrapeJob for ``keyword`` and hands it to the worker pool.
+
+    Parameters:
+        keyword (str): The search keyword.
+
+    Returns:
+        ScrapeJob: The queued job.
+    """
+    job = ScrapeJob.objects.create(
+        keyword=keyword,
+        progress={site.name: {'status': ScrapeJob.STATUS_QUEUED} for site in SITES},
+    )
+    # Submit only once the row is visible to the worker's own connection.
+    transaction.on_commit(lambda: get_executor().submit(run_job, job.pk))
+    return job
+
+
+class JobProgress:
+    """
+    Collects per-site progress reported by the crawler threads and saves it on the job row.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.lock = threading.Lock()
+
+    def mark_running(self):
+        for site_progress in self.job.progress.values():
+            site_progress['status'] = ScrapeJob.STATUS_RUNNING
+        self.save()
+
+    def site_done(self, keyword, site, result):
+        with self.lock:
+            if result is None:
+                self.job.progress[site.name] = {'status': ScrapeJob.STATUS_FAILED}
+            else:
+                self.job.progress[site.name] = {
+                    'status': ScrapeJob.STATUS_SUCCEEDED,
+                    'rows_written': result.rows_written,
+                    'seconds': round(result.seconds, 3),
+                }
+            self.save()
+
+    def shared_crawl(self):
+        # Another job or request crawled this keyword while this job waited for it.
+        for site_progress in self.job.progress.values():
+            site_progress['status'] = 'shared'
+        self.save()
+
+    def save(self):
+        ScrapeJob.objects.filter(pk=self.job.pk).update(progress=self.job.progress)
+
+
+def run_job(job_id):
+    """
+    Runs a queued ScrapeJob on a worker thread with the existing scrapers and records the outcome.
+    """
+    close_old_connections()
+    try:
+        job = ScrapeJob.objects.get(pk=job_id)
+        job.status = ScrapeJob.STATUS_RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+
+        progress = JobProgress(job)
+        progress.mark_running()
+        try:
+            ran = crawl_once(job.keyword, lambda: crawl_keyword(job.keyword, on_site_done=progress.site_done))
+            if not ran:
+                progress.shared_crawl()
+            job.product_count = search_index.search(job.keyword, fields=('keyword',)).count()
+            job.status = ScrapeJob.STATUS_SUCCEEDED if job.product_count else ScrapeJob.STATUS_FAILED
+            if not job.product_count:
+                job.error = 'Failed to scrape data'
+        except Exception as e:
+            logging.error(f'Scrape job {job_id} failed: {str(e)}')
+            job.status = ScrapeJob.STATUS_FAILED
+            job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'product_count', 'error', 'finished_at'])
+    except Exception as e:
+        logging.error(f'Could not run scrape job {job_id}: {str(e)}')
+    finally:
+        connection.close()
@@ -0,0 +1,93 @@
+import json
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from product_hunt.benchmarks.parsing import compare_runs, measure_pool_scaling, run_parse_benchmark
+
+
+def default_results_dir():
+    return Path(getattr(settings, 'BENCHMARK_RESULTS_DIR', Path(settings.BASE_DIR) / 'benchmark_results'))
+
+
+class Command(BaseCommand):
+    help = "Benchmarks page parsing and extraction of every scraper over fixture pages, offline"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sites', nargs='*', help="Sites to benchmark (Amazon, Ebay, Newegg). Defaults to all")
+        parser.add_argument('--parsers', nargs='*', help="Parser backends. Defaults to every available one")
+        parser.add_argument('--repeat', type=int, default=20, help="Timed runs per page")
+        parser.add_argument('--fixtures', help="Directory with manifest.json and saved pages, e.g. captured from the live sites")
+        parser.add_argument('--full-parse', action='store_true', help="Build the full DOM instead of only the spec regions")
+        parser.add_argument('--no-memory', action='store_true', help="Skip the peak memory measurement")
+        parser.add_argument('--output', help="JSON results file. Defaults to a timestamped file in BENCHMARK_RESULTS_DIR")
+        parser.add_argument('--workers', type=int, nargs='*',
+                            help="Also measure parse throughput through the process pool with these worker counts (0 = inline)")
+        parser.add_argument('--compare', help="Earlier results file to compare with. Defaults to the latest one")
+
+    def handle(self, *args, **options):
+        run = run_parse_benchmark(
+            sites=options['sites'],
+            parsers=options['parsers'],
+            repeat=max(1, options['repeat']),
+            fixtures_dir=options['fixtures'],
+            memory=not options['no_memory'],
+            partial=False if options['full_parse'] else None,
+        )
+
+        if options['workers']:
+            run['pool_scaling'] = measure_pool_scaling(
+                options['workers'],
+                sites=options['sites'],
+                parser=(options['parsers'] or [None])[0],
+                fixtures_dir=options['fixtures'],
+            )
+
+        results_dir = default_results_dir()
+        baseline_path = options['compare']
+        if baseline_path is None and results_dir.is_dir():
+            previous = sorted(results_dir.glob('parsing-*.json'))
+            baseline_path = previous[-1] if previous else None
+
+        output = Path(options['output'] or results_dir / f"parsing-{datetime.now():%Y%m%d-%H%M%S}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(run, indent=2))
+
+        self.stdout.write(
+            f"{'site':<8} {'parser':<12} {'items':>5} {'parse ms':>9} {'extract ms':>11} "
+            f"{'pages/s':>8} {'items/s':>9} {'py peak KB':>11} {'rss KB':>8}"
+        )
+        for case in run['results']:
+            rss = case.get('peak_rss_delta_bytes')
+            self.stdout.write(
+                f"{case['site']:<8} {case['parser']:<12} {case['items']:>5} {case['parse_ms']:>9.2f} "
+                f"{case['extract_ms']:>11.2f} {case['pages_per_sec']:>8.1f} {case['items_per_sec']:>9.0f} "
+                f"{case.get('peak_python_bytes', 0) / 1024:>11.0f} {'-' if rss is None else f'{rss / 1024:.0f}':>8}"
+            )
+            fields = ', '.join(f"{field} {us:.1f}" for field, us in case['field_us_per_item'].items())
+            self.stdout.write(f"{'':<8} per-item field extraction (us): {fields}")
+            if not case['items_ok'] or not case['next_page_ok']:
+                self.stderr.write(
+                    f"WARNING: {case['site']}/{case['parser']} extracted {case['items']} items "
+                    f"(expected {case['expected_items']}), next page {'ok' if case['next_page_ok'] else 'wrong'}"
+                )
+
+        for scaling in run.get('pool_scaling', []):
+            self.stdout.write(
+                f"parse pool with {scaling['workers']:>2} workers: {scaling['pages_per_sec']:>8.1f} pages/s "
+                f"({scaling['seconds']:.2f}s)"
+            )
+
+        if baseline_path:
+            baseline = json.loads(Path(baseline_path).read_text())
+            pairs = compare_runs(run, baseline)
+            if not pairs:
+                self.stdout.write(f"Not compared with {baseline_path}: no case ran over the same fixture pages")
+            for case, old, change in pairs:
+                self.stdout.write(
+                    f"{case['site']:<8} {case['parser']:<12} {old['pages_per_sec']:>8.1f} -> "
+                    f"{case['pages_per_sec']:>8.1f} pages/s ({change:+.1%}) vs {baseline.get('git_revision') or baseline_path}"
+                )
+        self.stdout.write(f"Results written to {output}")
@@ -0,0 +1,78 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from product_hunt.scrapers import page_cache
+from product_hunt.scrapers.parsers import available_parsers
+from product_hunt.scrapers.sites import get_site
+
+BASELINE_PARSER = 'html.parser'
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares per-page parse and extraction time of the parser backends on saved search pages. "
+        "Pages are parsed in this process with the page cache disabled, so nothing is written"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('site', help="Site whose scraper parses the pages (Amazon, Ebay or Newegg)")
+        parser.add_argument('html_files', nargs='+', help="Saved search result pages")
+        parser.add_argument('--repeat', type=int, default=5, help="Times each page is parsed per backend")
+        parser.add_argument('--parsers', nargs='*', help="Backends to compare. Defaults to all available")
+
+    def handle(self, *args, **options):
+        site = get_site(options['site'])
+        if site is None:
+            raise CommandError(f"Unknown site: {options['site']}")
+        pages = []
+        for path in options['html_files']:
+            with open(path, encoding='utf-8', errors='replace') as html_file:
+                pages.append((path, html_file.read()))
+
+        parsers = options['parsers'] or available_parsers()
+        if BASELINE_PARSER not in parsers:
+            parsers = [BASELINE_PARSER] + parsers
+        repeat = max(1, options['repeat'])
+
+        # Only the backend is timed: no parse pool IPC and no page cache hits or writes.
+        page_cache.reset_page_cache()
+        try:
+            with override_settings(SCRAPER_PAGE_CACHE={'ENABLED': False}):
+                timings = self.time_parsers(site, parsers, pages, repeat)
+        finally:
+            page_cache.reset_page_cache()
+        if BASELINE_PARSER not in timings:
+            raise CommandError(f"The baseline parser {BASELINE_PARSER} is not available")
+
+        baseline = sum(timings[BASELINE_PARSER][:2])
+        self.stdout.write(f"{'parser':<12} {'parse ms':>9} {'extract ms':>11} {'total ms':>9} {'items':>6} {'speedup':>8}")
+        for name, (parse_time, extract_time, items) in timings.items():
+            total = parse_time + extract_time
+            self.stdout.write(
+                f"{name:<12} {parse_time * 1000:>9.2f} {extract_time * 1000:>11.2f} {total * 1000:>9.2f} "
+                f"{items:>6} {baseline / total:>7.1f}x"
+            )
+
+    def time_parsers(self, site, parsers, pages, repeat):
+        timings = {}
+        for name in parsers:
+            if name not in available_parsers():
+                self.stderr.write(f"Skipping unavailable parser: {name}")
+                continue
+            scraper = site.scraper_class(site.search_url, parser=name)
+            scraper.extract_page(pages[0][1])  # warm up selectors and imports
+            parse_seconds = extract_seconds = 0.0
+            items = 0
+            for _ in range(repeat):
+                for path, html_text in pages:
+                    started = time.perf_counter()
+                    soup = scraper.parse_html(html_text)
+                    parsed = time.perf_counter()
+                    items += len(scraper.extract_items(soup))
+                    parse_seconds += parsed - started
+                    extract_seconds += time.perf_counter() - parsed
+            runs = repeat * len(pages)
+            timings[name] = (parse_seconds / runs, extract_seconds / runs, items // repeat)
+        return timings
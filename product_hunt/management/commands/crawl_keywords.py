@@ -0,0 +1,105 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from product_hunt.bulk_crawl import BulkCrawler, CrawlRunError, default_run_name, prepare_run, read_keywords
+from product_hunt.crawler import ENGINE_ASYNC, ENGINE_THREADED
+from product_hunt.models import CrawlRun, CrawlRunKeyword
+from product_hunt.scrapers.parse_pool import enable_parse_pool
+from product_hunt.scrapers.sites import SITES, get_site
+
+
+class Command(BaseCommand):
+    help = (
+        "Crawls and stores many keywords with the scrapers, checkpointing progress in the database so "
+        "an interrupted run resumes where it stopped. Run one process per crawl run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', nargs='?',
+                            help="File with one keyword per line, or - for stdin. May be omitted to resume --run")
+        parser.add_argument('--run', help="Name of the crawl run to create or resume. Defaults to one derived from the keywords")
+        parser.add_argument('--sites', nargs='*', help="Sites to crawl (Amazon, Ebay, Newegg). Defaults to all")
+        parser.add_argument('--concurrency', type=int, help="Keywords crawled at the same time")
+        parser.add_argument('--per-site', type=int, help="Keywords crawled at the same time on any one site")
+        parser.add_argument('--max-pages', type=int, help="Search pages scraped per keyword and site")
+        parser.add_argument('--engine', choices=[ENGINE_ASYNC, ENGINE_THREADED], help="Defaults to SCRAPER_ENGINE")
+        parser.add_argument('--retry-failed', action='store_true', help="Crawl keywords that failed before again")
+        parser.add_argument('--restart', action='store_true', help="Forget the run's progress and crawl every keyword again")
+        parser.add_argument('--stats-every', type=float, default=10, help="Seconds between throughput reports")
+        parser.add_argument('--parse-workers', type=int,
+                            help="Parse pages in this many processes. Without it pages are parsed inline unless SCRAPER_PARSE_POOL is enabled")
+
+    def handle(self, *args, **options):
+        sites = SITES
+        if options['sites']:
+            sites = [get_site(name) for name in options['sites']]
+            if None in sites:
+                unknown = [name for name, site in zip(options['sites'], sites) if site is None]
+                raise CommandError(f"Unknown site: {', '.join(unknown)}")
+
+        source = options['source']
+        if source is None:
+            if not options['run']:
+                raise CommandError("Give a keyword file, - for stdin, or --run to resume a crawl run")
+            run = CrawlRun.objects.filter(name=options['run']).first()
+            if run is None:
+                raise CommandError(f"Unknown crawl run: {options['run']}")
+            if not options['sites']:
+                sites = [get_site(name) for name in run.sites]
+            keywords = []
+        elif source == '-':
+            keywords = read_keywords(sys.stdin)
+        else:
+            try:
+                with open(source, encoding='utf-8') as keyword_file:
+                    keywords = read_keywords(keyword_file)
+            except OSError as e:
+                raise CommandError(f"Cannot read keywords: {str(e)}")
+
+        name = options['run'] or default_run_name('stdin' if source == '-' else Path(source).stem, keywords)
+        try:
+            run, entries = prepare_run(
+                name, keywords, sites, restart=options['restart'], retry_failed=options['retry_failed'],
+            )
+        except CrawlRunError as e:
+            raise CommandError(str(e))
+        total = run.keywords.count()
+        self.stdout.write(
+            f"Crawl run {run.name}: {len(entries)} of {total} keywords to crawl on {', '.join(site.name for site in sites)}"
+        )
+
+        report_lock = threading.Lock()
+        last_report = [time.monotonic()]
+
+        def report(entry, stats):
+            with report_lock:
+                if time.monotonic() - last_report[0] >= options['stats_every']:
+                    last_report[0] = time.monotonic()
+                    self.stdout.write(stats.summary())
+
+        if options['parse_workers']:
+            enable_parse_pool(options['parse_workers'])
+        crawler = BulkCrawler(
+            run,
+            sites=sites,
+            concurrency=options['concurrency'],
+            site_concurrency=options['per_site'],
+            max_pages=options['max_pages'],
+            engine=options['engine'],
+            on_keyword_done=report,
+        )
+        try:
+            stats = crawler.crawl(entries)
+        except KeyboardInterrupt:
+            if crawler.stats is not None:
+                self.stdout.write(crawler.stats.summary())
+            self.stderr.write(f"Interrupted; resume with: manage.py crawl_keywords --run {run.name}")
+            sys.exit(130)
+        self.stdout.write(stats.summary())
+        failed = run.keywords.filter(status=CrawlRunKeyword.STATUS_FAILED).count()
+        if failed:
+            self.stdout.write(f"{failed} keywords failed; crawl them again with --run {run.name} --retry-failed")
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from product_hunt.refresh_scheduler import RefreshScheduler
+from product_hunt.scrapers.parse_pool import enable_parse_pool
+
+
+class Command(BaseCommand):
+    help = (
+        "Keeps popular keywords fresh: refreshes the stored keywords with the highest popularity x staleness "
+        "within a request budget per site, every interval, until interrupted"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help="Seconds between ticks. Defaults to REFRESH_SCHEDULER['INTERVAL_SECONDS']")
+        parser.add_argument('--once', action='store_true', help="Run a single tick, e.g. from cron")
+        parser.add_argument('--dry-run', action='store_true', help="Print the top of the refresh queue without refreshing")
+        parser.add_argument('--parse-workers', type=int,
+                            help="Parse pages in this many processes. Without it pages are parsed inline unless SCRAPER_PARSE_POOL is enabled")
+
+    def handle(self, *args, **options):
+        scheduler = RefreshScheduler(interval=options['interval'])
+
+        if options['dry_run']:
+            refreshed, queued = scheduler.tick(dry_run=True)
+            self.stdout.write(f"{queued} keywords due for a refresh; the budget allows {len(refreshed)} now:")
+            for candidate in refreshed:
+                self.stdout.write(
+                    f"  {candidate.score:>10.2f}  popularity {candidate.popularity:>8.2f}  "
+                    f"staleness {candidate.staleness:>5.2f}  {candidate.keyword}"
+                )
+            return
+
+        def report(refreshed, queued, tokens):
+            budget = ', '.join(f"{name} {left:.1f}" for name, left in tokens.items())
+            keywords = ', '.join(candidate.keyword for candidate in refreshed) or 'none'
+            self.stdout.write(f"Refreshing {len(refreshed)} of {queued} due keywords ({keywords}); requests left: {budget}")
+
+        # Refreshes run as scrape jobs in this process.
+        if options['parse_workers']:
+            enable_parse_pool(options['parse_workers'])
+        try:
+            scheduler.run(ticks=1 if options['once'] else None, on_tick=report)
+        except KeyboardInterrupt:
+            self.stdout.write("Refresh scheduler stopped")
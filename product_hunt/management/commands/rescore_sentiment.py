@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from product_hunt.ingestion import rescore_sentiment
+from product_hunt.models import Product
+
+
+class Command(BaseCommand):
+    help = "Recomputes the stored sentiment score and label of products in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keyword', help="Only re-score products scraped for this keyword")
+        parser.add_argument('--batch-size', type=int, help="Rows per UPDATE batch")
+
+    def handle(self, *args, **options):
+        products = Product.objects.all()
+        if options['keyword']:
+            products = products.filter(keyword=options['keyword'])
+        updated = rescore_sentiment(products, batch_size=options['batch_size'])
+        self.stdout.write(f"Updated sentiment of {updated} products")
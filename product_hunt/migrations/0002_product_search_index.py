@@ -0,0 +1,21 @@
+from django.db import migrations
+
+from product_hunt.search_index import install_search_index, uninstall_search_index
+
+
+def forwards(apps, schema_editor):
+    install_search_index(schema_editor)
+
+
+def backwards(apps, schema_editor):
+    uninstall_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("product_hunt", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
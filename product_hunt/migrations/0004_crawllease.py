@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-18 12:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_hunt', '0003_scrapejob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrawlLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('owner', models.CharField(max_length=255)),
+                ('acquired_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
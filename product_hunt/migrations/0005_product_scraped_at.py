@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-18 12:55
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_hunt', '0004_crawllease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='scraped_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
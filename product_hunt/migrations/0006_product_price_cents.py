@@ -0,0 +1,49 @@
+# Generated by Django 4.2 on 2026-10-18 12:58
+
+from django.db import migrations, models
+
+from product_hunt.prices import parse_price
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def backfill_price_cents(apps, schema_editor):
+    Product = apps.get_model('product_hunt', 'Product')
+    batch = []
+    for product in Product.objects.only('id', 'price').order_by('id').iterator(chunk_size=BACKFILL_BATCH_SIZE):
+        product.price_cents, product.currency = parse_price(product.price)
+        batch.append(product)
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            Product.objects.bulk_update(batch, ['price_cents', 'currency'])
+            batch = []
+    if batch:
+        Product.objects.bulk_update(batch, ['price_cents', 'currency'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_hunt', '0005_product_scraped_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='currency',
+            field=models.CharField(default='USD', max_length=3),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='price_cents',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price_cents', 'id'], name='product_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['currency', 'price_cents'], name='product_currency_price_idx'),
+        ),
+        migrations.RunPython(backfill_price_cents, migrations.RunPython.noop),
+    ]
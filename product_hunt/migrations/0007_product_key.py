@@ -0,0 +1,124 @@
+# Generated by Django 4.2 on 2026-10-18 13:02
+
+import re
+from urllib.parse import parse_qsl, urljoin, urlsplit
+
+from django.db import migrations, models
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+BACKFILL_BATCH_SIZE = 500
+
+# Frozen copies of identity.product_key and singleflight.normalize_keyword as they were when
+# this migration was written, so later changes to either never change what it does.
+_amazon_asin_re = re.compile(r'/(?:dp|gp/product|gp/aw/d|exec/obidos/asin)/([A-Z0-9]{10})(?:[/?]|$)', re.IGNORECASE)
+_ebay_item_re = re.compile(r'/itm/(?:[^/]+/)?(\d{9,15})(?:[/?]|$)')
+_newegg_item_re = re.compile(r'/p/(N82E\d{11}|[0-9A-Z]{3}-[0-9A-Z]{4}-[0-9A-Z]{5})(?:[/?]|$)', re.IGNORECASE)
+_newegg_query_re = re.compile(r'^(?:N82E\d{11}|[0-9A-Z]{3}-[0-9A-Z]{4}-[0-9A-Z]{5})$', re.IGNORECASE)
+IDENTIFYING_PARAMS = {'item', 'itemid', 'id', 'asin', 'sku'}
+
+
+def normalize_keyword(keyword):
+    return ' '.join((keyword or '').lower().split())
+
+
+def normalize_url(url):
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = re.sub(r'/+', '/', parts.path).rstrip('/')
+    params = sorted((name.lower(), value) for name, value in parse_qsl(parts.query) if name.lower() in IDENTIFYING_PARAMS)
+    query = '&'.join(f'{name}={value}' for name, value in params)
+    return f"{host}{path}" + (f"?{query}" if query else '')
+
+
+def product_key(url):
+    if not url:
+        return None
+    parts = urlsplit(url)
+    if '/sspa/click' in parts.path:
+        target = dict(parse_qsl(parts.query)).get('url')
+        if target:
+            url = urljoin(url, target)
+            parts = urlsplit(url)
+    host = parts.netloc.lower()
+    if 'amazon.' in host:
+        match = _amazon_asin_re.search(parts.path)
+        if match:
+            return f"amazon:{match.group(1).upper()}"
+    if 'ebay.' in host:
+        match = _ebay_item_re.search(parts.path)
+        if match:
+            return f"ebay:{match.group(1)}"
+    if 'newegg.' in host:
+        match = _newegg_item_re.search(parts.path)
+        if match:
+            return f"newegg:{match.group(1).upper()}"
+        item = dict((name.lower(), value) for name, value in parse_qsl(parts.query)).get('item')
+        if item and _newegg_query_re.match(item):
+            return f"newegg:{item.upper()}"
+    return f"url:{normalize_url(url)}"[:255]
+
+
+def backfill_product_key(apps, schema_editor):
+    """
+    Keys every existing product under its normalized keyword, as ingestion stores and upserts
+    them, and deletes the duplicates of a listing scraped several times for the same keyword
+    (e.g. as 'iPhone' and 'iphone'), keeping the most recently scraped row.
+
+    Both passes work BACKFILL_BATCH_SIZE rows at a time, so memory use does not grow with
+    the table.
+    """
+    Product = apps.get_model('product_hunt', 'Product')
+    last_id = 0
+    while True:
+        batch = list(
+            Product.objects.filter(id__gt=last_id).order_by('id')
+            .only('id', 'keyword', 'product_url', 'product_key')[:BACKFILL_BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+        changed = []
+        for product in batch:
+            identity = (normalize_keyword(product.keyword), product_key(product.product_url) or f"row:{product.id}")
+            if (product.keyword, product.product_key) != identity:
+                product.keyword, product.product_key = identity
+                changed.append(product)
+        Product.objects.bulk_update(changed, ['keyword', 'product_key'])
+
+    # Every row but the newest of each (keyword, product_key); deleting a batch takes those
+    # rows out of the next query.
+    duplicates = Product.objects.annotate(
+        newer=Window(
+            RowNumber(),
+            partition_by=[F('keyword'), F('product_key')],
+            order_by=[F('scraped_at').desc(), F('id').desc()],
+        ),
+    ).filter(newer__gt=1).values_list('id', flat=True)
+    while True:
+        ids = list(duplicates[:BACKFILL_BATCH_SIZE])
+        if not ids:
+            break
+        Product.objects.filter(id__in=ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_hunt', '0006_product_price_cents'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='product_key',
+            field=models.CharField(default='', max_length=255),
+        ),
+        migrations.RunPython(backfill_product_key, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.UniqueConstraint(fields=('keyword', 'product_key'), name='product_keyword_key_uniq'),
+        ),
+    ]
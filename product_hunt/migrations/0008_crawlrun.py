@@ -0,0 +1,51 @@
+# Generated by Django 4.2 on 2026-10-18 13:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_hunt', '0007_product_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrawlRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('finished', 'Finished')], default='running', max_length=20)),
+                ('sites', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CrawlRunKeyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('keyword', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('progress', models.JSONField(blank=True, default=dict)),
+                ('pages', models.IntegerField(default=0)),
+                ('items', models.IntegerField(default=0)),
+                ('rows_written', models.IntegerField(default=0)),
+                ('attempts', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='keywords', to='product_hunt.crawlrun')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='crawlrunkeyword',
+            index=models.Index(fields=['run', 'status', 'position'], name='crawl_run_status_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='crawlrunkeyword',
+            constraint=models.UniqueConstraint(fields=('run', 'keyword'), name='crawl_run_keyword_uniq'),
+        ),
+    ]
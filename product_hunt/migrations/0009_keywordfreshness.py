@@ -0,0 +1,43 @@
+# Generated by Django 4.2 on 2026-10-18 13:33
+
+from django.db import migrations, models
+from django.db.models import Max
+
+from product_hunt.singleflight import normalize_keyword
+
+
+def backfill_keyword_freshness(apps, schema_editor):
+    """
+    Dates every keyword already stored by its most recently scraped product.
+    """
+    Product = apps.get_model('product_hunt', 'Product')
+    KeywordFreshness = apps.get_model('product_hunt', 'KeywordFreshness')
+    scraped = {}
+    for row in Product.objects.values('keyword').annotate(scraped_at=Max('scraped_at')).iterator():
+        keyword = normalize_keyword(row['keyword'])
+        if keyword and (keyword not in scraped or row['scraped_at'] > scraped[keyword]):
+            scraped[keyword] = row['scraped_at']
+    KeywordFreshness.objects.bulk_create(
+        [KeywordFreshness(keyword=keyword[:255], scraped_at=scraped_at) for keyword, scraped_at in scraped.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_hunt', '0008_crawlrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KeywordFreshness',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('keyword', models.CharField(max_length=255, unique=True)),
+                ('scraped_at', models.DateTimeField()),
+                ('refreshing_since', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_keyword_freshness, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-18 13:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_hunt', '0009_keywordfreshness'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KeywordAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('keyword', models.CharField(max_length=255, unique=True)),
+                ('access_count', models.BigIntegerField(default=0)),
+                ('last_accessed_at', models.DateTimeField(blank=True, null=True)),
+                ('popularity', models.FloatField(db_index=True, default=0.0)),
+                ('popularity_at', models.DateTimeField(blank=True, null=True)),
+                ('counted_accesses', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
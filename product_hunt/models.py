@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 class Website(models.Model):
     name = models.CharField(max_length=255)
@@ -10,14 +11,162 @@ class Website(models.Model):
 class Product(models.Model):
     name = models.CharField(max_length=255)
     # price = models.DecimalField(max_digits=10, decimal_places=2)
-    price = models.CharField(max_length=255, default="$ 0.0")
+    price = models.CharField(max_length=255, default="$ 0.0")  # as scraped, e.g. "$10.00 to $20.00"
+    price_cents = models.PositiveIntegerField(null=True, blank=True)  # parsed lower bound, None if unknown
+    currency = models.CharField(max_length=3, default="USD")
     reviews = models.TextField()
     product_url = models.URLField()
+    # Canonical listing identity (ASIN, eBay item id, Newegg item number or normalized URL), see identity.py
+    product_key = models.CharField(max_length=255, default="")
     image_url = models.URLField()
     website = models.ForeignKey(Website, on_delete=models.CASCADE)
     sentiment_score = models.FloatField(default=0.5)
     sentiment_label = models.CharField(max_length=255, default="Neutral")
     keyword = models.CharField(max_length=255)  # Add this field
+    scraped_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        constraints = [
+            # One row per listing and keyword; re-scrapes update it in place. A listing found for
+            # several keywords keeps one row per keyword on purpose: each keyword's results are
+            # scraped, refreshed, cached and ranked on their own. Storing listings once with a
+            # keyword link table would deduplicate them, and is not done here.
+            models.UniqueConstraint(fields=["keyword", "product_key"], name="product_keyword_key_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["price_cents", "id"], name="product_price_idx"),
+            models.Index(fields=["currency", "price_cents"], name="product_currency_price_idx"),
+        ]
 
     def __str__(self):
         return f"Review for {self.name}"
+
+
+class ScrapeJob(models.Model):
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    keyword = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    progress = models.JSONField(default=dict, blank=True)  # per-site status and rows written
+    product_count = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_SUCCEEDED, self.STATUS_FAILED)
+
+    def __str__(self):
+        return f"Scrape job {self.pk} for {self.keyword} ({self.status})"
+
+
+class CrawlLease(models.Model):
+    """
+    Marks a crawl in progress so other processes wait for it instead of starting their own.
+    """
+    key = models.CharField(max_length=255, unique=True)
+    owner = models.CharField(max_length=255)
+    acquired_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Lease on {self.key} held by {self.owner}"
+
+
+class CrawlRun(models.Model):
+    """
+    A bulk keyword crawl started by ``manage.py crawl_keywords``; its keywords are checkpointed
+    so an interrupted run resumes where it stopped.
+    """
+    STATUS_RUNNING = "running"
+    STATUS_FINISHED = "finished"
+    STATUS_CHOICES = [
+        (STATUS_RUNNING, "Running"),
+        (STATUS_FINISHED, "Finished"),
+    ]
+
+    name = models.CharField(max_length=255, unique=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_RUNNING)
+    sites = models.JSONField(default=list, blank=True)  # names of the sites crawled
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Crawl run {self.name} ({self.status})"
+
+
+class CrawlRunKeyword(models.Model):
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    run = models.ForeignKey(CrawlRun, on_delete=models.CASCADE, related_name="keywords")
+    position = models.PositiveIntegerField()  # order of the keyword in the input
+    keyword = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    progress = models.JSONField(default=dict, blank=True)  # per-site status, pages, items and rows written
+    pages = models.IntegerField(default=0)
+    items = models.IntegerField(default=0)
+    rows_written = models.IntegerField(default=0)
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["run", "keyword"], name="crawl_run_keyword_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["run", "status", "position"], name="crawl_run_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.keyword} in crawl run {self.run_id} ({self.status})"
+
+
+class KeywordFreshness(models.Model):
+    """
+    When the results of a keyword were last scraped, so stored results can be served while
+    fresh, refreshed in the background while stale and recrawled once expired.
+    """
+    keyword = models.CharField(max_length=255, unique=True)  # normalized, see singleflight.normalize_keyword
+    scraped_at = models.DateTimeField()  # last crawl that stored products for the keyword
+    refreshing_since = models.DateTimeField(null=True, blank=True)  # background refresh in flight
+
+    def __str__(self):
+        return f"{self.keyword} scraped at {self.scraped_at}"
+
+
+class KeywordAccess(models.Model):
+    """
+    How often a keyword is requested, so the refresh scheduler keeps popular keywords fresh.
+    """
+    keyword = models.CharField(max_length=255, unique=True)  # normalized, see singleflight.normalize_keyword
+    access_count = models.BigIntegerField(default=0)  # requests so far, incremented by the API
+    last_accessed_at = models.DateTimeField(null=True, blank=True)
+    # Requests with exponential decay, folded in from access_count by the refresh scheduler
+    popularity = models.FloatField(default=0.0, db_index=True)
+    popularity_at = models.DateTimeField(null=True, blank=True)  # when popularity was last decayed
+    counted_accesses = models.BigIntegerField(default=0)  # access_count already folded into popularity
+
+    def __str__(self):
+        return f"{self.keyword} requested {self.access_count} times"
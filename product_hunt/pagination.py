@@ -0,0 +1,229 @@
+import base64
+import json
+import math
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import QueryDict
+
+from .prices import amount_to_cents
+from .search_index import PRODUCT_TABLE, rank_sql, row_rank_sql
+from .serializers import ProductListSerializer, ProductProjectionSerializer
+
+DEFAULT_PAGE_SIZE = 50
+DEFAULT_MAX_PAGE_SIZE = 500
+
+PRODUCT_FIELDS = [
+    'id', 'name', 'price', 'price_cents', 'currency', 'reviews', 'product_url', 'product_key', 'image_url', 'website',
+    'sentiment_score', 'sentiment_label', 'keyword',
+]
+
+# ``sort`` values and the keyset each one pages by; the last column is always unique.
+SORT_ORDERS = {
+    'id': ('id',),
+    'price': ('price_cents', 'id'),
+    '-price': ('-price_cents', '-id'),
+}
+
+# Search results are sorted best match first by default and page by (search_rank, id).
+SORT_RELEVANCE = 'relevance'
+RANK_COLUMN = 'search_rank'
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def encode_cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """
+    Returns the keyset position stored in ``cursor`` as a dict of ``columns`` to integers,
+    or to a float for the search rank.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        decoded = {column: (float if column == RANK_COLUMN else int)(position[column]) for column in columns}
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise PaginationError('Invalid cursor')
+    if not all(math.isfinite(value) for value in decoded.values()):
+        raise PaginationError('Invalid cursor')
+    return decoded
+
+
+def keyset_condition(order, position):
+    """
+    Builds the filter selecting rows after ``position`` in ``order``, e.g. for
+    ('price_cents', 'id'): price_cents > p OR (price_cents = p AND id > i).
+    """
+    condition = Q()
+    columns = [term.lstrip('-') for term in order]
+    for index, term in enumerate(order):
+        lookup = 'lt' if term.startswith('-') else 'gt'
+        equal = {column: position[column] for column in columns[:index]}
+        condition |= Q(**equal, **{f'{columns[index]}__{lookup}': position[columns[index]]})
+    return condition
+
+
+def rank_keyset_condition(rank, row_rank, position):
+    """
+    Builds the SQL selecting search results after ``position`` in relevance order:
+    rank worse than r OR (rank = r AND id > i), where r is the current rank of row i.
+
+    Parameters:
+        rank (tuple): ``(sql, params, descending)`` as returned by search_index.rank_sql.
+        row_rank (tuple): ``(sql, params)`` as returned by search_index.row_rank_sql.
+        position (dict): The ``search_rank`` and ``id`` of the last row of the previous page.
+
+    Returns:
+        tuple: ``(where, params)`` for ``QuerySet.extra``.
+
+    Ranks depend on the whole index (bm25 and ts_rank weigh terms by how rare they are), so
+    every write between two page requests moves the rank of every row. Recomputing the rank
+    of the cursor's row in the same statement keeps the rows ranked before it out of the next
+    page; the rank stored in the cursor is only used once that row is gone or no longer matches.
+    """
+    sql, params, descending = rank
+    row_sql, row_params = row_rank
+    worse = '<' if descending else '>'
+    current = f"COALESCE(({row_sql}), %s)"
+    current_params = [*row_params, position['id'], position[RANK_COLUMN]]
+    where = f"(({sql}) {worse} {current} OR (({sql}) = {current} AND {PRODUCT_TABLE}.id > %s))"
+    return where, [*params, *current_params, *params, *current_params, position['id']]
+
+
+class ProductPage:
+
+    def __init__(self, query_params, search=None):
+        """
+        Reads the pagination and projection parameters of a product list request.
+
+        Args:
+            query_params (QueryDict): The request's query parameters:
+                ``limit`` (page size), ``cursor`` (opaque keyset cursor from the previous page),
+                ``fields`` (comma-separated product fields to return), ``sort`` ('relevance',
+                'id', 'price' or '-price'), ``min_price``/``max_price`` (amounts such as '19.99')
+                and ``currency``.
+            search (tuple, optional): ``(query, fields)`` when the pages come from
+                search_index.search; they are then sorted by relevance unless ``sort`` says
+                otherwise.
+
+        Returns:
+            None
+
+        Raises PaginationError for malformed parameters.
+        """
+        page_size = getattr(settings, 'PRODUCT_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+        max_page_size = getattr(settings, 'PRODUCT_MAX_PAGE_SIZE', DEFAULT_MAX_PAGE_SIZE)
+        try:
+            self.limit = int(query_params.get('limit') or page_size)
+        except ValueError:
+            raise PaginationError('limit must be an integer')
+        if self.limit < 1:
+            raise PaginationError('limit must be positive')
+        self.limit = min(self.limit, max_page_size)
+
+        # Without a full-text index search results have no rank and page by id.
+        self.rank = rank_sql(*search) if search else None
+        self.row_rank = row_rank_sql(*search) if self.rank else None
+        sorts = ([SORT_RELEVANCE] if self.rank else []) + list(SORT_ORDERS)
+        self.sort = query_params.get('sort') or sorts[0]
+        if self.sort not in sorts:
+            raise PaginationError(f"sort must be one of {', '.join(sorts)}")
+        if self.sort == SORT_RELEVANCE:
+            self.order = ('-' + RANK_COLUMN if self.rank[2] else RANK_COLUMN, 'id')
+        else:
+            self.order = SORT_ORDERS[self.sort]
+        self.order_columns = [term.lstrip('-') for term in self.order]
+
+        cursor = query_params.get('cursor')
+        self.after = decode_cursor(cursor, self.order_columns) if cursor else None
+
+        try:
+            self.min_price_cents = amount_to_cents(query_params['min_price']) if query_params.get('min_price') else None
+            self.max_price_cents = amount_to_cents(query_params['max_price']) if query_params.get('max_price') else None
+        except ValueError:
+            raise PaginationError('min_price and max_price must be non-negative numbers')
+        self.currency = (query_params.get('currency') or '').upper() or None
+
+        fields = query_params.get('fields')
+        if fields:
+            self.fields = [field.strip() for field in fields.split(',') if field.strip()]
+            unknown = set(self.fields) - set(PRODUCT_FIELDS)
+            if unknown:
+                raise PaginationError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        else:
+            self.fields = None
+        self.query_params = query_params
+
+    @property
+    def cache_params(self):
+        """
+        The parameters that change the payload, for use in response cache keys.
+        """
+        return {
+            'limit': self.limit, 'after': self.after, 'fields': ','.join(self.fields or []),
+            'sort': self.sort, 'min_price': self.min_price_cents, 'max_price': self.max_price_cents,
+            'currency': self.currency,
+        }
+
+    def filter(self, queryset):
+        """
+        Applies the price and currency filters. Products without a parsed price are left
+        out when filtering or sorting by price.
+        """
+        if self.currency:
+            queryset = queryset.filter(currency=self.currency)
+        if self.min_price_cents is not None:
+            queryset = queryset.filter(price_cents__gte=self.min_price_cents)
+        if self.max_price_cents is not None:
+            queryset = queryset.filter(price_cents__lte=self.max_price_cents)
+        if 'price_cents' in self.order_columns:
+            queryset = queryset.filter(price_cents__isnull=False)
+        return queryset
+
+    def get_queryset(self, queryset):
+        """
+        Applies the filters, the keyset window and the column projection to ``queryset``.
+        One row more than the page size is fetched to learn whether a next page exists.
+        """
+        queryset = self.filter(queryset)
+        if self.after is not None:
+            if self.sort == SORT_RELEVANCE:
+                where, params = rank_keyset_condition(self.rank, self.row_rank, self.after)
+                queryset = queryset.extra(where=[where], params=params)
+            else:
+                queryset = queryset.filter(keyset_condition(self.order, self.after))
+        if self.fields:
+            queryset = queryset.only(*(set(self.fields) | set(self.order_columns)) - {RANK_COLUMN})
+        else:
+            queryset = queryset.defer('reviews')
+        return queryset.order_by(*self.order)[:self.limit + 1]
+
+    def serialize(self, queryset, path=''):
+        """
+        Serializes one page of ``queryset``.
+
+        Returns:
+            dict: ``results``, ``next_cursor`` (None on the last page) and ``next`` (URL of the next page).
+        """
+        products = list(self.get_queryset(queryset))
+        has_more = len(products) > self.limit
+        products = products[:self.limit]
+        if self.fields:
+            results = ProductProjectionSerializer(products, many=True, fields=self.fields).data
+        else:
+            results = ProductListSerializer(products, many=True).data
+
+        next_cursor = None
+        if has_more:
+            next_cursor = encode_cursor({column: getattr(products[-1], column) for column in self.order_columns})
+        next_url = None
+        if next_cursor:
+            params = self.query_params.copy() if isinstance(self.query_params, QueryDict) else QueryDict(mutable=True)
+            params['cursor'] = next_cursor
+            next_url = f"{path}?{params.urlencode()}"
+        return {'results': list(results), 'next_cursor': next_cursor, 'next': next_url}
@@ -0,0 +1,169 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from .ingestion import get_ingest_batch_size
+from .models import KeywordAccess
+from .singleflight import normalize_keyword
+
+DEFAULT_KEYWORD_POPULARITY_SETTINGS = {
+    'FLUSH_SECONDS': 10,                # how long access counts are buffered in a process
+    'FLUSH_SIZE': 1000,                 # distinct keywords buffered before an early flush
+    'HALF_LIFE_SECONDS': 24 * 60 * 60,  # a request counts half as much after this long
+}
+
+MAX_KEYWORD_LENGTH = KeywordAccess._meta.get_field('keyword').max_length
+
+
+def get_popularity_settings():
+    return {**DEFAULT_KEYWORD_POPULARITY_SETTINGS, **getattr(settings, 'KEYWORD_POPULARITY', {})}
+
+
+class AccessCounter:
+    """
+    Buffers keyword access counts in memory and adds them to the KeywordAccess rows in a few
+    batched UPDATEs, so counting requests costs no database write per request. A background
+    thread flushes the buffer every FLUSH_SECONDS and the rest is flushed at exit, so counts
+    are not lost when a process goes idle or stops.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self.lock = threading.Lock()
+        self.flushed_at = time.monotonic()
+        self.flusher_pid = None     # the flusher thread does not survive a fork
+        self.exit_hook = False
+
+    def record(self, keyword):
+        keyword = normalize_keyword(keyword)[:MAX_KEYWORD_LENGTH]
+        if not keyword:
+            return
+        config = get_popularity_settings()
+        self.start_flusher(config['FLUSH_SECONDS'])
+        with self.lock:
+            self.counts[keyword] += 1
+            due = len(self.counts) >= config['FLUSH_SIZE'] or time.monotonic() - self.flushed_at >= config['FLUSH_SECONDS']
+        if due:
+            self.flush()
+
+    def start_flusher(self, interval):
+        """
+        Starts the thread flushing the buffer every ``interval`` seconds, once per process,
+        and registers the flush at exit.
+        """
+        if self.flusher_pid == os.getpid():
+            return
+        with self.lock:
+            if self.flusher_pid == os.getpid():
+                return
+            self.flusher_pid = os.getpid()
+            threading.Thread(target=self.flush_periodically, args=(interval,), name='access-counter', daemon=True).start()
+            if not self.exit_hook:
+                atexit.register(self.flush_quietly)
+                self.exit_hook = True
+
+    def flush_periodically(self, interval):
+        pid = os.getpid()
+        while self.flusher_pid == pid:
+            time.sleep(interval)
+            if time.monotonic() - self.flushed_at >= interval:
+                self.flush_quietly()
+            connection.close()  # this thread's connection; reopened on the next flush
+
+    def flush_quietly(self):
+        try:
+            self.flush()
+        except Exception as e:
+            logging.error(f"Error flushing keyword access counts: {str(e)}")
+
+    def flush(self):
+        """
+        Writes the buffered counts.
+
+        Returns:
+            int: The number of keywords whose counts were written.
+        """
+        with self.lock:
+            counts, self.counts = self.counts, Counter()
+            self.flushed_at = time.monotonic()
+        if not counts:
+            return 0
+        now = timezone.now()
+        batch_size = get_ingest_batch_size()
+        KeywordAccess.objects.bulk_create(
+            [KeywordAccess(keyword=keyword) for keyword in counts], batch_size=batch_size, ignore_conflicts=True,
+        )
+        # One UPDATE per distinct count rather than per keyword; most keywords share small counts.
+        by_count = defaultdict(list)
+        for keyword, count in counts.items():
+            by_count[count].append(keyword)
+        for count, keywords in by_count.items():
+            for start in range(0, len(keywords), batch_size):
+                KeywordAccess.objects.filter(keyword__in=keywords[start:start + batch_size]).update(
+                    access_count=F('access_count') + count, last_accessed_at=now,
+                )
+        return len(counts)
+
+
+_counter = AccessCounter()
+
+
+def record_access(keyword):
+    """
+    Counts a request for ``keyword``. Counts are buffered and written every FLUSH_SECONDS
+    and at exit; errors are logged and never fail the request.
+    """
+    try:
+        _counter.record(keyword)
+    except Exception as e:
+        logging.error(f"Error recording access to '{keyword}': {str(e)}")
+
+
+def flush_accesses():
+    return _counter.flush()
+
+
+def decay_factor(seconds, half_life=None):
+    half_life = half_life or get_popularity_settings()['HALF_LIFE_SECONDS']
+    return 0.5 ** (max(seconds, 0) / half_life)
+
+
+def current_popularity(access, now=None):
+    """
+    Returns the decayed popularity of a KeywordAccess row at ``now``, including requests
+    counted since the popularity was last updated.
+    """
+    now = now or timezone.now()
+    popularity = access.popularity
+    if access.popularity_at is not None:
+        popularity *= decay_factor((now - access.popularity_at).total_seconds())
+    return popularity + access.access_count - access.counted_accesses
+
+
+def fold_accesses(now=None):
+    """
+    Folds the requests counted since the last call into the decayed popularity of their
+    keywords. Rows without new requests are left alone; their decay is applied when read.
+
+    Returns:
+        int: The number of keywords updated.
+    """
+    now = now or timezone.now()
+    changed = []
+    for access in KeywordAccess.objects.filter(access_count__gt=F('counted_accesses')).iterator():
+        access.popularity = current_popularity(access, now)
+        access.popularity_at = now
+        access.counted_accesses = access.access_count
+        changed.append(access)
+    KeywordAccess.objects.bulk_update(
+        changed, ['popularity', 'popularity_at', 'counted_accesses'], batch_size=get_ingest_batch_size(),
+    )
+    return len(changed)
@@ -0,0 +1,76 @@
+import re
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+DEFAULT_CURRENCY = 'USD'
+
+ParsedPrice = namedtuple('ParsedPrice', ['cents', 'currency'])
+
+# Longest symbols first so 'US $' and 'C $' win over a bare '$'.
+CURRENCY_SYMBOLS = [
+    ('US $', 'USD'), ('C $', 'CAD'), ('AU $', 'AUD'), ('CA$', 'CAD'), ('A$', 'AUD'),
+    ('$', 'USD'), ('£', 'GBP'), ('€', 'EUR'), ('¥', 'JPY'), ('₹', 'INR'),
+]
+_currency_code_re = re.compile(r'\b(USD|CAD|AUD|GBP|EUR|JPY|INR)\b')
+_currency_symbol_re = re.compile('|'.join(re.escape(symbol) for symbol, _ in CURRENCY_SYMBOLS))
+_currency_by_symbol = dict(CURRENCY_SYMBOLS)
+
+# One amount with optional thousands separators and cents:
+#   Amazon   '1,299.' (whole part; the fraction is scraped separately and appended) or '1,299.99'
+#   eBay     '$10.00 to $20.00' (a range: the first amount is the lowest price)
+#   Newegg   '$1,299.99 –  (3 Offers)'
+_amount_re = re.compile(r'(\d{1,3}(?:,\d{3})+|\d+)(?:\.(\d{0,2}))?')
+_missing_re = re.compile(r'^\s*(?:n/?a|none|-+)?\s*$', re.IGNORECASE)
+
+
+def detect_currency(text, default=DEFAULT_CURRENCY):
+    """
+    Returns the ISO code of the first currency code or symbol in ``text``, or ``default``.
+    """
+    match = _currency_code_re.search(text)
+    if match:
+        return match.group(1)
+    match = _currency_symbol_re.search(text)
+    if match:
+        return _currency_by_symbol[match.group(0)]
+    return default
+
+
+def parse_price(text, default_currency=DEFAULT_CURRENCY):
+    """
+    Parses a scraped price string into integer minor units and a currency.
+
+    Parameters:
+        text (str): The price as scraped, e.g. '$10.00 to $20.00' or '1,299.99'.
+        default_currency (str, optional): Currency used when the text carries none.
+
+    Returns:
+        ParsedPrice: ``(cents, currency)``; ``cents`` is None when no amount could be read.
+        For a price range, ``cents`` is the lower bound.
+    """
+    if text is None or _missing_re.match(str(text)):
+        return ParsedPrice(None, default_currency)
+    text = str(text)
+    match = _amount_re.search(text)
+    if match is None:
+        return ParsedPrice(None, default_currency)
+    whole, fraction = match.groups()
+    cents = int(whole.replace(',', '')) * 100 + int((fraction or '').ljust(2, '0'))
+    return ParsedPrice(cents, detect_currency(text, default_currency))
+
+
+def amount_to_cents(value):
+    """
+    Converts an amount in major units given by an API client, e.g. '19.99', to cents.
+
+    Raises:
+        ValueError: If ``value`` is not a non-negative number.
+    """
+    try:
+        amount = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value}")
+    if not amount.is_finite() or amount < 0:
+        raise ValueError(f"Invalid amount: {value}")
+    return int((amount * 100).to_integral_value())
+
@@ -0,0 +1,177 @@
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+
+from .models import Product, Website
+
+DEFAULT_RANKING_WEIGHTS = {'price': 1.0, 'sentiment': 1.0, 'reviews': 0.25}
+DEFAULT_RANKING_TOP_K = 5
+MAX_RANKING_TOP_K = 100
+
+# ``group_by`` values and the product columns each one partitions the ranking by.
+GROUP_COLUMNS = {'keyword': 'keyword', 'website': 'website_id'}
+
+# Review text the scrapers store when a listing has no reviews.
+NO_REVIEWS = ('', 'No reviews available', 'N/A')
+
+PRODUCT_TABLE = Product._meta.db_table
+WEBSITE_TABLE = Website._meta.db_table
+
+# Every term is normalized to [0, 1] before weighting:
+#   price      cumulative share of comparable products (same keyword and currency) that cost
+#              at least as much, so the cheapest scores 1; unknown prices score 0.
+#   sentiment  the VADER compound score mapped from [-1, 1].
+#   reviews    1 if the listing carries review text. No review count is scraped yet.
+RANKING_SQL = f"""
+WITH scored AS (
+    SELECT p.id, p.keyword, p.website_id,
+        CASE WHEN p.price_cents IS NULL THEN 0.0 ELSE CUME_DIST() OVER (
+            PARTITION BY p.keyword, p.currency, p.price_cents IS NULL ORDER BY p.price_cents DESC
+        ) END AS price_percentile,
+        (p.sentiment_score + 1.0) / 2.0 AS sentiment_term,
+        CASE WHEN p.reviews IS NULL OR p.reviews IN ({', '.join(['%s'] * len(NO_REVIEWS))}) THEN 0.0 ELSE 1.0 END AS reviews_term,
+        {{site_weight}} AS site_weight
+    FROM {PRODUCT_TABLE} p JOIN {WEBSITE_TABLE} w ON w.id = p.website_id
+    WHERE p.id IN ({{candidates}})
+), ranked AS (
+    SELECT id, keyword, website_id, price_percentile, sentiment_term, reviews_term, site_weight,
+        site_weight * (%s * price_percentile + %s * sentiment_term + %s * reviews_term) / %s AS rank_score
+    FROM scored
+), positioned AS (
+    SELECT ranked.*, ROW_NUMBER() OVER ({{partition}}ORDER BY rank_score DESC, id) AS rank_position
+    FROM ranked
+)
+SELECT p.*, positioned.price_percentile, positioned.site_weight, positioned.rank_score, positioned.rank_position
+FROM positioned JOIN {PRODUCT_TABLE} p ON p.id = positioned.id
+WHERE positioned.rank_position <= %s
+ORDER BY {{group_order}}positioned.rank_position
+"""
+
+
+class RankingError(ValueError):
+    pass
+
+
+def parse_weight(value, name):
+    try:
+        weight = float(value)
+    except (TypeError, ValueError):
+        raise RankingError(f"{name} must be a number")
+    if weight < 0 or weight != weight or weight == float('inf'):
+        raise RankingError(f"{name} must be a non-negative number")
+    return weight
+
+
+class RankingWeights:
+
+    def __init__(self, price=None, sentiment=None, reviews=None, sites=None):
+        """
+        Holds the weights of the ranking criteria.
+
+        Args:
+            price (float, optional): Weight of the price percentile.
+            sentiment (float, optional): Weight of the review sentiment.
+            reviews (float, optional): Weight of having reviews at all.
+            sites (dict, optional): Multiplier per website name (case-insensitive); others get 1.
+
+        Returns:
+            None
+
+        Unset weights come from ``settings.RANKING_WEIGHTS`` and ``settings.RANKING_SITE_WEIGHTS``.
+        """
+        defaults = {**DEFAULT_RANKING_WEIGHTS, **getattr(settings, 'RANKING_WEIGHTS', {})}
+        self.price = defaults['price'] if price is None else price
+        self.sentiment = defaults['sentiment'] if sentiment is None else sentiment
+        self.reviews = defaults['reviews'] if reviews is None else reviews
+        if sites is None:
+            sites = getattr(settings, 'RANKING_SITE_WEIGHTS', {})
+        self.sites = {name.lower(): weight for name, weight in sites.items()}
+        if self.total <= 0:
+            raise RankingError('At least one ranking weight must be positive')
+
+    @classmethod
+    def from_params(cls, query_params):
+        """
+        Reads ``w_price``, ``w_sentiment``, ``w_reviews`` and ``site_weights``
+        (e.g. 'amazon:1.2,ebay:0.8') from a request's query parameters.
+        """
+        weights = {}
+        for name in ('price', 'sentiment', 'reviews'):
+            value = query_params.get(f'w_{name}')
+            if value not in (None, ''):
+                weights[name] = parse_weight(value, f'w_{name}')
+        sites = None
+        if query_params.get('site_weights'):
+            sites = {}
+            for pair in query_params['site_weights'].split(','):
+                name, separator, value = pair.partition(':')
+                if not separator or not name.strip():
+                    raise RankingError('site_weights must look like amazon:1.2,ebay:0.8')
+                sites[name.strip()] = parse_weight(value, f'Weight of {name.strip()}')
+        return cls(sites=sites, **weights)
+
+    @property
+    def total(self):
+        return self.price + self.sentiment + self.reviews
+
+    def as_dict(self):
+        return {'price': self.price, 'sentiment': self.sentiment, 'reviews': self.reviews, 'sites': dict(sorted(self.sites.items()))}
+
+
+def parse_group_by(value):
+    """
+    Parses a comma-separated ``group_by`` parameter into a list of GROUP_COLUMNS keys.
+    """
+    groups = [group.strip() for group in (value or '').split(',') if group.strip()]
+    unknown = set(groups) - set(GROUP_COLUMNS)
+    if unknown:
+        raise RankingError(f"group_by must be made of {', '.join(GROUP_COLUMNS)}")
+    return list(dict.fromkeys(groups))
+
+
+def rank_products(candidates, weights=None, top_k=DEFAULT_RANKING_TOP_K, group_by=()):
+    """
+    Scores products inside the database and returns the best ``top_k`` of each group.
+
+    Parameters:
+        candidates (QuerySet): The products to rank, e.g. search results.
+        weights (RankingWeights, optional): Criteria weights. Defaults to the configured ones.
+        top_k (int, optional): How many products to keep per group.
+        group_by (list, optional): Any of 'keyword' and 'website'; empty ranks all candidates together.
+
+    Returns:
+        RawQuerySet: Products ordered by group then position, annotated with ``rank_score``,
+        ``rank_position``, ``price_percentile`` and ``site_weight``.
+    """
+    weights = weights or RankingWeights()
+    try:
+        candidate_sql, candidate_params = candidates.order_by().values('id').query.sql_with_params()
+    except EmptyResultSet:
+        return Product.objects.none()
+
+    site_weight, site_params = '1.0', []
+    if weights.sites:
+        cases = ' '.join('WHEN LOWER(w.name) = %s THEN %s' for _ in weights.sites)
+        site_weight = f'CASE {cases} ELSE 1.0 END'
+        for name, weight in weights.sites.items():
+            site_params += [name, weight]
+
+    columns = [GROUP_COLUMNS[group] for group in group_by]
+    sql = RANKING_SQL.format(
+        site_weight=site_weight,
+        candidates=candidate_sql,
+        partition=f"PARTITION BY {', '.join(columns)} " if columns else '',
+        group_order=''.join(f'p.{column}, ' for column in columns),
+    )
+    params = (
+        list(NO_REVIEWS) + site_params + list(candidate_params)
+        + [weights.price, weights.sentiment, weights.reviews, weights.total, top_k]
+    )
+    return Product.objects.raw(sql, params)
+
+
+def best_product(candidates, weights=None):
+    """
+    Returns the highest ranked of ``candidates``, or None if there are none.
+    """
+    ranked = list(rank_products(candidates, weights, top_k=1))
+    return ranked[0] if ranked else None
@@ -0,0 +1,198 @@
+import heapq
+import logging
+import time
+from collections import namedtuple
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import freshness
+from .ingestion import get_ingest_batch_size
+from .models import KeywordAccess, KeywordFreshness, ScrapeJob
+from .popularity import current_popularity, flush_accesses, fold_accesses
+from .scrapers.rate_limiter import get_rate_limiter
+from .scrapers.sites import SITES
+
+DEFAULT_REFRESH_SCHEDULER_SETTINGS = {
+    'INTERVAL_SECONDS': 60,
+    # Requests per hour the scheduler may spend on each site; 'default' covers unlisted sites.
+    'SITE_REQUESTS_PER_HOUR': {'default': 120},
+    'PAGES_PER_CRAWL': 2,               # requests reserved on every site for a keyword refresh until it finishes
+    'MIN_STALENESS': 0.8,               # fraction of the soft TTL after which a keyword may be refreshed
+    'MIN_POPULARITY': 0.5,              # decayed requests below which a keyword is left to go stale
+}
+
+Candidate = namedtuple('Candidate', ['keyword', 'score', 'popularity', 'staleness'])
+
+
+def get_scheduler_settings():
+    return {**DEFAULT_REFRESH_SCHEDULER_SETTINGS, **getattr(settings, 'REFRESH_SCHEDULER', {})}
+
+
+class RefreshScheduler:
+
+    def __init__(self, interval=None):
+        """
+        Initializes a scheduler that keeps popular keywords fresh within a request budget per site.
+
+        Args:
+            interval (float, optional): Seconds between ticks. Defaults to
+                ``settings.REFRESH_SCHEDULER['INTERVAL_SECONDS']``.
+
+        Returns:
+            None
+
+        Every tick ranks the keywords that were scraped before by popularity (requests to
+        get_keyword_data and search_products, decayed over time) times staleness (age over the
+        soft TTL), and refreshes from the top of that queue while every site still has budget.
+        Refreshes run as background scrape jobs, so they are coalesced with on-demand crawls
+        and still obey the per-host rate limits. Each site is charged the requests this process
+        actually sent to it, counted by the rate limiter, so retries cost budget and page cache
+        hits do not; PAGES_PER_CRAWL is only reserved while a refresh is in flight.
+        """
+        config = get_scheduler_settings()
+        self.interval = interval or config['INTERVAL_SECONDS']
+        self.cost = config['PAGES_PER_CRAWL']
+        self.min_staleness = config['MIN_STALENESS']
+        self.min_popularity = config['MIN_POPULARITY']
+        budgets = config['SITE_REQUESTS_PER_HOUR']
+        self.rates = {
+            site.name: budgets.get(site.name, budgets.get('default', 0)) / 3600 for site in SITES  # a refresh crawls every site
+        }
+        # Unused budget carries over for at most one interval, but a single refresh always fits.
+        self.capacity = {name: max(rate * self.interval, self.cost) for name, rate in self.rates.items()}
+        self.tokens = dict(self.capacity)
+        self.refilled_at = time.monotonic()
+        self.hosts = {site.name: urlparse(site.search_url).hostname for site in SITES}
+        self.requests_seen = self.request_counts()
+        self.in_flight = set()  # ScrapeJob ids of the refreshes holding a reservation
+
+    def refill(self):
+        now = time.monotonic()
+        elapsed = now - self.refilled_at
+        self.refilled_at = now
+        for name, rate in self.rates.items():
+            self.tokens[name] = min(self.capacity[name], self.tokens[name] + rate * elapsed)
+
+    def request_counts(self):
+        rate_limiter = get_rate_limiter()
+        return {name: rate_limiter.request_count(host) for name, host in self.hosts.items()}
+
+    def settle(self):
+        """
+        Charges every site the requests sent to it since the last settlement and releases the
+        reservations of the refreshes that have finished.
+        """
+        counts = self.request_counts()
+        for name, count in counts.items():
+            seen = self.requests_seen[name]
+            self.tokens[name] -= count - seen if count >= seen else count  # the limiter was reset
+        self.requests_seen = counts
+        if not self.in_flight:
+            return
+        finished = set(ScrapeJob.objects.filter(
+            pk__in=self.in_flight, status__in=[ScrapeJob.STATUS_SUCCEEDED, ScrapeJob.STATUS_FAILED],
+        ).values_list('pk', flat=True))
+        self.in_flight -= finished
+        for name in self.tokens:
+            self.tokens[name] = min(self.capacity[name], self.tokens[name] + self.cost * len(finished))
+
+    def affordable(self):
+        return all(tokens >= self.cost for tokens in self.tokens.values())
+
+    def reserve(self):
+        for name in self.tokens:
+            self.tokens[name] -= self.cost
+
+    def queue(self, now=None):
+        """
+        Builds the refresh queue from the popularity last folded in by fold_accesses().
+
+        Returns:
+            list: A heap of ``(-score, keyword, Candidate)``; heapq.heappop yields the keyword
+            most in need of a refresh.
+        """
+        now = now or timezone.now()
+        fresh_config = freshness.get_freshness_settings()
+        soft_ttl = fresh_config['SOFT_TTL_SECONDS']
+        max_staleness = fresh_config['HARD_TTL_SECONDS'] / soft_ttl
+        popularity = {}
+        # Stored popularity only decays until new requests are folded in, so it bounds the
+        # current popularity from above.
+        for access in KeywordAccess.objects.filter(popularity__gte=self.min_popularity).iterator():
+            value = current_popularity(access, now)
+            if value >= self.min_popularity:
+                popularity[access.keyword] = value
+
+        heap = []
+        keywords = list(popularity)
+        batch_size = get_ingest_batch_size()
+        for start in range(0, len(keywords), batch_size):
+            rows = KeywordFreshness.objects.filter(keyword__in=keywords[start:start + batch_size])
+            for keyword, scraped_at in rows.values_list('keyword', 'scraped_at'):
+                staleness = min((now - scraped_at).total_seconds() / soft_ttl, max_staleness)
+                if staleness < self.min_staleness:
+                    continue
+                score = popularity[keyword] * staleness
+                heap.append((-score, keyword, Candidate(keyword, score, popularity[keyword], staleness)))
+        heapq.heapify(heap)
+        return heap
+
+    def tick(self, dry_run=False):
+        """
+        Refreshes the keywords at the top of the queue that the site budgets allow.
+
+        Args:
+            dry_run (bool, optional): Only report what would be refreshed.
+
+        Returns:
+            tuple: ``(refreshed, queued)``, the Candidates refreshed and the queue length.
+        """
+        self.refill()
+        self.settle()
+        flush_accesses()  # requests counted in this process, e.g. by views served alongside
+        fold_accesses()
+        heap = self.queue()
+        queued = len(heap)
+        refreshed = []
+        saved_tokens = dict(self.tokens)
+        while heap and self.affordable():
+            _, keyword, candidate = heapq.heappop(heap)
+            if dry_run:
+                refreshed.append(candidate)
+                self.reserve()
+                continue
+            try:
+                job = freshness.refresh_in_background(keyword)
+            except Exception as e:
+                logging.error(f"Error scheduling refresh of '{keyword}': {str(e)}")
+                continue
+            if job is not None:  # None: a refresh of the keyword is already running
+                refreshed.append(candidate)
+                self.in_flight.add(job.pk)
+                self.reserve()
+        if dry_run:
+            self.tokens = saved_tokens
+        return refreshed, queued
+
+    def run(self, ticks=None, on_tick=None):
+        """
+        Ticks every ``interval`` seconds, forever or ``ticks`` times.
+
+        Args:
+            ticks (int, optional): Number of ticks to run. Defaults to running until interrupted.
+            on_tick (callable, optional): Called as ``on_tick(refreshed, queued, tokens)`` after each tick.
+        """
+        count = 0
+        while ticks is None or count < ticks:
+            started = time.monotonic()
+            try:
+                refreshed, queued = self.tick()
+                if on_tick is not None:
+                    on_tick(refreshed, queued, dict(self.tokens))
+            except Exception as e:
+                logging.error(f"Refresh scheduler tick failed: {str(e)}")
+            count += 1
+            if ticks is None or count < ticks:
+                time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .search_index import tokenize
+from .singleflight import normalize_keyword
+
+DEFAULT_RESPONSE_CACHE_ALIAS = 'responses'
+
+# Endpoints whose payloads are cached, and the product field their query is matched against.
+ENDPOINT_KEYWORD = 'keyword'    # get_keyword_data: matches Product.keyword
+ENDPOINT_SEARCH = 'search'      # search_products: matches Product.name
+
+# Cached payloads carry the generations of the word prefixes their query matches on; an
+# ingest moves the generations of the prefixes of the words it wrote to new values, so the
+# old payloads are never read again and simply expire.
+GENERATION_PREFIX = 'response-cache:generation'
+GLOBAL_GENERATION_KEY = f'{GENERATION_PREFIX}:*'
+BUCKET_LENGTH = 3
+
+
+def get_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', DEFAULT_RESPONSE_CACHE_ALIAS)]
+
+
+def word_bucket(word):
+    """
+    Returns the generation bucket of a query word: its first BUCKET_LENGTH characters.
+    A query word matches a text word only if the text word starts with it, so both share
+    this bucket.
+    """
+    return word[:BUCKET_LENGTH]
+
+
+def text_buckets(text):
+    """
+    Returns every bucket a query word matching a word of ``text`` can fall in: the
+    prefixes of each word up to BUCKET_LENGTH characters.
+    """
+    return {word[:length] for word in tokenize(text) for length in range(1, BUCKET_LENGTH + 1)}
+
+
+def generation_key(endpoint, bucket):
+    return f"{GENERATION_PREFIX}:{endpoint}:{bucket}"
+
+
+def new_generation():
+    """
+    Returns a generation no earlier value of the same key had, so a counter that was bumped,
+    or evicted and recreated, never matches payloads cached before.
+    """
+    return time.time_ns()
+
+
+def generations(endpoint, query):
+    """
+    Reads the generations a payload for ``query`` depends on, usually in one round trip.
+    """
+    cache = get_cache()
+    keys = [GLOBAL_GENERATION_KEY] + sorted({generation_key(endpoint, word_bucket(word)) for word in tokenize(query)})
+    values = cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        for key in missing:
+            cache.add(key, new_generation(), timeout=None)
+        values.update(cache.get_many(missing))
+    return [values.get(key) for key in keys]
+
+
+def bump_generations(keys):
+    """
+    Moves shared generation counters to new values. A plain ``set`` works on any cache
+    backend: two concurrent bumps both replace the value readers last saw, whichever lands
+    last, while an ``incr`` emulated as read-modify-write (e.g. by FileBasedCache) can lose
+    one of them and leave the counter where it was.
+    """
+    get_cache().set_many({key: new_generation() for key in keys}, timeout=None)
+
+
+def cache_key(endpoint, query, params=None):
+    """
+    Builds the cache key of a payload from the endpoint, the normalized query, any extra
+    request parameters that change the payload and the current generations of the query.
+    """
+    identity = json.dumps(
+        [endpoint, normalize_keyword(query), sorted((params or {}).items()), generations(endpoint, query)], default=str,
+    )
+    return f"response-cache:{endpoint}:{hashlib.sha1(identity.encode()).hexdigest()}"
+
+
+def get(endpoint, query, params=None):
+    """
+    Returns the cached payload for the request, or None on a miss.
+    """
+    return get_cache().get(cache_key(endpoint, query, params))
+
+
+def set(endpoint, query, payload, params=None):
+    """
+    Stores a serialized payload under the query's current generations.
+    """
+    get_cache().set(cache_key(endpoint, query, params), payload)
+
+
+def invalidate_for_ingest(keyword, product_names):
+    """
+    Invalidates the cached payloads whose results change because products were written for
+    ``keyword``: keyword queries matching the keyword and searches matching a product name.
+    Payloads of queries sharing only a word prefix bucket are invalidated too.
+
+    Returns:
+        int: The number of generations bumped.
+    """
+    keys = {generation_key(ENDPOINT_KEYWORD, bucket) for bucket in text_buckets(keyword)}
+    keys.update(generation_key(ENDPOINT_SEARCH, bucket) for name in product_names for bucket in text_buckets(name))
+    bump_generations(sorted(keys))
+    if keys:
+        logging.info(f"Invalidated cached responses in {len(keys)} generations after ingesting '{keyword}'")
+    return len(keys)
+
+
+def clear():
+    """
+    Invalidates every cached payload, e.g. after a bulk re-score changed many rows.
+    """
+    bump_generations([GLOBAL_GENERATION_KEY])
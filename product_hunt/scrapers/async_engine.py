@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import time
+from urllib.parse import urlparse
+
+from django.conf import settings
+
+from . import page_cache
+from .http_client import RetryPolicy, get_http_settings
+from .page import PageResult, STATUS_ERROR, STATUS_FETCH_FAILED
+from .rate_limiter import get_rate_limiter
+from .sites import SITES, build_search_url
+
+try:
+    import aiohttp
+except ImportError:  # the threaded engine is used instead
+    aiohttp = None
+
+DEFAULT_ASYNC_SETTINGS = {
+    'PER_HOST_CONCURRENCY': 4,      # in-flight requests per marketplace host
+    'TOTAL_CONCURRENCY': 64,        # in-flight requests per process
+    'KEYWORD_CONCURRENCY': 32,      # keywords crawled at the same time by scrape_keywords
+    'PREFETCH_PAGES': True,         # once page 1 links to a next page, fetch the numbered pages concurrently
+}
+
+
+def get_async_settings():
+    return {**DEFAULT_ASYNC_SETTINGS, **getattr(settings, 'SCRAPER_ASYNC', {})}
+
+
+class AsyncScrapeEngine:
+
+    def __init__(self, sites=None, max_pages=2, per_host_concurrency=None, total_concurrency=None,
+                 prefetch_pages=None, keyword_concurrency=None, site_concurrency=None):
+        """
+        Initializes an asyncio scraping engine that drives the existing scrapers.
+
+        Args:
+            sites (list, optional): Sites to crawl. Defaults to every registered site.
+            max_pages (int, optional): The maximum number of pages to scrape per site. Defaults to 2.
+            per_host_concurrency (int, optional): In-flight requests allowed per host.
+            total_concurrency (int, optional): In-flight requests allowed overall.
+            prefetch_pages (bool, optional): Fetch pages 2..max_pages concurrently when the scraper supports it
+                and page 1 links to a next page.
+            keyword_concurrency (int, optional): Keywords crawled at the same time by scrape_keywords.
+            site_concurrency (int, optional): Keywords crawled at the same time on any one site.
+                Defaults to no limit beyond the keyword and request limits.
+
+        Returns:
+            None
+
+        Pages are downloaded with aiohttp; parsing and extraction reuse the scrapers'
+        parse_page method and run in worker threads so the event loop stays free.
+        Requests still go through the shared per-host rate limiter and are retried with the
+        same RetryPolicy as the threaded HttpClient.
+        """
+        if aiohttp is None:
+            raise ImportError("aiohttp is required for the async scraping engine")
+        config = get_async_settings()
+        self.sites = sites or SITES
+        self.max_pages = max_pages
+        self.per_host_concurrency = per_host_concurrency or config['PER_HOST_CONCURRENCY']
+        self.total_concurrency = total_concurrency or config['TOTAL_CONCURRENCY']
+        self.keyword_concurrency = keyword_concurrency or config['KEYWORD_CONCURRENCY']
+        self.site_concurrency = site_concurrency
+        self.prefetch_pages = config['PREFETCH_PAGES'] if prefetch_pages is None else prefetch_pages
+        self.rate_limiter = get_rate_limiter()
+        self.retry = RetryPolicy()
+        self.semaphores = {}
+        self.site_semaphores = {}
+
+    def semaphore_for(self, host):
+        semaphore = self.semaphores.get(host)
+        if semaphore is None:
+            semaphore = self.semaphores[host] = asyncio.Semaphore(self.per_host_concurrency)
+        return semaphore
+
+    def site_semaphore_for(self, site):
+        semaphore = self.site_semaphores.get(site.name)
+        if semaphore is None:
+            semaphore = self.site_semaphores[site.name] = asyncio.Semaphore(self.site_concurrency)
+        return semaphore
+
+    def create_session(self):
+        http_settings = get_http_settings()
+        connector = aiohttp.TCPConnector(
+            limit=self.total_concurrency,
+            limit_per_host=self.per_host_concurrency,
+            ttl_dns_cache=300,
+        )
+        timeout = aiohttp.ClientTimeout(
+            sock_connect=http_settings['CONNECT_TIMEOUT'],
+            sock_read=http_settings['READ_TIMEOUT'],
+        )
+        # aiohttp decodes gzip/deflate, and brotli when a brotli package is installed.
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def fetch_html(self, session, scraper, url):
+        """
+        Fetches the HTML content of a webpage, honouring the per-host semaphore and rate limit.
+        Pages in the page cache are served from disk without a request. Connection errors,
+        timeouts and 429/5xx responses are retried as the RetryPolicy says.
+
+        Returns:
+            str or None: The HTML content if the request is successful, None otherwise.
+        """
+        html_text = await asyncio.to_thread(page_cache.cached_html, url)
+        if html_text is not None:
+            return html_text
+        if page_cache.replaying():
+            logging.warning(f"Page not cached, skipped in replay mode: {url}")
+            return None
+        host = urlparse(url).hostname
+        retry = self.retry
+        attempt = 0
+        while True:
+            delay = None
+            async with self.semaphore_for(host):
+                wait = self.rate_limiter.reserve(url)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                try:
+                    async with session.get(url, headers=scraper.request_headers()) as response:
+                        if retry.retries_status(response.status) and attempt < retry.max_retries:
+                            delay = retry.delay(attempt + 1, response.headers.get('Retry-After'))
+                            reason = f"status {response.status}"
+                        else:
+                            response.raise_for_status()
+                            html_text = await response.text()
+                except aiohttp.ClientResponseError as e:
+                    logging.error(f"Failed to fetch webpage: {url}. Exception: {str(e)}")
+                    return None
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if attempt >= retry.max_retries:
+                        logging.error(f"Failed to fetch webpage: {url}. Exception: {str(e)}")
+                        return None
+                    delay = retry.delay(attempt + 1)
+                    reason = f"error: {str(e)}"
+            if delay is None:
+                break
+            # Back off outside the host semaphore; the retry takes a new rate limit token.
+            attempt += 1
+            logging.warning(f"Retrying {url} ({attempt}/{retry.max_retries}) after {reason}")
+            await asyncio.sleep(delay)
+        await asyncio.to_thread(page_cache.store_html, url, html_text)
+        return html_text
+
+    async def scrape_page(self, session, scraper, url):
+        """
+        Fetches one page asynchronously and parses it in a worker thread.
+
+        Returns:
+            PageResult: The extracted items, the next page URL and a status/timing record.
+        """
+        result = PageResult(url=url)
+        try:
+            started = time.perf_counter()
+            html_text = await self.fetch_html(session, scraper, url)
+            result.fetch_seconds = time.perf_counter() - started
+            if not html_text:
+                result.status = STATUS_FETCH_FAILED
+                return result
+            return await asyncio.to_thread(scraper.parse_page, url, html_text, result)
+        except Exception as e:
+            logging.error(f"Error scraping page: {str(e)}")
+            result.status = STATUS_ERROR
+            result.error = str(e)
+            return result
+
+    async def scrape_site(self, session, site, keyword):
+        """
+        Scrapes up to ``max_pages`` search pages of one site for ``keyword``.
+
+        Returns:
+            list: The PageResults, in page order, up to the first page without items.
+        """
+        if self.site_concurrency:
+            async with self.site_semaphore_for(site):
+                return await self.crawl_site(session, site, keyword)
+        return await self.crawl_site(session, site, keyword)
+
+    async def crawl_site(self, session, site, keyword):
+        scraper = site.scraper_class(build_search_url(site, keyword), max_pages=self.max_pages)
+        if self.prefetch_pages and getattr(scraper, 'PAGE_URL_PARAM', None):
+            # Page 1 decides whether there is anything to prefetch, so a single-page result
+            # does not cost max_pages - 1 wasted requests.
+            pages = [await self.scrape_page(session, scraper, scraper.page_url(1))]
+            if pages[0].items and pages[0].next_url:
+                urls = [scraper.page_url(number) for number in range(2, self.max_pages + 1)]
+                pages += await asyncio.gather(*(self.scrape_page(session, scraper, url) for url in urls))
+        else:
+            pages, url = [], scraper.base_url
+            while url and len(pages) < self.max_pages:
+                page = await self.scrape_page(session, scraper, url)
+                pages.append(page)
+                if not page.items:
+                    break
+                url = page.next_url
+
+        results = []
+        for page in pages:
+            logging.info(f"Scraped page: {page.summary()}")
+            if not page.items:
+                break
+            results.append(page)
+        return results
+
+    async def scrape_keyword(self, keyword, session=None):
+        """
+        Scrapes every site for ``keyword`` concurrently.
+
+        Returns:
+            dict: Maps site names to the list of product dicts scraped from that site.
+        """
+        site_pages = await self.scrape_keyword_pages(keyword, session)
+        return {name: [item for page in pages for item in page.items] for name, pages in site_pages.items()}
+
+    async def scrape_keyword_pages(self, keyword, session=None, sites=None):
+        """
+        Scrapes every site, or only ``sites``, for ``keyword`` concurrently.
+
+        Returns:
+            dict: Maps site names to the PageResults scraped from that site; a site that
+            failed has no pages.
+        """
+        if session is None:
+            async with self.create_session() as session:
+                return await self.scrape_keyword_pages(keyword, session, sites)
+
+        sites = self.sites if sites is None else sites
+        site_pages = await asyncio.gather(
+            *(self.scrape_site(session, site, keyword) for site in sites),
+            return_exceptions=True,
+        )
+        results = {}
+        for site, pages in zip(sites, site_pages):
+            if isinstance(pages, BaseException):
+                logging.error(f"An unexpected error occurred while scraping {site.name}: {str(pages)}")
+                pages = []
+            results[site.name] = pages
+        return results
+
+    async def scrape_keywords(self, keywords):
+        """
+        Scrapes many keywords over one shared connection pool.
+
+        Returns:
+            dict: Maps each keyword to the result of scrape_keyword().
+        """
+        limit = asyncio.Semaphore(self.keyword_concurrency)
+
+        async def bounded(keyword, session):
+            async with limit:
+                return await self.scrape_keyword(keyword, session)
+
+        async with self.create_session() as session:
+            results = await asyncio.gather(*(bounded(keyword, session) for keyword in keywords))
+        return dict(zip(keywords, results))
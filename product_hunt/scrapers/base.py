@@ -0,0 +1,371 @@
+import logging
+import random
+import time
+
+import requests
+from django.conf import settings
+
+from ..ingestion import ingest_products
+from . import page_cache, parse_pool
+from .http_client import get_http_client
+from .page import PageResult, STATUS_EMPTY, STATUS_ERROR, STATUS_FETCH_FAILED, STATUS_PARSE_FAILED
+from .parsers import get_parser_backend
+from .spec import PRODUCT_FIELDS, compile_spec
+from .utils import sentiment_label, sentiment_score, set_query_param
+
+DEFAULT_PARTIAL_PARSE = True
+
+
+class BaseScraper:
+    """
+    Scrapes the search result pages of the marketplace described by ``SPEC``.
+    A new marketplace is a SiteSpec and a subclass setting it.
+    """
+    SPEC = None
+    PAGE_URL_PARAM = None
+    USER_AGENTS = [
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/104.0.0.0 Safari/537.36',
+        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36',
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Firefox/89.0',
+        # Add more user agents here
+    ]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.SPEC is not None:
+            missing = set(PRODUCT_FIELDS) - set(cls.SPEC.fields)
+            if missing:
+                raise TypeError(f"{cls.__name__}.SPEC lacks the fields: {', '.join(sorted(missing))}")
+            cls.PAGE_URL_PARAM = cls.SPEC.page_param
+
+    def __init__(self, base_url, max_pages=2, parser=None, partial=None):
+        """
+        Initializes a scraper for the site described by ``SPEC``.
+
+        Args:
+            base_url (str): The URL of the first search results page.
+            max_pages (int, optional): The maximum number of pages to scrape. Defaults to 2.
+            parser (str, optional): The parser backend name. Defaults to settings.SCRAPER_PARSER.
+            partial (bool, optional): Materialize only the spec's regions of a page.
+                Defaults to settings.SCRAPER_PARTIAL_PARSE.
+
+        Returns:
+            None
+
+        Attaches the shared pooled HTTP client and selects the parser backend; the site spec
+        is compiled once per spec and backend.
+        """
+        self.base_url = base_url
+        self.max_pages = max_pages
+        self.website_name = self.SPEC.name
+        self.http = get_http_client()
+        self.TIMEOUT = self.http.timeout
+        self.parser = get_parser_backend(parser)
+        self.spec = compile_spec(self.SPEC, self.parser)
+        self.partial = getattr(settings, 'SCRAPER_PARTIAL_PARSE', DEFAULT_PARTIAL_PARSE) if partial is None else partial
+        logging.basicConfig(level=logging.INFO)
+
+    def request_headers(self):
+        """
+        Builds the request headers for a page fetch, rotating the user agent.
+
+        Returns:
+            dict: The request headers.
+        """
+        return {
+            "User-Agent": random.choice(self.USER_AGENTS),
+            "Accept-Language": "en-US,en;q=0.5",
+            "Referer": self.SPEC.referer,
+        }
+
+    def fetch_html(self, url):
+        """
+        Fetches the HTML content of a webpage using the provided URL.
+
+        Parameters:
+            url (str): The URL of the webpage to fetch.
+
+        Returns:
+            str or None: The HTML content of the webpage if the request is successful, None otherwise.
+
+        A page fetched within the page cache TTL is served from the on-disk cache; in replay
+        mode only cached pages are returned.
+        """
+        html_text = page_cache.cached_html(url)
+        if html_text is not None:
+            return html_text
+        if page_cache.replaying():
+            logging.warning(f"Page not cached, skipped in replay mode: {url}")
+            return None
+        try:
+            response = self.http.get(url, headers=self.request_headers(), timeout=self.TIMEOUT)
+            response.raise_for_status()
+            page_cache.store_html(url, response.text)
+            return response.text
+        except requests.exceptions.HTTPError as http_err:
+            if response.status_code == 404:
+                logging.error(f"404 Not Found: {url}")
+            else:
+                logging.error(f"HTTP error occurred: {http_err}")
+            return None
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Failed to fetch webpage: {url}. Exception: {str(e)}")
+            return None
+
+    def parse_html(self, html_text):
+        """
+        Parses the given HTML text with the configured parser backend and returns the parsed HTML object.
+
+        Parameters:
+            html_text (str): The HTML text to be parsed.
+
+        Returns:
+            The parsed HTML object of the backend (BeautifulSoup, lxml or selectolax tree).
+
+        In partial mode only the regions declared by the site spec (result items, pagination)
+        are materialized; scripts, navigation and ads are skipped.
+        """
+        try:
+            return self.spec.parse(html_text, self.partial)
+        except Exception as e:
+            logging.error(f"Error parsing HTML: {str(e)}")
+            return None
+
+    def select_items(self, soup):
+        """
+        Returns the search result item elements of a parsed page.
+        """
+        return self.spec.select_items(soup)
+
+    def extract_field(self, item, name):
+        """
+        Extracts a single field of a result item, e.g. to time fields separately.
+
+        Parameters:
+            item: The result item element.
+            name (str): A field of the site spec.
+
+        Returns:
+            The field value after its post-processors.
+        """
+        return self.spec.extract(item, (name,))[name]
+
+    def build_product(self, values):
+        """
+        Turns the extracted field values of an item into a product dict, scoring the review
+        sentiment.
+
+        Parameters:
+            values (dict): Field values as returned by the compiled spec.
+
+        Returns:
+            dict: The product data.
+        """
+        reviews = values['reviews']
+        if reviews:
+            score = sentiment_score(reviews)
+            review_data = {
+                'reviews': reviews,
+                'sentiment_score': score['compound'],
+                'sentiment_label': sentiment_label(score),
+            }
+        else:
+            review_data = {'reviews': None, 'sentiment_score': 0.0, 'sentiment_label': 'Neutral'}
+        return {
+            "name": values['name'],
+            "price": values['price'],
+            "reviews": review_data['reviews'],
+            "sentiment_score": review_data['sentiment_score'],
+            "sentiment_label": review_data['sentiment_label'],
+            "product_url": values['product_url'],
+            "image_url": values['image_url'],
+        }
+
+    def extract_items(self, soup):
+        """
+        Extracts the product data of every search result item on a parsed page. All fields of
+        an item are read in one walk over its subtree.
+
+        Parameters:
+            soup: The parsed search results page.
+
+        Returns:
+            list: One product dict per result item.
+        """
+        product_data = []
+        for item in self.select_items(soup):
+            try:
+                product_data.append(self.build_product(self.spec.extract(item)))
+            except Exception as e:
+                logging.error(f"Error extracting product: {str(e)}")
+        return product_data
+
+    def extract_page(self, html_text):
+        """
+        Parses a page and extracts its items and next page URL, in this process.
+
+        Parameters:
+            html_text (str): The HTML content of the page.
+
+        Returns:
+            tuple or None: ``(items, next_url)``, or None if the page could not be parsed.
+        """
+        soup = self.parse_html(html_text)
+        if soup is None:
+            return None
+        return self.extract_items(soup), self.get_next_page_url(soup)
+
+    def get_next_page_url(self, soup):
+        try:
+            return self.spec.next_page_url(soup)
+        except Exception as e:
+            logging.error(f"Error finding next page URL: {str(e)}")
+            return None
+
+    def drop_placeholder_rows(self, product_data):
+        try:
+            return [product for product in product_data if all(value is not None for value in product.values())]
+        except Exception as e:
+            logging.error(f"Error dropping placeholder rows: {str(e)}")
+            return product_data
+
+    def scrape_page(self, url):
+        """
+        Fetches and parses one search page exactly once.
+
+        Parameters:
+            url (str): The URL of the search page.
+
+        Returns:
+            PageResult: The extracted items, the next page URL and a status/timing record.
+        """
+        result = PageResult(url=url)
+        try:
+            started = time.perf_counter()
+            html_text = self.fetch_html(url)
+            result.fetch_seconds = time.perf_counter() - started
+            if not html_text:
+                result.status = STATUS_FETCH_FAILED
+                return result
+
+            return self.parse_page(url, html_text, result)
+        except Exception as e:
+            logging.error(f"Error scraping page: {str(e)}")
+            result.status = STATUS_ERROR
+            result.error = str(e)
+            return result
+
+    def parse_page(self, url, html_text, result=None):
+        """
+        Parses already-downloaded search page HTML into a PageResult.
+
+        Parameters:
+            url (str): The URL the HTML was fetched from.
+            html_text (str): The HTML content of the page.
+            result (PageResult, optional): A result to fill in, e.g. one carrying fetch timing.
+
+        Returns:
+            PageResult: The extracted items, the next page URL and a status/timing record.
+        """
+        result = result or PageResult(url=url)
+        try:
+            started = time.perf_counter()
+            digest, parsed = page_cache.cached_items(self, html_text)
+            if parsed is not None:
+                # Same content as a page extracted before with the same spec.
+                result.items = parsed['items']
+                result.next_url = parsed['next_url']
+                result.parse_skipped = True
+                result.parse_seconds = time.perf_counter() - started
+                if not result.items:
+                    result.status = STATUS_EMPTY
+                return result
+
+            # Parsed in the shared process pool when a crawl command enabled it, to escape the GIL.
+            extracted = parse_pool.extract_page(self, html_text)
+            if extracted is None:
+                result.status = STATUS_PARSE_FAILED
+                return result
+
+            result.items, result.next_url = extracted
+            result.parse_seconds = time.perf_counter() - started
+            if not result.items:
+                result.status = STATUS_EMPTY
+            else:
+                page_cache.store_items(self, digest, result.items, result.next_url)
+            return result
+        except Exception as e:
+            logging.error(f"Error parsing page: {str(e)}")
+            result.status = STATUS_ERROR
+            result.error = str(e)
+            return result
+
+    def page_url(self, page_number):
+        """
+        Builds the URL of a numbered search results page so pages can be fetched concurrently.
+
+        Parameters:
+            page_number (int): The 1-based page number.
+
+        Returns:
+            str: The URL of the requested page.
+        """
+        if page_number <= 1:
+            return self.base_url
+        return set_query_param(self.base_url, self.PAGE_URL_PARAM, page_number)
+
+    def save_to_database(self, product_data, keyword):
+        """
+        Stores the scraped products in one transaction with batched inserts.
+
+        Parameters:
+            product_data (list): The product dicts to store.
+            keyword (str): The search keyword the products were found for.
+
+        Returns:
+            IngestResult or None: Rows written and time taken, or None if saving failed.
+        """
+        try:
+            return ingest_products(self.website_name, self.base_url, product_data, keyword)
+        except Exception as e:
+            logging.error(f"Error saving to database: {str(e)}")
+            return None
+
+    def scrape_pages(self):
+        """
+        Scrapes up to ``max_pages`` search pages, following the "next" links.
+
+        Returns:
+            list: The PageResults, in page order, up to the first page without items.
+        """
+        pages = []
+        current_url = f"{self.base_url}"
+        for _ in range(self.max_pages):
+            logging.info(f"Scraping page: {current_url}")
+            page = self.scrape_page(current_url)
+            logging.info(f"Scraped page: {page.summary()}")
+            if not page.items:
+                break
+            pages.append(page)
+            current_url = page.next_url
+            if not current_url:
+                break
+        return pages
+
+    def scrape(self, keyword):
+        """
+        Scrapes the site for product data and stores it in the database.
+
+        Parameters:
+            keyword (str): The search keyword.
+
+        Returns:
+            IngestResult or None: Rows written and time taken, or None if scraping or saving failed.
+        """
+        try:
+            all_product_data = [item for page in self.scrape_pages() for item in page.items]
+            all_product_data = self.drop_placeholder_rows(all_product_data)
+            return self.save_to_database(all_product_data, keyword)  # Pass the keyword to save_to_database
+        except Exception as e:
+            logging.error(f"Error during scraping: {str(e)}")
+            return None
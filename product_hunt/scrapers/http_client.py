@@ -0,0 +1,201 @@
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+from .rate_limiter import get_rate_limiter
+
+DEFAULT_HTTP_SETTINGS = {
+    'POOL_CONNECTIONS': 10,     # number of per-host pools kept alive
+    'POOL_MAXSIZE': 20,         # keep-alive connections per host
+    'POOL_BLOCK': False,
+    'CONNECT_TIMEOUT': 5,
+    'READ_TIMEOUT': 10,
+    'MAX_RETRIES': 2,
+    'BACKOFF_FACTOR': 0.3,
+    'MAX_RETRY_AFTER': 30,      # longest Retry-After (seconds) honoured before giving up on a response
+}
+
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+
+def get_http_settings():
+    """
+    Returns the HTTP client settings, merging ``settings.SCRAPER_HTTP`` over the defaults.
+
+    Returns:
+        dict: The effective HTTP client settings.
+    """
+    return {**DEFAULT_HTTP_SETTINGS, **getattr(settings, 'SCRAPER_HTTP', {})}
+
+
+class RetryPolicy:
+
+    def __init__(self, max_retries=None, backoff_factor=None, max_retry_after=None):
+        """
+        Initializes the retry policy shared by the threaded HttpClient and the async engine.
+
+        Args:
+            max_retries (int, optional): Retries after the first attempt.
+            backoff_factor (float, optional): Seconds before the first retry; doubled for each one after.
+            max_retry_after (float, optional): Longest Retry-After honoured, in seconds.
+
+        Returns:
+            None
+
+        Missing arguments fall back to ``settings.SCRAPER_HTTP`` and then to the defaults.
+        Connection errors, timeouts and RETRY_STATUSES responses are retried.
+        """
+        config = get_http_settings()
+        self.max_retries = config['MAX_RETRIES'] if max_retries is None else max_retries
+        self.backoff_factor = config['BACKOFF_FACTOR'] if backoff_factor is None else backoff_factor
+        self.max_retry_after = config['MAX_RETRY_AFTER'] if max_retry_after is None else max_retry_after
+
+    def retries_status(self, status_code):
+        return status_code in RETRY_STATUSES
+
+    def delay(self, attempt, retry_after=None):
+        """
+        Returns the seconds to wait before retry number ``attempt`` (1-based): the response's
+        Retry-After header, given in seconds, if it sent one, otherwise exponential backoff.
+        """
+        if retry_after and retry_after.strip().isdigit():
+            return min(float(retry_after), self.max_retry_after)
+        return self.backoff_factor * (2 ** (attempt - 1))
+
+
+class HttpClient:
+
+    def __init__(self, pool_connections=None, pool_maxsize=None, connect_timeout=None,
+                 read_timeout=None, max_retries=None, rate_limiter=None):
+        """
+        Initializes a pooled HTTP client shared by the scrapers.
+
+        Args:
+            pool_connections (int, optional): Number of per-host connection pools to keep.
+            pool_maxsize (int, optional): Maximum keep-alive connections per host.
+            connect_timeout (float, optional): Seconds to wait for a TCP/TLS connection.
+            read_timeout (float, optional): Seconds to wait for response data.
+            max_retries (int, optional): Retries for connection errors and 5xx/429 responses.
+            rate_limiter (RateLimiter, optional): Per-host limiter; defaults to the shared one.
+
+        Returns:
+            None
+
+        Missing arguments fall back to ``settings.SCRAPER_HTTP`` and then to the defaults.
+        The underlying ``requests.Session`` keeps connections alive per host, so repeated
+        page fetches skip the DNS lookup, TCP connect and TLS handshake.
+        Responses compressed with gzip, deflate or brotli are decoded transparently.
+        Every request, retries included, first waits for a token from the per-host rate limiter.
+        """
+        config = get_http_settings()
+        self.pool_connections = pool_connections or config['POOL_CONNECTIONS']
+        self.pool_maxsize = pool_maxsize or config['POOL_MAXSIZE']
+        self.connect_timeout = connect_timeout or config['CONNECT_TIMEOUT']
+        self.read_timeout = read_timeout or config['READ_TIMEOUT']
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.retry = RetryPolicy(max_retries=max_retries)
+
+        # Retries happen in get(), so every attempt takes a token from the rate limiter;
+        # the adapter itself never re-sends a request.
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=config['POOL_BLOCK'],
+            max_retries=0,
+        )
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # ACCEPT_ENCODING only advertises "br" when a brotli decoder is installed.
+        self.session.headers.update({
+            'Accept-Encoding': ACCEPT_ENCODING,
+            'Connection': 'keep-alive',
+        })
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    def get(self, url, headers=None, timeout=None, **kwargs):
+        """
+        Sends a GET request through the pooled session once the host's rate limit allows it.
+
+        Parameters:
+            url (str): The URL to fetch.
+            headers (dict, optional): Extra request headers.
+            timeout (float or tuple, optional): Overrides the configured (connect, read) timeout.
+
+        Returns:
+            requests.Response: The response object. After the last retry a 429/5xx response
+            is returned as it is.
+
+        Raises:
+            requests.ConnectionError, requests.Timeout: If the last attempt could not connect
+            or timed out.
+
+        Connection errors, timeouts and 429/5xx responses are retried with ``self.retry``, and
+        each retry waits for its own rate limit token, so a throttled host is not hit harder
+        than the limit allows.
+        """
+        retry = self.retry
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(url)
+            try:
+                response = self.session.get(url, headers=headers, timeout=timeout or self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= retry.max_retries:
+                    raise
+                attempt += 1
+                logging.warning(f"Retrying {url} ({attempt}/{retry.max_retries}) after error: {str(e)}")
+                time.sleep(retry.delay(attempt))
+                continue
+            if not retry.retries_status(response.status_code) or attempt >= retry.max_retries:
+                return response
+            attempt += 1
+            logging.warning(f"Retrying {url} ({attempt}/{retry.max_retries}) after status {response.status_code}")
+            delay = retry.delay(attempt, response.headers.get('Retry-After'))
+            response.close()
+            time.sleep(delay)
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """
+    Returns the process-wide HttpClient, creating it on first use.
+
+    Returns:
+        HttpClient: The shared client.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+                logging.info(
+                    f"Initialized shared HTTP client (pools={_client.pool_connections}, "
+                    f"maxsize={_client.pool_maxsize})"
+                )
+    return _client
+
+
+def reset_http_client():
+    """
+    Closes and discards the shared HttpClient, e.g. after settings change or a fork.
+    """
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
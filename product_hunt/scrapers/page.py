@@ -0,0 +1,50 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+STATUS_OK = 'ok'
+STATUS_EMPTY = 'empty'
+STATUS_FETCH_FAILED = 'fetch_failed'
+STATUS_PARSE_FAILED = 'parse_failed'
+STATUS_ERROR = 'error'
+
+
+@dataclass
+class PageResult:
+    """
+    Result of scraping one search page: the extracted items, the pagination link and
+    a status/timing record, all produced from a single fetch and a single parse.
+
+    Attributes:
+        url (str): The URL that was scraped.
+        items (list): Product dicts extracted from the page.
+        next_url (str or None): The next search page, if any.
+        status (str): One of the ``STATUS_*`` constants.
+        fetch_seconds (float): Time spent downloading the page.
+        parse_seconds (float): Time spent parsing the page and extracting items.
+        parse_skipped (bool): True if the items were reused from the page cache because the
+            page content had not changed since it was last extracted.
+        error (str or None): Error message when the status is not ok.
+    """
+    url: str
+    items: List[dict] = field(default_factory=list)
+    next_url: Optional[str] = None
+    status: str = STATUS_OK
+    fetch_seconds: float = 0.0
+    parse_seconds: float = 0.0
+    parse_skipped: bool = False
+    error: Optional[str] = None
+
+    @property
+    def ok(self):
+        return self.status == STATUS_OK
+
+    @property
+    def total_seconds(self):
+        return self.fetch_seconds + self.parse_seconds
+
+    def summary(self):
+        return (
+            f"{self.status} {self.url} items={len(self.items)} "
+            f"fetch={self.fetch_seconds:.2f}s parse={self.parse_seconds:.2f}s"
+            + (" (unchanged, parse skipped)" if self.parse_skipped else "")
+        )
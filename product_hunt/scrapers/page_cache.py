@@ -0,0 +1,359 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from django.conf import settings
+
+try:
+    import zstandard
+except ImportError:  # pages are gzip-compressed instead
+    zstandard = None
+
+DEFAULT_PAGE_CACHE_SETTINGS = {
+    'ENABLED': True,
+    'DIRECTORY': None,                  # defaults to <BASE_DIR>/.page_cache
+    'TTL_SECONDS': 600,                 # a cached page is served instead of refetching while younger than this
+    'MAX_BYTES': 256 * 1024 * 1024,     # least recently used pages are evicted beyond this size
+    'COMPRESSION': 'zstd',              # 'zstd' (requires the zstandard package) or 'gzip'
+    'SKIP_UNCHANGED_PARSE': True,       # reuse the extracted items of a page whose content hash is unchanged
+    'REPLAY': False,                    # serve only from the cache, never from the network
+}
+
+
+def get_page_cache_settings():
+    return {**DEFAULT_PAGE_CACHE_SETTINGS, **getattr(settings, 'SCRAPER_PAGE_CACHE', {})}
+
+
+def normalize_url(url):
+    """
+    Normalizes a page URL into its cache identity: lowercase scheme and host, sorted query
+    parameters, no fragment.
+    """
+    parts = urlsplit(url.strip())
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', query, ''))
+
+
+def content_hash(html_text):
+    return hashlib.sha256(html_text.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class CachedPage:
+    url: str
+    html: str
+    content_hash: str
+    fetched_at: float
+
+    def age(self):
+        return time.time() - self.fetched_at
+
+
+class PageCache:
+
+    def __init__(self, directory, ttl_seconds, max_bytes, compression='zstd', skip_unchanged_parse=True,
+                 replay=False):
+        """
+        Initializes an on-disk, content-addressed cache of fetched pages.
+
+        Args:
+            directory (str or Path): Where the cache lives.
+            ttl_seconds (float): How long a cached page is served instead of refetching it.
+            max_bytes (int): Size cap; least recently used pages are evicted beyond it.
+            compression (str, optional): 'zstd' or 'gzip'. zstd falls back to gzip when the
+                zstandard package is missing.
+            skip_unchanged_parse (bool, optional): Keep extracted items per content hash so an
+                unchanged page is not parsed again.
+            replay (bool, optional): Serve only from the cache, ignoring the TTL, and never
+                reuse extracted items, for offline re-extraction after selector changes.
+
+        Returns:
+            None
+
+        Layout: ``pages/`` holds one compressed blob per distinct page content, named by its
+        SHA-256, so identical pages fetched from different URLs are stored once. ``urls/``
+        maps each normalized URL to the content hash and fetch time; its file modification
+        time records the last use for LRU eviction. ``parsed/`` holds extracted items per
+        content hash and scraper.
+        """
+        self.directory = Path(directory)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.compression = 'zstd' if compression == 'zstd' and zstandard is not None else 'gzip'
+        self.skip_unchanged_parse = skip_unchanged_parse
+        self.replay = replay
+        self.lock = threading.Lock()
+        self.size = None  # running total of bytes on disk, measured on first write and on eviction
+        for name in ('pages', 'urls', 'parsed'):
+            (self.directory / name).mkdir(parents=True, exist_ok=True)
+
+    def url_path(self, url):
+        return self.directory / 'urls' / f"{hashlib.sha1(normalize_url(url).encode()).hexdigest()}.json"
+
+    def page_path(self, digest, compression=None):
+        extension = 'zst' if (compression or self.compression) == 'zstd' else 'gz'
+        return self.directory / 'pages' / digest[:2] / f"{digest}.html.{extension}"
+
+    def parsed_path(self, digest, parser_key):
+        return self.directory / 'parsed' / digest[:2] / f"{digest}-{parser_key}.json"
+
+    def compress(self, data):
+        if self.compression == 'zstd':
+            return zstandard.ZstdCompressor(level=3).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    def decompress(self, path):
+        data = path.read_bytes()
+        if path.suffix == '.zst':
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def write_atomic(self, path, data):
+        """
+        Writes ``data`` to ``path`` through a temporary file.
+
+        Returns:
+            int: How many bytes the cache grew by, net of the file it replaced.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+        handle, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(handle, 'wb') as temp_file:
+            temp_file.write(data)
+        os.replace(temp_path, path)
+        return len(data) - replaced
+
+    def find_page(self, digest):
+        for compression in ('zstd', 'gzip'):
+            path = self.page_path(digest, compression)
+            if path.exists() and (compression == 'gzip' or zstandard is not None):
+                return path
+        return None
+
+    def get(self, url):
+        """
+        Returns the cached page for ``url``, or None if it is missing or older than the TTL.
+        In replay mode the TTL is ignored.
+
+        Returns:
+            CachedPage or None
+        """
+        entry_path = self.url_path(url)
+        try:
+            entry = json.loads(entry_path.read_text())
+            if not self.replay and time.time() - entry['fetched_at'] > self.ttl_seconds:
+                return None
+            page_path = self.find_page(entry['content_hash'])
+            if page_path is None:
+                return None
+            html = self.decompress(page_path).decode('utf-8')
+            os.utime(entry_path)  # mark as recently used
+            return CachedPage(url, html, entry['content_hash'], entry['fetched_at'])
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.error(f"Error reading cached page for {url}: {str(e)}")
+            return None
+
+    def put(self, url, html):
+        """
+        Stores a freshly fetched page and evicts old pages if the cache grew past its cap.
+
+        Returns:
+            str: The content hash of the page.
+        """
+        digest = content_hash(html)
+        try:
+            written = 0
+            if self.find_page(digest) is None:
+                written += self.write_atomic(self.page_path(digest), self.compress(html.encode('utf-8')))
+            entry = json.dumps({'url': normalize_url(url), 'content_hash': digest, 'fetched_at': time.time()}).encode()
+            written += self.write_atomic(self.url_path(url), entry)
+            self.grew(written)
+        except Exception as e:
+            logging.error(f"Error caching page for {url}: {str(e)}")
+        return digest
+
+    def get_parsed(self, digest, parser_key):
+        """
+        Returns the ``{'items': [...], 'next_url': ...}`` extracted earlier from the page with
+        ``digest`` by the scraper identified by ``parser_key``, or None.
+        """
+        if self.replay or not self.skip_unchanged_parse:
+            return None
+        try:
+            return json.loads(self.parsed_path(digest, parser_key).read_text())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.error(f"Error reading cached items for page {digest}: {str(e)}")
+            return None
+
+    def put_parsed(self, digest, parser_key, items, next_url):
+        if not self.skip_unchanged_parse:
+            return
+        try:
+            data = json.dumps({'items': items, 'next_url': next_url}).encode()
+            self.grew(self.write_atomic(self.parsed_path(digest, parser_key), data))
+        except Exception as e:
+            logging.error(f"Error caching items for page {digest}: {str(e)}")
+
+    def grew(self, written):
+        """
+        Adds ``written`` bytes to the running cache size and evicts once it passes the cap.
+        The directory is only walked to learn the size on the first write and when evicting,
+        which brings the cache down to 90% of the cap, so walks are spread out by at least a
+        tenth of the cap of new data. Other processes sharing the directory are accounted for
+        at those walks.
+        """
+        with self.lock:
+            if self.size is None:
+                self.size = self.disk_usage()
+            else:
+                self.size += written
+            if self.size > self.max_bytes:
+                self.size = self.evict()
+
+    def disk_usage(self):
+        return sum(path.stat().st_size for path in self.directory.rglob('*') if path.is_file())
+
+    def evict(self):
+        """
+        Deletes the least recently used URL entries until the cache fits in 90% of its cap,
+        along with the pages and extracted items no remaining entry refers to.
+
+        Returns:
+            int: The cache size in bytes after eviction.
+        """
+        entries = []
+        for entry_path in (self.directory / 'urls').glob('*.json'):
+            try:
+                entries.append((entry_path.stat().st_mtime, entry_path, json.loads(entry_path.read_text())['content_hash']))
+            except Exception:
+                entry_path.unlink(missing_ok=True)
+        entries.sort(key=lambda entry: entry[0])
+        references = {}
+        for _, _, digest in entries:
+            references[digest] = references.get(digest, 0) + 1
+
+        size = self.disk_usage()
+        target = self.max_bytes * 0.9
+        evicted = 0
+        for _, entry_path, digest in entries:
+            if size <= target:
+                break
+            size -= entry_path.stat().st_size
+            entry_path.unlink(missing_ok=True)
+            evicted += 1
+            references[digest] -= 1
+            if references[digest] == 0:
+                for path in list((self.directory / 'pages' / digest[:2]).glob(f"{digest}.*")) + \
+                        list((self.directory / 'parsed' / digest[:2]).glob(f"{digest}-*")):
+                    size -= path.stat().st_size
+                    path.unlink(missing_ok=True)
+        logging.info(f"Evicted {evicted} cached pages; page cache now holds {size} bytes")
+        return size
+
+
+def parser_key(scraper):
+    """
+    Identifies what a scraper extracts from a page: its class, parser backend, site spec and
+    whether the page is parsed partially. Changing any of them makes earlier extracted items
+    unusable.
+    """
+    mode = 'partial' if scraper.partial else 'full'
+    return f"{type(scraper).__name__}-{scraper.parser.name}-{mode}-{scraper.SPEC.fingerprint}"
+
+
+def cached_html(url):
+    """
+    Returns the cached HTML of ``url`` if the shared cache may serve it, else None.
+    """
+    cache = get_page_cache()
+    if cache is None:
+        return None
+    cached = cache.get(url)
+    return cached.html if cached is not None else None
+
+
+def replaying():
+    """
+    Tells whether fetches must be served from the cache only.
+    """
+    cache = get_page_cache()
+    return cache is not None and cache.replay
+
+
+def store_html(url, html):
+    cache = get_page_cache()
+    if cache is not None and html:
+        cache.put(url, html)
+
+
+def cached_items(scraper, html_text):
+    """
+    Looks up the items ``scraper`` extracted earlier from a page with identical content.
+
+    Returns:
+        tuple: ``(content_hash, parsed)`` where ``parsed`` is a dict with ``items`` and
+        ``next_url``, or None when the page has to be parsed. Both are None without a cache.
+    """
+    cache = get_page_cache()
+    if cache is None or not cache.skip_unchanged_parse:
+        return None, None
+    digest = content_hash(html_text)
+    return digest, cache.get_parsed(digest, parser_key(scraper))
+
+
+def store_items(scraper, digest, items, next_url):
+    cache = get_page_cache()
+    if cache is not None and digest is not None:
+        cache.put_parsed(digest, parser_key(scraper), items, next_url)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_page_cache():
+    """
+    Returns the process-wide PageCache configured by ``settings.SCRAPER_PAGE_CACHE``,
+    or None when the cache is disabled.
+    """
+    global _cache
+    if _cache is None:
+        config = get_page_cache_settings()
+        if not config['ENABLED']:
+            return None
+        with _cache_lock:
+            if _cache is None:
+                directory = config['DIRECTORY'] or Path(settings.BASE_DIR) / '.page_cache'
+                _cache = PageCache(
+                    directory,
+                    ttl_seconds=config['TTL_SECONDS'],
+                    max_bytes=config['MAX_BYTES'],
+                    compression=config['COMPRESSION'],
+                    skip_unchanged_parse=config['SKIP_UNCHANGED_PARSE'],
+                    replay=config['REPLAY'],
+                )
+    return _cache
+
+
+def reset_page_cache():
+    """
+    Discards the shared PageCache so the next use picks up changed settings.
+    """
+    global _cache
+    with _cache_lock:
+        _cache = None
@@ -0,0 +1,215 @@
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+DEFAULT_PARSE_POOL_SETTINGS = {
+    'ENABLED': False,           # batch commands turn the pool on with enable_parse_pool()
+    'WORKERS': None,            # parser processes; defaults to the number of CPUs
+    'START_METHOD': None,       # 'forkserver' where available, else 'spawn'
+    'MAX_TASKS_PER_CHILD': None,  # recycle a worker after this many pages (Python 3.11+)
+}
+
+
+def get_parse_pool_settings():
+    return {**DEFAULT_PARSE_POOL_SETTINGS, **getattr(settings, 'SCRAPER_PARSE_POOL', {})}
+
+
+_worker_scrapers = {}
+
+
+def _init_worker(settings_module):
+    """
+    Prepares a parser process: sets up Django so the scrapers can be imported, and loads
+    the scrapers and the sentiment lexicon before the first page arrives.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+    from . import sites  # noqa: F401 imports every scraper
+    from .utils import get_analyzer
+    get_analyzer()
+
+
+def _ping():
+    return os.getpid()
+
+
+def _extract_in_worker(scraper_class, parser_name, partial, html_text):
+    """
+    Parses one page in a parser process.
+
+    Returns:
+        tuple or None: ``(columns, rows, next_url)`` where every row is a tuple of item values
+        in ``columns`` order, so only plain strings and numbers cross the process boundary.
+        None if the page could not be parsed.
+    """
+    key = (scraper_class, parser_name, partial)
+    scraper = _worker_scrapers.get(key)
+    if scraper is None:
+        scraper = _worker_scrapers[key] = scraper_class('', parser=parser_name, partial=partial)
+    extracted = scraper.extract_page(html_text)
+    if extracted is None:
+        return None
+    items, next_url = extracted
+    columns = tuple(items[0]) if items else ()
+    return columns, [tuple(item[column] for column in columns) for item in items], next_url
+
+
+class ParsePool:
+
+    def __init__(self, workers, start_method=None, max_tasks_per_child=None):
+        """
+        Initializes a pool of parser processes shared by every scraper thread and coroutine.
+
+        Args:
+            workers (int): Number of parser processes.
+            start_method (str, optional): multiprocessing start method. Defaults to
+                'forkserver' where available, else 'spawn'; forking the threaded server
+                process directly is avoided.
+            max_tasks_per_child (int, optional): Pages a worker parses before it is replaced.
+
+        Returns:
+            None
+
+        Fetching stays in the I/O threads and coroutines; parsing and extraction, which are
+        CPU-bound and serialized by the GIL within one interpreter, run in the pool. The
+        processes are started and warmed up (Django, scrapers, sentiment lexicon) as soon as
+        the pool is created and are reused for every page.
+        """
+        methods = multiprocessing.get_all_start_methods()
+        if start_method is None:
+            start_method = 'forkserver' if 'forkserver' in methods else 'spawn'
+        self.workers = workers
+        self.start_method = start_method
+        options = {}
+        if max_tasks_per_child:
+            options['max_tasks_per_child'] = max_tasks_per_child
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_worker,
+            initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'ecommerce_scraping.settings'),),
+            **options,
+        )
+        for _ in range(workers):
+            self.executor.submit(_ping)
+
+    def submit(self, scraper, html_text):
+        """
+        Queues a page for parsing in a worker process.
+
+        Returns:
+            Future: Resolves to the compact result of the worker; see unpack().
+        """
+        return self.executor.submit(_extract_in_worker, type(scraper), scraper.parser.name, scraper.partial, html_text)
+
+    def unpack(self, extracted):
+        """
+        Rebuilds the item dicts from a worker's ``(columns, rows, next_url)`` result.
+
+        Returns:
+            tuple or None: ``(items, next_url)``, or None if the page could not be parsed.
+        """
+        if extracted is None:
+            return None
+        columns, rows, next_url = extracted
+        return [dict(zip(columns, row)) for row in rows], next_url
+
+    def extract_page(self, scraper, html_text):
+        """
+        Parses a page in a worker process and waits for its items.
+
+        Parameters:
+            scraper: The scraper whose site spec and parser backend are used.
+            html_text (str): The HTML content of the page.
+
+        Returns:
+            tuple or None: ``(items, next_url)`` as returned by ``scraper.extract_page``.
+
+        Raises:
+            BrokenProcessPool: If a worker died; the caller falls back to parsing inline.
+        """
+        return self.unpack(self.submit(scraper, html_text).result())
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_enabled_workers = None     # set by enable_parse_pool()
+
+
+def enable_parse_pool(workers=None):
+    """
+    Turns the shared ParsePool on in this process whatever ``SCRAPER_PARSE_POOL['ENABLED']``
+    says. Called by the long-running crawl commands when given ``--parse-workers``; web workers
+    leave it off, so every one of them does not start its own pool of parser processes.
+
+    Parameters:
+        workers (int, optional): Parser processes. Defaults to ``SCRAPER_PARSE_POOL['WORKERS']``,
+            then the number of CPUs. Fewer than two leaves parsing inline.
+    """
+    global _enabled_workers
+    shutdown_parse_pool(wait=False)
+    _enabled_workers = workers or get_parse_pool_settings()['WORKERS'] or os.cpu_count() or 1
+
+
+def get_parse_pool():
+    """
+    Returns the process-wide ParsePool, or None when it is disabled or would have fewer than
+    two workers, or when called from a worker. The pool is on when enable_parse_pool() was
+    called or ``settings.SCRAPER_PARSE_POOL['ENABLED']`` is set.
+    """
+    global _pool
+    if _pool is None:
+        config = get_parse_pool_settings()
+        if _enabled_workers is not None:
+            workers = _enabled_workers
+        elif config['ENABLED']:
+            workers = config['WORKERS'] or os.cpu_count() or 1
+        else:
+            return None
+        if workers < 2 or multiprocessing.parent_process() is not None:
+            return None
+        with _pool_lock:
+            if _pool is None:
+                _pool = ParsePool(workers, config['START_METHOD'], config['MAX_TASKS_PER_CHILD'])
+                atexit.register(_pool.shutdown, wait=False)
+    return _pool
+
+
+def shutdown_parse_pool(wait=True):
+    """
+    Stops the shared ParsePool; the next parse starts a new one with the current settings.
+    """
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
+
+
+def extract_page(scraper, html_text):
+    """
+    Parses a page and extracts its items and next page URL, in the shared parse pool when
+    there is one and inline otherwise.
+
+    Returns:
+        tuple or None: ``(items, next_url)``, or None if the page could not be parsed.
+    """
+    pool = get_parse_pool()
+    if pool is None:
+        return scraper.extract_page(html_text)
+    try:
+        return pool.extract_page(scraper, html_text)
+    except BrokenProcessPool as e:
+        logging.error(f"Parse pool failed, parsing inline: {str(e)}")
+        shutdown_parse_pool(wait=False)
+        return scraper.extract_page(html_text)
@@ -0,0 +1,220 @@
+import threading
+
+import soupsieve
+from bs4 import BeautifulSoup, Tag
+from django.conf import settings
+
+try:
+    import lxml.html
+    from cssselect import GenericTranslator
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+DEFAULT_PARSER = 'lxml'
+
+
+class SoupBackend:
+    """
+    BeautifulSoup tree with soupsieve selectors; ``features`` picks the tree builder.
+    """
+
+    def __init__(self, features):
+        self.name = 'bs4-lxml' if features == 'lxml' else features
+        self.features = features
+
+    def parse(self, html_text):
+        return BeautifulSoup(html_text, self.features)
+
+    def parse_regions(self, html_text, regions):
+        # Not a SoupStrainer: it drops the elements around the regions, so html.parser, which
+        # leaves closing elements to BeautifulSoup, could no longer end an <li> at its </ul>.
+        return self.parse(regions.cut(html_text) or html_text)
+
+    def compile(self, selector):
+        return soupsieve.compile(selector)
+
+    def select(self, node, compiled):
+        return compiled.select(node)
+
+    def select_one(self, node, compiled):
+        return compiled.select_one(node)
+
+    def text(self, node):
+        return node.get_text()
+
+    def attr(self, node, name):
+        return node.get(name)
+
+    def compile_union(self, selectors):
+        return None
+
+    def select_union(self, node, compiled):
+        # soupsieve would test every element against each selector of the list in Python;
+        # the site spec's indexed matchers are cheaper, so they get all descendants instead.
+        return (child for child in node.descendants if isinstance(child, Tag))
+
+    def same(self, node, other):
+        return node is other
+
+    def tag(self, node):
+        return node.name
+
+    def classes(self, node):
+        return node.get('class') or ()
+
+    def parent(self, node):
+        return node.parent
+
+
+class LxmlBackend:
+    """
+    Native lxml.html tree with CSS selectors translated once to XPath.
+    """
+    name = 'lxml'
+
+    def __init__(self):
+        self.translator = GenericTranslator()
+
+    def parse(self, html_text):
+        return lxml.html.document_fromstring(html_text)
+
+    def parse_regions(self, html_text, regions):
+        # libxml2 has no element filter, so the regions are cut out of the text beforehand.
+        return self.parse(regions.cut(html_text) or html_text)
+
+    def compile(self, selector):
+        path = self.translator.css_to_xpath(selector)
+        return etree.XPath(path), etree.XPath(f'({path})[1]')
+
+    def select(self, node, compiled):
+        return compiled[0](node)
+
+    def select_one(self, node, compiled):
+        found = compiled[1](node)
+        return found[0] if found else None
+
+    def text(self, node):
+        return node.text_content()
+
+    def attr(self, node, name):
+        return node.get(name)
+
+    def compile_union(self, selectors):
+        return None
+
+    def select_union(self, node, compiled):
+        # A union of the translated XPaths scans the subtree once per selector step; a single
+        # C-level walk handed to the site spec's matchers is cheaper.
+        return node.iterdescendants(etree.Element)
+
+    def same(self, node, other):
+        return node is other
+
+    def tag(self, node):
+        return node.tag
+
+    def classes(self, node):
+        value = node.get('class')
+        return value.split() if value else ()
+
+    def parent(self, node):
+        return node.getparent()
+
+
+class SelectolaxBackend:
+    """
+    selectolax/lexbor tree; selectors are plain strings resolved natively by lexbor.
+    """
+    name = 'selectolax'
+
+    def parse(self, html_text):
+        return LexborHTMLParser(html_text)
+
+    def parse_regions(self, html_text, regions):
+        return self.parse(regions.cut(html_text) or html_text)
+
+    def compile(self, selector):
+        return selector
+
+    def select(self, node, compiled):
+        return node.css(compiled)
+
+    def select_one(self, node, compiled):
+        return node.css_first(compiled)
+
+    def text(self, node):
+        return node.text(deep=True)
+
+    def attr(self, node, name):
+        return node.attributes.get(name)
+
+    def compile_union(self, selectors):
+        return ', '.join(selectors)
+
+    def select_union(self, node, compiled):
+        return node.css(compiled)
+
+    def same(self, node, other):
+        return node.mem_id == other.mem_id
+
+    def tag(self, node):
+        return node.tag
+
+    def classes(self, node):
+        value = node.attributes.get('class')
+        return value.split() if value else ()
+
+    def parent(self, node):
+        return node.parent
+
+
+def available_parsers():
+    """
+    Returns the names of the parser backends that can be used in this environment.
+    """
+    names = ['html.parser']
+    if lxml is not None:
+        names += ['bs4-lxml', 'lxml']
+    if LexborHTMLParser is not None:
+        names.append('selectolax')
+    return names
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_parser_backend(name=None):
+    """
+    Returns the shared parser backend called ``name``.
+
+    Parameters:
+        name (str, optional): 'html.parser', 'bs4-lxml', 'lxml' or 'selectolax'.
+            Defaults to ``settings.SCRAPER_PARSER``.
+
+    Returns:
+        The parser backend. Falls back to 'html.parser' when the requested library is missing.
+    """
+    name = name or getattr(settings, 'SCRAPER_PARSER', DEFAULT_PARSER)
+    if name not in available_parsers():
+        name = 'html.parser'
+    backend = _backends.get(name)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(name)
+            if backend is None:
+                if name == 'lxml':
+                    backend = LxmlBackend()
+                elif name == 'selectolax':
+                    backend = SelectolaxBackend()
+                else:
+                    backend = SoupBackend('lxml' if name == 'bs4-lxml' else 'html.parser')
+                _backends[name] = backend
+    return backend
+
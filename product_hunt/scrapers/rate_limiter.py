@@ -0,0 +1,167 @@
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+
+from django.conf import settings
+
+DEFAULT_RATE_LIMIT = {
+    'RATE': 1.0,    # sustained requests per second per host
+    'BURST': 2,     # requests allowed back to back before throttling
+}
+
+
+class TokenBucket:
+
+    def __init__(self, rate, burst):
+        """
+        Initializes a thread-safe token bucket.
+
+        Args:
+            rate (float): Tokens added per second.
+            burst (int): Maximum number of tokens the bucket can hold.
+
+        Returns:
+            None
+        """
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.requests = 0   # reservations so far, i.e. requests sent to the host
+        self.lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """
+        Takes ``tokens`` from the bucket, going into debt if necessary.
+
+        Parameters:
+            tokens (int, optional): Number of tokens to take. Defaults to 1.
+
+        Returns:
+            float: Seconds the caller must wait before using the reservation (0 if none).
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= tokens
+            self.requests += tokens
+            if self.tokens >= 0 or self.rate <= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self, tokens=1):
+        """
+        Blocks the calling thread until ``tokens`` are available.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class RateLimiter:
+
+    def __init__(self, limits=None, default=None):
+        """
+        Initializes a per-host rate limiter.
+
+        Args:
+            limits (dict, optional): Maps host names to ``{'RATE': ..., 'BURST': ...}``.
+            default (dict, optional): Limit used for hosts without their own entry.
+
+        Returns:
+            None
+
+        Hosts are matched exactly first and then without a leading ``www.``.
+        """
+        self.limits = {host.lower(): limit for host, limit in (limits or {}).items()}
+        self.default = {**DEFAULT_RATE_LIMIT, **(default or {})}
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def limit_for(self, host):
+        host = (host or '').lower()
+        limit = self.limits.get(host) or self.limits.get(host[4:] if host.startswith('www.') else 'www.' + host)
+        return {**self.default, **(limit or {})}
+
+    def bucket_for(self, host):
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            with self.lock:
+                bucket = self.buckets.get(host)
+                if bucket is None:
+                    limit = self.limit_for(host)
+                    bucket = TokenBucket(limit['RATE'], limit['BURST'])
+                    self.buckets[host] = bucket
+        return bucket
+
+    def request_count(self, host):
+        """
+        Returns how many requests this process has sent to ``host`` through the limiter,
+        retries included.
+        """
+        bucket = self.buckets.get(host)
+        return bucket.requests if bucket is not None else 0
+
+    def reserve(self, url):
+        """
+        Reserves a request slot for the host of ``url`` without blocking.
+
+        Parameters:
+            url (str): The URL about to be requested.
+
+        Returns:
+            float: Seconds to wait before sending the request.
+        """
+        return self.bucket_for(urlparse(url).hostname).reserve()
+
+    def acquire(self, url):
+        """
+        Blocks until a request to the host of ``url`` is allowed.
+
+        Parameters:
+            url (str): The URL about to be requested.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        host = urlparse(url).hostname
+        wait = self.bucket_for(host).acquire()
+        if wait > 0:
+            logging.debug(f"Rate limited {host}: waited {wait:.2f}s")
+        return wait
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """
+    Returns the process-wide RateLimiter configured from ``settings.SCRAPER_RATE_LIMITS``.
+
+    Returns:
+        RateLimiter: The shared limiter.
+    """
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                limits = dict(getattr(settings, 'SCRAPER_RATE_LIMITS', {}))
+                default = limits.pop('default', None)
+                _limiter = RateLimiter(limits, default)
+    return _limiter
+
+
+def reset_rate_limiter():
+    """
+    Discards the shared RateLimiter so the next call rebuilds it from settings.
+    """
+    global _limiter
+    with _limiter_lock:
+        _limiter = None
@@ -0,0 +1,207 @@
+import heapq
+import re
+
+from .spec import Matcher
+
+VOID_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr',
+}
+
+# Markup whose content is not parsed as tags, dropped before regions are cut out.
+_opaque_start_re = re.compile(r'<(?:(script|style|template)(?=[\s/>])|!--)', re.IGNORECASE)
+_opaque_end_res = {
+    name: re.compile(rf'</{name}\s*>', re.IGNORECASE) for name in ('script', 'style', 'template')
+}
+# Attributes of a tag up to its closing '>', which may also appear inside quoted values.
+_attributes = r'''([^>"']*(?:(?:"[^"]*"|'[^']*')[^>"']*)*)'''
+_start_tag_re = re.compile(rf'<([a-zA-Z][\w:-]*){_attributes}>')
+_tag_re = re.compile(rf'<(/?)([a-zA-Z][\w:-]*){_attributes}>')
+_tag_name_re = re.compile(r'<(/?)([a-zA-Z][\w:-]*)')
+_attribute_re = re.compile(r'''([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+)))?''')
+
+
+class _AttributeReader:
+    """
+    Lets spec Compounds test the attributes of a raw start tag.
+    """
+
+    @staticmethod
+    def attr(attributes, name):
+        return attributes.get(name)
+
+
+class RegionFilter:
+
+    def __init__(self, selectors):
+        """
+        Compiles the region selectors of a site spec: the containers of a page that have to be
+        materialized (result items, pagination); the rest of the document is skipped.
+
+        Args:
+            selectors (iterable): Simple CSS selectors (type, class, id and attribute
+                selectors, no combinators).
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If a selector has combinators or syntax the spec Matcher does not support.
+        """
+        self.selectors = tuple(selectors)
+        self.compounds = []
+        self.needles = []
+        for selector in self.selectors:
+            matcher = Matcher.compile(selector)
+            if matcher is None or len(matcher.compounds) != 1:
+                raise ValueError(f"Region selectors must be simple selectors without combinators: {selector!r}")
+            compound = matcher.subject
+            self.compounds.append(compound)
+            # A literal found inside the start tag of every region; the tag itself is checked
+            # once the literal is found.
+            if compound.classes:
+                self.needles.append(re.compile(re.escape(min(compound.classes))))
+            elif compound.attrs:
+                self.needles.append(re.compile(re.escape(compound.attrs[0][0]), re.IGNORECASE))
+            else:
+                self.needles.append(re.compile(rf'<{re.escape(compound.tag)}(?=[\s/>])', re.IGNORECASE))
+        self.tag_res = {}
+
+    def match_start_tag(self, name, attributes):
+        """
+        Tells whether a start tag opens a region. ``attributes`` maps names to values; the
+        class may be given as a list or a string.
+        """
+        if not isinstance(name, str):
+            return False
+        classes = attributes.get('class') or ()
+        if isinstance(classes, str):
+            classes = classes.split()
+        tag = name.lower()
+        for compound in self.compounds:
+            if compound.matches(_AttributeReader, attributes, tag, classes):
+                return True
+        return False
+
+    def cut(self, html_text):
+        """
+        Cuts the region elements out of a page with regular expression scans and wraps them in
+        a minimal document, so only they are parsed.
+
+        Parameters:
+            html_text (str): The HTML content of the page.
+
+        Returns:
+            str or None: The reduced document, or None if no region was found, in which case
+            the whole page should be parsed.
+
+        Scripts, styles, templates and comments are dropped first. An element then runs to
+        its matching end tag, or to the end tag of an enclosing element when its own is left
+        out; an element that is never closed runs to the end of the page, which keeps
+        everything the parser would have put in it. The scans are literal searches, so the page
+        chrome costs little more than a copy.
+        """
+        html_text = strip_opaque(html_text)
+        pieces = []
+        position = 0
+        hits = heapq.merge(*(needle.finditer(html_text) for needle in self.needles), key=lambda hit: hit.start())
+        for hit in hits:
+            if hit.start() < position:
+                continue
+            tag_start = html_text.rfind('<', position, hit.start() + 1)
+            start_tag = _start_tag_re.match(html_text, tag_start) if tag_start >= 0 else None
+            if start_tag is None or start_tag.end() <= hit.start():
+                continue
+            name = start_tag.group(1).lower()
+            attributes = {
+                key.lower(): next((value for value in values if value), '')
+                for key, *values in _attribute_re.findall(start_tag.group(2).rstrip('/'))
+            }
+            if not self.match_start_tag(name, attributes):
+                continue
+            end = self.element_end(html_text, name, tag_start, start_tag.end())
+            pieces.append(html_text[tag_start:end])
+            position = end
+        if not pieces:
+            return None
+        return '<html><body>' + ''.join(pieces) + '</body></html>'
+
+    def element_end(self, html_text, name, start, position):
+        """
+        Returns where the element whose start tag spans ``start:position`` ends: after its
+        matching end tag, found by counting the tags of its name. An element that is not closed
+        that way is read tag by tag with enclosed_end().
+        """
+        # HTML ignores the '/' of a self-closed <div/>, so only void elements end at their start tag.
+        if name in VOID_TAGS:
+            return position
+        tag_re = self.tag_res.get(name)
+        if tag_re is None:
+            tag_re = self.tag_res[name] = re.compile(rf'<(/?){re.escape(name)}(?=[\s/>])[^>]*>', re.IGNORECASE)
+        depth = 1
+        for match in tag_re.finditer(html_text, position):
+            depth += -1 if match.group(1) else 1
+            if not depth:
+                return match.end()
+        return self.enclosed_end(html_text, name, start, position)
+
+    def enclosed_end(self, html_text, name, start, position):
+        """
+        Finds the end of an element left open: it ends before the end tag of an element it is
+        nested in (an ``<li>`` without ``</li>`` ends at ``</ul>``), as it does in the parser,
+        or else runs to the end of the page.
+        """
+        stack = [name]
+        open_before = None
+        for match in _tag_re.finditer(html_text, position):
+            tag = match.group(2).lower()
+            if not match.group(1):
+                if tag not in VOID_TAGS:
+                    stack.append(tag)
+                continue
+            if tag in stack:
+                del stack[len(stack) - 1 - stack[::-1].index(tag):]
+                if not stack:
+                    return match.end()
+                continue
+            # An end tag for nothing opened inside the element either closes an ancestor, and
+            # with it the element, or is a stray one the parser ignores.
+            if open_before is None:
+                open_before = open_tag_counts(html_text, start)
+            if open_before.get(tag, 0) > 0:
+                return match.start()
+        return len(html_text)
+
+
+def open_tag_counts(html_text, end):
+    """
+    Counts, per tag name, start tags minus end tags in ``html_text[:end]``: a positive count
+    means an element of that name may still be open there.
+    """
+    counts = {}
+    for closing, tag in _tag_name_re.findall(html_text, 0, end):
+        tag = tag.lower()
+        counts[tag] = counts.get(tag, 0) + (-1 if closing else 1)
+    return counts
+
+
+def strip_opaque(html_text):
+    """
+    Drops scripts, styles, templates and comments from a page; an unterminated one runs to
+    the end of the page.
+    """
+    pieces = []
+    position = 0
+    while True:
+        match = _opaque_start_re.search(html_text, position)
+        if match is None:
+            break
+        pieces.append(html_text[position:match.start()])
+        name = match.group(1)
+        if name is None:
+            end = html_text.find('-->', match.end())
+            position = len(html_text) if end < 0 else end + 3
+        else:
+            end = _opaque_end_res[name.lower()].search(html_text, match.end())
+            position = len(html_text) if end is None else end.end()
+    pieces.append(html_text[position:])
+    return ''.join(pieces)
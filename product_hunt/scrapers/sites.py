@@ -0,0 +1,32 @@
+from collections import namedtuple
+from urllib.parse import quote_plus
+
+from .AmazonScraper import AmazonScraper
+from .EbayScraper import EbayScraper
+from .NeweggScraper import NeweggScraper
+
+Site = namedtuple('Site', ['name', 'scraper_class', 'search_url'])
+
+# Add other scrapers here
+SITES = [
+    Site('Amazon', AmazonScraper, 'https://www.amazon.com/s?k={keyword}'),
+    Site('Ebay', EbayScraper, 'https://www.ebay.com/sch/i.html?_nkw={keyword}'),
+    Site('Newegg', NeweggScraper, 'https://www.newegg.com/p/pl?d={keyword}'),
+]
+
+
+def build_search_url(site, keyword):
+    """
+    Returns the first search results page of ``site`` for ``keyword``.
+    """
+    return site.search_url.format(keyword=quote_plus(keyword))
+
+
+def get_site(name):
+    """
+    Returns the registered Site called ``name`` (case-insensitive), or None.
+    """
+    for site in SITES:
+        if site.name.lower() == name.lower():
+            return site
+    return None
@@ -0,0 +1,369 @@
+import hashlib
+import json
+import re
+import threading
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Callable, Dict, Optional
+
+# Product fields every site spec provides; other spec fields are helpers read by ``finalize``.
+PRODUCT_FIELDS = ('name', 'price', 'reviews', 'product_url', 'image_url')
+
+
+def collapse_whitespace(text):
+    """
+    Collapses runs of whitespace into single spaces and trims the ends.
+    """
+    return ' '.join(text.split())
+
+
+def strip(text):
+    return text.strip()
+
+
+@dataclass(frozen=True)
+class Field:
+    """
+    How one value is read from a search result item.
+
+    Attributes:
+        selector (str): CSS selector of the element, relative to the item.
+        attr (str, optional): Attribute holding the value. Defaults to the element text.
+        pattern (str, optional): Regular expression searched in the value. A value it does
+            not match is treated as missing.
+        template (str, optional): Format string for the value, given the regex groups (or
+            the whole value without a pattern) as positional arguments, e.g. ``'{0}/{1}'``.
+        clean (callable, optional): Post-processor applied last, e.g. collapse_whitespace.
+        default (optional): Value used when the element, attribute or match is missing or empty.
+    """
+    selector: str
+    attr: Optional[str] = None
+    pattern: Optional[str] = None
+    template: Optional[str] = None
+    clean: Optional[Callable] = None
+    default: object = None
+
+    def describe(self):
+        return {
+            'selector': self.selector,
+            'attr': self.attr,
+            'pattern': self.pattern,
+            'template': self.template,
+            'clean': getattr(self.clean, '__qualname__', None),
+            'default': self.default,
+        }
+
+
+@dataclass(frozen=True)
+class SiteSpec:
+    """
+    Declarative description of a marketplace's search result pages.
+
+    Attributes:
+        name (str): The website name products are stored under.
+        items (str): CSS selector of the result items on a page.
+        fields (dict): Maps field names to Field. Must cover PRODUCT_FIELDS.
+        next_page (Field): Reads the next page URL from the whole page.
+        page_param (str, optional): Query parameter of numbered result pages, so pages can be
+            fetched concurrently. None if the site only supports following "next".
+        referer (str, optional): Referer header sent with page requests.
+        regions (tuple, optional): Simple selectors of the containers holding everything the
+            spec reads (result items, pagination). When set, only these are materialized
+            when a page is parsed and the rest of the document is skipped.
+        finalize (callable, optional): Called with the field values of an item after
+            extraction and returns them, for rules spanning several fields.
+    """
+    name: str
+    items: str
+    fields: Dict[str, Field]
+    next_page: Field
+    page_param: Optional[str] = None
+    referer: str = ''
+    regions: tuple = ()
+    finalize: Optional[Callable] = None
+
+    @cached_property
+    def fingerprint(self):
+        """
+        Hash of everything that affects what is extracted from a page, so results extracted
+        with an older spec are recognised as stale.
+        """
+        description = {
+            'items': self.items,
+            'fields': {name: field.describe() for name, field in self.fields.items()},
+            'next_page': self.next_page.describe(),
+            'regions': list(self.regions),
+            'finalize': getattr(self.finalize, '__qualname__', None),
+        }
+        return hashlib.sha1(json.dumps(description, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+_token_re = re.compile(r"""
+    (?P<child>\s*>\s*)
+  | (?P<descendant>\s+)
+  | (?P<tag>[a-zA-Z][\w-]*|\*)
+  | \.(?P<cls>[\w-]+)
+  | \#(?P<id>[\w-]+)
+  | \[\s*(?P<attr>[\w-]+)\s*(?:=\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<bare>[\w-]+))\s*)?\]
+""", re.VERBOSE)
+
+
+@dataclass(frozen=True)
+class Compound:
+    tag: Optional[str]
+    classes: frozenset
+    attrs: tuple  # (name, value or None for presence) pairs; ids are stored as ('id', value)
+
+    def matches(self, backend, node, tag, classes):
+        if self.tag is not None and tag != self.tag:
+            return False
+        if self.classes and not self.classes.issubset(classes):
+            return False
+        for name, value in self.attrs:
+            actual = backend.attr(node, name)
+            if actual is None or (value is not None and actual != value):
+                return False
+        return True
+
+
+class Matcher:
+    """
+    Tests single elements against a CSS selector made of type, class, id and attribute
+    selectors joined by descendant or child combinators.
+    """
+
+    def __init__(self, compounds, combinators):
+        self.compounds = compounds
+        self.combinators = combinators  # combinators[i] joins compounds[i] and compounds[i + 1]
+        self.subject = compounds[-1]
+
+    @classmethod
+    def compile(cls, selector):
+        """
+        Returns a Matcher for ``selector``, or None if it uses syntax the matcher does not
+        support (pseudo-classes, selector lists, sibling combinators); such selectors are
+        resolved by the parser backend instead.
+        """
+        compounds, combinators = [], []
+        tag, classes, attrs, position = None, set(), [], 0
+        selector = selector.strip()
+        while position < len(selector):
+            match = _token_re.match(selector, position)
+            if match is None:
+                return None
+            position = match.end()
+            if match.group('child') is not None or match.group('descendant') is not None:
+                if tag is None and not classes and not attrs:
+                    return None
+                compounds.append(Compound(tag, frozenset(classes), tuple(attrs)))
+                combinators.append('>' if match.group('child') is not None else ' ')
+                tag, classes, attrs = None, set(), []
+            elif match.group('tag') is not None:
+                if tag is not None or classes or attrs:
+                    return None
+                tag = None if match.group('tag') == '*' else match.group('tag').lower()
+            elif match.group('cls') is not None:
+                classes.add(match.group('cls'))
+            elif match.group('id') is not None:
+                attrs.append(('id', match.group('id')))
+            else:
+                value = next((v for v in match.group('dq', 'sq', 'bare') if v is not None), None)
+                attrs.append((match.group('attr').lower(), value))
+        if tag is None and not classes and not attrs:
+            return None
+        compounds.append(Compound(tag, frozenset(classes), tuple(attrs)))
+        return cls(compounds, combinators)
+
+    def matches(self, backend, node, tag, classes, root):
+        """
+        Tells whether ``node`` matches, looking for the ancestors of the selector no higher
+        than ``root``.
+        """
+        if not self.subject.matches(backend, node, tag, classes):
+            return False
+        return self.match_ancestors(backend, node, len(self.compounds) - 2, root)
+
+    def match_ancestors(self, backend, node, index, root):
+        if index < 0:
+            return True
+        compound = self.compounds[index]
+        parent = backend.parent(node)
+        while parent is not None:
+            if compound.matches(backend, parent, backend.tag(parent), backend.classes(parent)) \
+                    and self.match_ancestors(backend, parent, index - 1, root):
+                return True
+            if self.combinators[index] == '>' or backend.same(parent, root):
+                return False
+            parent = backend.parent(parent)
+        return False
+
+
+class CompiledSpec:
+
+    def __init__(self, spec, backend):
+        """
+        Compiles a SiteSpec for one parser backend.
+
+        Args:
+            spec (SiteSpec): The site spec.
+            backend: The parser backend whose trees are extracted from.
+
+        Returns:
+            None
+
+        All fields of an item are found in a single pass over its subtree instead of one query
+        per field. The backend yields, in document order, the elements that may match any
+        field selector (a native selector-list query, or simply every descendant), and a
+        Matcher per field decides which fields each element fills. Matchers are indexed by
+        the class or tag of the selector's rightmost element, so each element is only tested
+        against the fields it can belong to. Selectors the Matcher does not understand are
+        queried separately.
+        """
+        from .regions import RegionFilter  # regions builds on the Matcher defined here
+
+        self.spec = spec
+        self.backend = backend
+        self.regions = RegionFilter(spec.regions) if spec.regions else None
+        self.items = backend.compile(spec.items)
+        self.next_page = backend.compile(spec.next_page.selector)
+        self.selectors = {name: backend.compile(field.selector) for name, field in spec.fields.items()}
+        self.patterns = {
+            name: re.compile(field.pattern)
+            for name, field in list(spec.fields.items()) + [('next_page', spec.next_page)]
+            if field.pattern
+        }
+        self.matched, self.queried = [], []
+        self.by_class, self.by_tag, self.by_attr = {}, {}, []
+        for name, field in spec.fields.items():
+            matcher = Matcher.compile(field.selector)
+            if matcher is None:
+                self.queried.append(name)
+                continue
+            self.matched.append(name)
+            subject = matcher.subject
+            if subject.classes:
+                self.by_class.setdefault(min(subject.classes), []).append((name, matcher))
+            elif subject.tag is not None:
+                self.by_tag.setdefault(subject.tag, []).append((name, matcher))
+            else:
+                self.by_attr.append((name, matcher))
+        selectors = dict.fromkeys(spec.fields[name].selector for name in self.matched)
+        self.union = backend.compile_union(list(selectors))
+
+    def find_nodes(self, item):
+        """
+        Finds the first element matching each field selector within ``item``, in document
+        order, in one pass that stops as soon as every field is found.
+
+        Returns:
+            dict: Maps field names to elements (None when a field has no match).
+        """
+        backend = self.backend
+        found = dict.fromkeys(self.spec.fields)
+        pending = len(self.matched)
+        if pending:
+            by_class, by_tag, by_attr = self.by_class, self.by_tag, self.by_attr
+            for node in backend.select_union(item, self.union):
+                tag = backend.tag(node)
+                classes = backend.classes(node)
+                candidates = by_tag.get(tag, [])
+                for class_name in classes:
+                    if class_name in by_class:
+                        candidates = candidates + by_class[class_name]
+                if by_attr:
+                    candidates = candidates + by_attr
+                for name, matcher in candidates:
+                    if found[name] is None and matcher.matches(backend, node, tag, classes, item):
+                        found[name] = node
+                        pending -= 1
+                if not pending:
+                    break
+        for name in self.queried:
+            found[name] = backend.select_one(item, self.selectors[name])
+        return found
+
+    def value(self, name, field, node):
+        """
+        Reads a field from its element and applies the field's post-processors.
+        """
+        if node is None:
+            value = None
+        elif field.attr:
+            value = self.backend.attr(node, field.attr)
+        else:
+            value = self.backend.text(node)
+        if value and field.pattern:
+            match = self.patterns[name].search(value)
+            if match is None:
+                value = None
+            elif field.template:
+                value = field.template.format(*(match.groups() or (match.group(0),)))
+            else:
+                value = match.group(0)
+        elif value and field.template:
+            value = field.template.format(value)
+        if value and field.clean:
+            value = field.clean(value)
+        return value if value else field.default
+
+    def extract(self, item, names=None):
+        """
+        Extracts the fields of one result item.
+
+        Args:
+            item: The item element.
+            names (iterable, optional): Fields to extract, each with its own query. Defaults to
+                all fields, found together, in which case the spec's ``finalize`` rule is
+                applied too.
+
+        Returns:
+            dict: Maps field names to values.
+        """
+        fields = self.spec.fields
+        if names is not None:
+            return {
+                name: self.value(name, fields[name], self.backend.select_one(item, self.selectors[name]))
+                for name in names
+            }
+        values = {name: self.value(name, fields[name], node) for name, node in self.find_nodes(item).items()}
+        if self.spec.finalize is not None:
+            values = self.spec.finalize(values)
+        return values
+
+    def parse(self, html_text, partial=True):
+        """
+        Parses a page, materializing only the spec's regions when ``partial`` is set and the
+        spec declares them.
+        """
+        if partial and self.regions is not None:
+            return self.backend.parse_regions(html_text, self.regions)
+        return self.backend.parse(html_text)
+
+    def select_items(self, page):
+        return self.backend.select(page, self.items)
+
+    def next_page_url(self, page):
+        node = self.backend.select_one(page, self.next_page)
+        return self.value('next_page', self.spec.next_page, node)
+
+
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+def compile_spec(spec, backend):
+    """
+    Compiles ``spec`` for ``backend`` once and caches the result.
+
+    Returns:
+        CompiledSpec
+    """
+    key = (spec.name, spec.fingerprint, backend.name)
+    compiled = _compiled.get(key)
+    if compiled is None:
+        with _compiled_lock:
+            compiled = _compiled.get(key)
+            if compiled is None:
+                compiled = CompiledSpec(spec, backend)
+                _compiled[key] = compiled
+    return compiled
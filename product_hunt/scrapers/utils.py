@@ -1,19 +1,79 @@
 from textblob import TextBlob
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import re
+import threading
+from functools import lru_cache
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Distinct review strings kept in the sentiment cache. Strings such as
+# "4.5 out of 5 stars" repeat constantly, so the hit rate is high.
+SENTIMENT_CACHE_SIZE = 8192
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+_whitespace_re = re.compile(r'\s+')
+
+
+def get_analyzer():
+    """
+    Returns the process-wide VADER analyzer, loading its lexicon on first use.
+    """
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer
+
+
+def normalize_review(review):
+    """
+    Normalizes review text for scoring and caching: collapses whitespace and trims it.
+    Case is kept because VADER uses capitalisation as an intensity signal.
+    """
+    if not review:
+        return ''
+    return _whitespace_re.sub(' ', str(review)).strip()
+
+
+@lru_cache(maxsize=SENTIMENT_CACHE_SIZE)
+def _cached_polarity_scores(normalized_review):
+    return get_analyzer().polarity_scores(normalized_review)
+
 
 def sentiment_score(review):
-    """_summary_ sentences_polarity( sentences, sentence_polarity):
+    """
+    Scores the sentiment of a review with the shared VADER analyzer, memoized on the normalized text.
+
+    Args:
+        review (str): The text to be analyzed.
+
+    Returns:
+        dict: The VADER scores ('neg', 'neu', 'pos' and 'compound').
+    """
+    return dict(_cached_polarity_scores(normalize_review(review)))
+
+
+def score_many(reviews):
+    """
+    Scores a batch of reviews, analyzing each distinct normalized text only once.
 
-    Args:       
-        text (_type_): The text to be analyzed. 
+    Args:
+        reviews (iterable): The texts to be analyzed.
 
     Returns:
-        _type_: The polarity of the text in form of percentage.
+        list: One VADER score dict per review, in input order.
+    """
+    normalized = [normalize_review(review) for review in reviews]
+    scores = {text: _cached_polarity_scores(text) for text in set(normalized)}
+    return [dict(scores[text]) for text in normalized]
+
+
+def sentiment_cache_info():
     """
-    analyzer = SentimentIntensityAnalyzer()
-    score = analyzer.polarity_scores(review)
-    return score
+    Returns the hit/miss statistics of the sentiment cache.
+    """
+    return _cached_polarity_scores.cache_info()
 
 def sentiment_label(score, **kwargs):
     if score['compound'] < -0.7:
@@ -28,4 +88,21 @@ def sentiment_label(score, **kwargs):
         return "Positive"
     elif score['compound'] > 0.3 and score['compound'] <= 0.5:
         return "Slightly Positive"
-    
\ No newline at end of file
+
+
+def set_query_param(url, name, value):
+    """
+    Returns ``url`` with the query parameter ``name`` set to ``value``.
+
+    Args:
+        url (str): The URL to modify.
+        name (str): The query parameter name.
+        value: The new parameter value.
+
+    Returns:
+        str: The modified URL.
+    """
+    parts = urlsplit(url)
+    query = [(key, val) for key, val in parse_qsl(parts.query, keep_blank_values=True) if key != name]
+    query.append((name, str(value)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
@@ -0,0 +1,209 @@
+import re
+
+from django.db import connection, connections
+from django.db.models import Q
+
+from .models import Product
+
+# SQLite: FTS5 index over Product.name and Product.keyword, kept in sync by triggers.
+FTS_TABLE = 'product_hunt_product_fts'
+PRODUCT_TABLE = 'product_hunt_product'
+# bm25 column weights: a match in the product name counts more than one in the keyword.
+FTS_RANK = f'bm25({FTS_TABLE}, 10.0, 2.0)'
+
+SQLITE_INSTALL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, keyword,
+        content='{PRODUCT_TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {PRODUCT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, keyword) VALUES (new.id, new.name, new.keyword);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {PRODUCT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, keyword) VALUES ('delete', old.id, old.name, old.keyword);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, keyword ON {PRODUCT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, keyword) VALUES ('delete', old.id, old.name, old.keyword);
+        INSERT INTO {FTS_TABLE}(rowid, name, keyword) VALUES (new.id, new.name, new.keyword);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_UNINSTALL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+SQLITE_TRIGGERS = {f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au'}
+
+# PostgreSQL: generated tsvector column (name weighted A, keyword B) with a GIN index.
+POSTGRES_INSTALL = [
+    f"""ALTER TABLE {PRODUCT_TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(keyword, '')), 'B')
+        ) STORED""",
+    f"CREATE INDEX IF NOT EXISTS {PRODUCT_TABLE}_search_vector_idx ON {PRODUCT_TABLE} USING GIN (search_vector)",
+]
+POSTGRES_UNINSTALL = [
+    f"DROP INDEX IF EXISTS {PRODUCT_TABLE}_search_vector_idx",
+    f"ALTER TABLE {PRODUCT_TABLE} DROP COLUMN IF EXISTS search_vector",
+]
+
+FIELD_WEIGHTS = {'name': 'A', 'keyword': 'B'}
+_token_re = re.compile(r'\w+', re.UNICODE)
+
+
+def install_search_index(schema_editor):
+    """
+    Creates the full-text index for the current database vendor. Other vendors are left
+    without an index and fall back to icontains filtering.
+    """
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_INSTALL, 'postgresql': POSTGRES_INSTALL}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def uninstall_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRES_UNINSTALL}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def ensure_search_index(using='default', **kwargs):
+    """
+    Reinstalls the SQLite triggers, and rebuilds the index, when a migration dropped them.
+
+    Connected to ``post_migrate``. SQLite alters a table by copying it into a new one, which
+    drops the table's triggers but not the FTS table, so any migration touching the product
+    table would leave the index silently out of date. Nothing is done when the FTS table does
+    not exist (migration 0002 not applied) or every trigger is in place. PostgreSQL alters
+    tables in place, so its generated column and index survive migrations.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT type, name FROM sqlite_master WHERE name = %s OR type = 'trigger'", [FTS_TABLE])
+        rows = cursor.fetchall()
+    if ('table', FTS_TABLE) not in rows:
+        return
+    if SQLITE_TRIGGERS <= {name for kind, name in rows if kind == 'trigger'}:
+        return
+    with connection.cursor() as cursor:
+        for statement in SQLITE_INSTALL:
+            cursor.execute(statement)
+
+
+def tokenize(text):
+    """
+    Splits a search string into lowercase word tokens; punctuation and operators are dropped.
+    """
+    return _token_re.findall((text or '').lower())
+
+
+def sqlite_match_query(tokens, fields):
+    terms = ' '.join(f'"{token}"*' for token in tokens)
+    if fields and set(fields) != set(FIELD_WEIGHTS):
+        return f"{{{' '.join(fields)}}} : ({terms})"
+    return terms
+
+
+def postgres_tsquery(tokens, fields):
+    weights = ''.join(FIELD_WEIGHTS[field] for field in fields) if fields else ''
+    return ' & '.join(f'{token}:*{weights}' for token in tokens)
+
+
+def rank_sql(query, fields=None):
+    """
+    Returns the SQL of the relevance ``search`` ranks products by for ``query``.
+
+    Parameters:
+        query (str): The user's search string.
+        fields (tuple, optional): The fields matched, as passed to ``search``.
+
+    Returns:
+        tuple or None: ``(sql, params, descending)``; ``descending`` tells whether a higher
+        value is a better match. None when the query has no words or the database has no
+        full-text index, in which case search results have no ``search_rank``.
+    """
+    fields = tuple(fields or FIELD_WEIGHTS)
+    tokens = tokenize(query)
+    if not tokens:
+        return None
+    if connection.vendor == 'sqlite':
+        return FTS_RANK, [], False  # bm25 is negative; lower is better
+    if connection.vendor == 'postgresql':
+        return "ts_rank(search_vector, to_tsquery('simple', %s))", [postgres_tsquery(tokens, fields)], True
+    return None
+
+
+def row_rank_sql(query, fields=None):
+    """
+    Returns a scalar subquery computing the ``rank_sql`` relevance of one product for ``query``,
+    so a row's rank can be compared with other rows' ranks inside the same statement.
+
+    Returns:
+        tuple or None: ``(sql, params)``; the SQL ends with a placeholder for the product id,
+        which the caller appends to ``params``. None whenever ``rank_sql`` is None.
+    """
+    fields = tuple(fields or FIELD_WEIGHTS)
+    tokens = tokenize(query)
+    if not tokens:
+        return None
+    if connection.vendor == 'sqlite':
+        sql = f"SELECT {FTS_RANK} FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = %s"
+        return sql, [sqlite_match_query(tokens, fields)]
+    if connection.vendor == 'postgresql':
+        sql = f"SELECT ts_rank(search_vector, to_tsquery('simple', %s)) FROM {PRODUCT_TABLE} WHERE id = %s"
+        return sql, [postgres_tsquery(tokens, fields)]
+    return None
+
+
+def search(query, fields=None, queryset=None):
+    """
+    Full-text searches products, ranked best match first.
+
+    Parameters:
+        query (str): The user's search string. Every word must match, as a prefix.
+        fields (tuple, optional): Restricts matching to 'name' and/or 'keyword'. Defaults to both.
+        queryset (QuerySet, optional): Base queryset to search in. Defaults to all products.
+
+    Returns:
+        QuerySet: Matching products annotated with ``search_rank`` and ordered by it.
+    """
+    queryset = queryset if queryset is not None else Product.objects.all()
+    fields = tuple(fields or FIELD_WEIGHTS)
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset.none()
+
+    rank = rank_sql(query, fields)
+    if connection.vendor == 'sqlite':
+        return queryset.extra(
+            select={'search_rank': rank[0]},
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = {PRODUCT_TABLE}.id', f'{FTS_TABLE} MATCH %s'],
+            params=[sqlite_match_query(tokens, fields)],
+            order_by=['search_rank'],
+        )
+    if connection.vendor == 'postgresql':
+        tsquery = postgres_tsquery(tokens, fields)
+        return queryset.extra(
+            select={'search_rank': rank[0]},
+            select_params=rank[1],
+            where=["search_vector @@ to_tsquery('simple', %s)"],
+            params=[tsquery],
+            order_by=['-search_rank'],
+        )
+
+    for token in tokens:
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f'{field}__icontains': token})
+        queryset = queryset.filter(condition)
+    return queryset
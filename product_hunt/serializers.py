@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Product, Website
+from .models import Product, ScrapeJob, Website
 
 class ProductSerializer(serializers.ModelSerializer):
     class Meta:
@@ -7,7 +7,54 @@ class ProductSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class ProductListSerializer(serializers.ModelSerializer):
+    """
+    Lightweight product card without the review text. Pass ``fields`` to project a subset.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'name', 'price', 'price_cents', 'currency', 'product_url', 'image_url', 'website',
+            'sentiment_score', 'sentiment_label', 'keyword',
+        ]
+
+
+class ProductProjectionSerializer(ProductListSerializer):
+    """
+    Any product field, including reviews, selectable through ``fields``.
+    """
+
+    class Meta(ProductListSerializer.Meta):
+        fields = '__all__'
+
+
+class RankedProductSerializer(ProductListSerializer):
+    """
+    Product card with the score and position assigned by ranking.rank_products().
+    """
+    rank_score = serializers.FloatField(read_only=True)
+    rank_position = serializers.IntegerField(read_only=True)
+    price_percentile = serializers.FloatField(read_only=True)
+    site_weight = serializers.FloatField(read_only=True)
+
+    class Meta(ProductListSerializer.Meta):
+        fields = ProductListSerializer.Meta.fields + ['rank_score', 'rank_position', 'price_percentile', 'site_weight']
+
+
 class WebsiteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Website
         fields = '__all__'
+
+
+class ScrapeJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ScrapeJob
+        fields = '__all__'
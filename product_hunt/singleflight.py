@@ -0,0 +1,189 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import CrawlLease
+
+DEFAULT_CRAWL_LEASE_SECONDS = 300
+DEFAULT_CRAWL_LEASE_POLL_SECONDS = 0.5
+
+
+def normalize_keyword(keyword):
+    """
+    Normalizes a search keyword so equivalent searches share crawls, caches and metadata.
+    """
+    return ' '.join((keyword or '').lower().split())
+
+
+class _Call:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+
+    def __init__(self, lease_seconds=None, poll_seconds=None):
+        """
+        Initializes a coalescer that runs at most one call per key at a time.
+
+        Args:
+            lease_seconds (int, optional): How long a cross-process lease stays valid if its
+                holder dies. Defaults to ``settings.CRAWL_LEASE_SECONDS``.
+            poll_seconds (float, optional): How often waiters check a lease held by another process.
+
+        Returns:
+            None
+
+        Threads of this process share one in-flight call per key. Across processes, the
+        caller that runs the call holds a CrawlLease row; other processes wait for it to go away.
+        The holder renews the lease every third of its lifetime while the call runs, so only
+        a holder that died loses it.
+        """
+        self.lease_seconds = lease_seconds or getattr(settings, 'CRAWL_LEASE_SECONDS', DEFAULT_CRAWL_LEASE_SECONDS)
+        self.heartbeat_seconds = self.lease_seconds / 3
+        self.poll_seconds = poll_seconds or DEFAULT_CRAWL_LEASE_POLL_SECONDS
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.owner_prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    def do(self, key, fn, recheck=None):
+        """
+        Runs ``fn()`` unless a call for ``key`` is already in flight, in which case this
+        caller waits for that call and shares its outcome.
+
+        Parameters:
+            key (str): The coalescing key, e.g. a normalized keyword.
+            fn (callable): The work to run.
+            recheck (callable, optional): Called once the lease is held; if it returns False
+                the work is skipped because another process has just completed it.
+
+        Returns:
+            tuple: ``(result, ran)`` where ``ran`` tells whether this process ran ``fn``.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, False
+
+        try:
+            call.result, ran = self.run_with_lease(key, fn, recheck)
+            return call.result, ran
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                self.calls.pop(key, None)
+            call.done.set()
+
+    def run_with_lease(self, key, fn, recheck):
+        owner = f"{self.owner_prefix}:{uuid.uuid4().hex}"
+        deadline = time.monotonic() + self.lease_seconds
+        while not self.acquire_lease(key, owner):
+            if time.monotonic() > deadline:
+                logging.warning(f"Gave up waiting for the crawl lease on '{key}'")
+                return None, False
+            time.sleep(self.poll_seconds)
+            if not CrawlLease.objects.filter(key=key).exists():
+                # The other process finished; its rows are already committed.
+                return None, False
+        stop = threading.Event()
+        heartbeat = threading.Thread(
+            target=self.keep_lease, args=(key, owner, stop), name=f'lease-heartbeat:{key}', daemon=True,
+        )
+        heartbeat.start()
+        try:
+            if recheck is not None and not recheck():
+                return None, False
+            return fn(), True
+        finally:
+            stop.set()
+            heartbeat.join()
+            released, _ = CrawlLease.objects.filter(key=key, owner=owner).delete()
+            if not released:
+                logging.warning(f"The crawl lease on '{key}' was taken over before the crawl finished")
+
+    def keep_lease(self, key, owner, stop):
+        """
+        Renews the lease every ``heartbeat_seconds`` until ``stop`` is set, on its own thread.
+        Stops early if the lease was lost, e.g. after the database was unreachable for longer
+        than the lease lifetime and another process took it over.
+        """
+        try:
+            while not stop.wait(self.heartbeat_seconds):
+                if not self.renew_lease(key, owner):
+                    logging.warning(f"Lost the crawl lease on '{key}'")
+                    return
+        except Exception as e:
+            logging.error(f"Could not renew the crawl lease on '{key}': {str(e)}")
+        finally:
+            connection.close()
+
+    def renew_lease(self, key, owner):
+        """
+        Extends the lease on ``key`` by ``lease_seconds`` from now if ``owner`` still holds it.
+
+        Returns:
+            bool: True if the lease was renewed.
+        """
+        expires_at = timezone.now() + timedelta(seconds=self.lease_seconds)
+        return CrawlLease.objects.filter(key=key, owner=owner).update(expires_at=expires_at) == 1
+
+    def acquire_lease(self, key, owner):
+        """
+        Takes the CrawlLease for ``key`` if nobody holds a live one.
+
+        Returns:
+            bool: True if ``owner`` now holds the lease.
+        """
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+        try:
+            with transaction.atomic():
+                CrawlLease.objects.create(key=key, owner=owner, expires_at=expires_at)
+            return True
+        except IntegrityError:
+            # Take over a lease whose holder died without releasing it.
+            taken = CrawlLease.objects.filter(key=key, expires_at__lt=now).update(
+                owner=owner, acquired_at=now, expires_at=expires_at,
+            )
+            return taken == 1
+
+
+_crawls = SingleFlight()
+
+
+def crawl_once(keyword, crawl, recheck=None):
+    """
+    Runs ``crawl()`` for ``keyword`` unless an equivalent crawl is already running in this
+    or another process, in which case it waits for that crawl to finish.
+
+    Parameters:
+        keyword (str): The search keyword; it is normalized to form the coalescing key.
+        crawl (callable): Performs the crawl.
+        recheck (callable, optional): Returns False if the crawl is no longer needed.
+
+    Returns:
+        bool: True if this caller ran the crawl, False if it waited on another one.
+    """
+    key = f"crawl:{normalize_keyword(keyword)}"[:255]
+    _, ran = _crawls.do(key, crawl, recheck)
+    return ran
@@ -1,3 +1,1357 @@
-from django.test import TestCase
+import asyncio
+import importlib
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import aiohttp
+import requests
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.http import QueryDict
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .bulk_crawl import SITE_SUCCEEDED, BulkCrawler, prepare_run
+from .identity import product_key
+from .benchmarks.parsing import build_scraper, load_fixtures
+from .ingestion import clear_website_cache, ingest_products
+from .models import (
+    CrawlLease, CrawlRun, CrawlRunKeyword, KeywordAccess, KeywordFreshness, Product, ScrapeJob, Website,
+)
+from .pagination import (
+    SORT_ORDERS, SORT_RELEVANCE, PaginationError, ProductPage, decode_cursor, encode_cursor, keyset_condition,
+)
+from .prices import amount_to_cents, parse_price
+from .refresh_scheduler import RefreshScheduler
+from .scrapers.AmazonScraper import join_price_fraction
+from .scrapers.async_engine import AsyncScrapeEngine
+from .scrapers.base import BaseScraper
+from .scrapers.http_client import HttpClient
+from .scrapers.page_cache import PageCache
+from .scrapers.page import PageResult
+from .scrapers.parsers import available_parsers, get_parser_backend
+from .scrapers.rate_limiter import RateLimiter, TokenBucket
+from .scrapers.regions import RegionFilter
+from .scrapers.sites import SITES, get_site
+from .scrapers.spec import Matcher
+from .singleflight import SingleFlight
+from . import export, freshness, jobs, popularity, ranking, response_cache, search_index
+from .scrapers import parse_pool
+
+# Tests must not share the on-disk response cache of the development server.
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-default'},
+    'responses': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-responses'},
+}
+
+
+def make_products(keyword, rows):
+    """
+    Creates products for ``keyword`` from ``(name, price_cents)`` pairs.
+    """
+    website = Website.objects.create(name='Amazon', url='https://www.amazon.com')
+    return [
+        Product.objects.create(
+            name=name, price=f"${price_cents / 100:.2f}" if price_cents is not None else 'N/A',
+            price_cents=price_cents, reviews='', product_url=f'https://www.amazon.com/dp/B{index:09d}',
+            product_key=f'amazon:B{index:09d}', image_url='https://example.com/i.jpg', website=website,
+            keyword=keyword,
+        )
+        for index, (name, price_cents) in enumerate(rows)
+    ]
+
+
+class CursorTests(SimpleTestCase):
+
+    def test_round_trip(self):
+        position = {'price_cents': 1999, 'id': 42}
+        self.assertEqual(decode_cursor(encode_cursor(position), ['price_cents', 'id']), position)
+
+    def test_rank_is_decoded_as_float(self):
+        cursor = encode_cursor({'search_rank': -1.25e-06, 'id': 7})
+        self.assertEqual(decode_cursor(cursor, ['search_rank', 'id']), {'search_rank': -1.25e-06, 'id': 7})
+
+    def test_invalid_cursors(self):
+        cases = [
+            ('not a cursor', ['id']),
+            (encode_cursor({'id': 1}), ['price_cents', 'id']),
+            (encode_cursor({'price_cents': None, 'id': 1}), ['price_cents', 'id']),
+            (encode_cursor(['id', 1]), ['id']),
+            (encode_cursor({'search_rank': float('nan'), 'id': 1}), ['search_rank', 'id']),
+        ]
+        for cursor, columns in cases:
+            with self.subTest(cursor=cursor), self.assertRaises(PaginationError):
+                decode_cursor(cursor, columns)
+
+    def test_unknown_sort(self):
+        with self.assertRaises(PaginationError):
+            ProductPage(QueryDict('sort=relevance'))
+
+
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        make_products('iphone', [
+            ('iPhone case', 1999), ('iPhone charger', 999), ('iPhone cable', None),
+            ('iPhone stand', 1999), ('iPhone screen', 4999), ('iPhone ring', None),
+        ])
+
+    def expected(self, order):
+        queryset = Product.objects.order_by(*order)
+        if 'price_cents' in order[0]:
+            queryset = queryset.filter(price_cents__isnull=False)
+        return list(queryset.values_list('id', flat=True))
+
+    def test_keyset_condition_selects_rows_after_position(self):
+        for sort, order in SORT_ORDERS.items():
+            expected = self.expected(order)
+            columns = [term.lstrip('-') for term in order]
+            for index, product_id in enumerate(expected):
+                with self.subTest(sort=sort, after=product_id):
+                    product = Product.objects.get(pk=product_id)
+                    position = {column: getattr(product, column) for column in columns}
+                    after = Product.objects.filter(price_cents__isnull=False) if 'price_cents' in columns else Product.objects
+                    after = after.filter(keyset_condition(order, position)).order_by(*order)
+                    self.assertEqual(list(after.values_list('id', flat=True)), expected[index + 1:])
+
+    def test_pages_cover_every_row_once(self):
+        for sort, order in SORT_ORDERS.items():
+            with self.subTest(sort=sort):
+                seen = []
+                params = QueryDict(f'sort={sort}&limit=2', mutable=True)
+                while True:
+                    page = ProductPage(params).serialize(Product.objects.all())
+                    seen += [product['id'] for product in page['results']]
+                    if not page['next_cursor']:
+                        break
+                    params['cursor'] = page['next_cursor']
+                # Products without a parsed price are left out of price sorts.
+                self.assertEqual(seen, self.expected(order))
+
+    def test_search_results_page_by_relevance(self):
+        query = 'iphone c'
+        params = QueryDict('limit=1', mutable=True)
+        order = ProductPage(params, search=(query, ('name',))).order
+        ranked = list(search_index.search(query, fields=('name',)).order_by(*order).values_list('id', flat=True))
+        self.assertEqual(len(ranked), 3)
+        seen = []
+        while True:
+            page = ProductPage(params, search=(query, ('name',)))
+            self.assertEqual(page.sort, SORT_RELEVANCE)
+            data = page.serialize(search_index.search(query, fields=('name',)))
+            seen += [product['id'] for product in data['results']]
+            if not data['next_cursor']:
+                break
+            params['cursor'] = data['next_cursor']
+        self.assertEqual(seen, ranked)
+
+    def relevance_pages(self, query, limit, between_pages=None):
+        params = QueryDict(f'limit={limit}', mutable=True)
+        pages = []
+        while True:
+            page = ProductPage(params, search=(query, ('name',)))
+            data = page.serialize(search_index.search(query, fields=('name',)))
+            pages.append([product['name'] for product in data['results']])
+            if not data['next_cursor']:
+                return pages
+            params['cursor'] = data['next_cursor']
+            if between_pages:
+                between_pages(len(pages))
+
+    def test_tied_ranks_page_by_id(self):
+        # Every name has two words, so 'iphone' ranks them all the same.
+        pages = self.relevance_pages('iphone', limit=4)
+        self.assertEqual(pages, [['iPhone case', 'iPhone charger', 'iPhone cable', 'iPhone stand'],
+                                 ['iPhone screen', 'iPhone ring']])
+
+    def test_rank_drift_between_pages(self):
+        make_products('lamp', [('lamp', 100), ('lamp desk', 200), ('lamp desk white', 300), ('lamp desk white led', 400)])
+
+        def ingest(page_number):
+            # New matches change the IDF, and with it the rank of every stored row.
+            if page_number == 1:
+                make_products('lamps', [('lamp with a very long name ' + str(index), 500) for index in range(3)])
+
+        pages = self.relevance_pages('lamp', limit=2, between_pages=ingest)
+        names = [name for page in pages for name in page]
+        self.assertEqual(names[:4], ['lamp', 'lamp desk', 'lamp desk white', 'lamp desk white led'])
+        self.assertEqual(len(names), len(set(names)))
+        self.assertEqual(len(names), 7)
+
+
+class PriceParsingTests(SimpleTestCase):
+
+    def test_amazon_whole_and_fraction(self):
+        values = join_price_fraction({'price': '1,299.', 'price_fraction': '99'})
+        self.assertEqual(values, {'price': '1,299.99'})
+        self.assertEqual(parse_price(values['price']), (129999, 'USD'))
+        # The fraction may be missing from the result item.
+        self.assertEqual(parse_price('147.'), (14700, 'USD'))
+
+    def test_ebay_range_is_parsed_as_its_lower_bound(self):
+        self.assertEqual(parse_price('$10.00 to $20.00'), (1000, 'USD'))
+        self.assertEqual(parse_price('C $5.00 to C $7.50'), (500, 'CAD'))
+
+    def test_newegg_offers(self):
+        self.assertEqual(parse_price('$1,299.99 –  (3 Offers)'), (129999, 'USD'))
+
+    def test_currency_symbols(self):
+        self.assertEqual(parse_price('£12.5'), (1250, 'GBP'))
+        self.assertEqual(parse_price('US $3.00'), (300, 'USD'))
+        self.assertEqual(parse_price('12.00', default_currency='EUR'), (1200, 'EUR'))
+
+    def test_missing_prices(self):
+        for text in ['N/A', 'n/a', '', '  ', '-', None, 'See price in cart']:
+            with self.subTest(text=text):
+                self.assertIsNone(parse_price(text).cents)
+
+    def test_amount_to_cents(self):
+        self.assertEqual(amount_to_cents('19.99'), 1999)
+        self.assertEqual(amount_to_cents(5), 500)
+        for value in ['-1', 'abc', 'NaN', 'Infinity']:
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                amount_to_cents(value)
+
+
+class ProductKeyTests(SimpleTestCase):
+
+    def test_amazon_listing_and_sponsored_redirect_share_a_key(self):
+        urls = [
+            'https://www.amazon.com/Apple-iPhone/dp/b0chx1w1xy/ref=sr_1_2?keywords=iphone',
+            'https://www.amazon.com/gp/product/B0CHX1W1XY',
+            'https://www.amazon.com/sspa/click?ie=UTF8&spc=MTo&url=%2FApple-iPhone-15%2Fdp%2FB0CHX1W1XY'
+            '%2Fref%3Dsr_1_1_sspa%3Fkeywords%3Diphone&sp_csd=d',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(product_key(url), 'amazon:B0CHX1W1XY')
+
+    def test_ebay_item_id(self):
+        for url in ['https://www.ebay.com/itm/123456789012?hash=item1c&var=0',
+                    'https://www.ebay.com/itm/apple-iphone-13/123456789012']:
+            with self.subTest(url=url):
+                self.assertEqual(product_key(url), 'ebay:123456789012')
+
+    def test_newegg_item_in_path_or_query_string(self):
+        self.assertEqual(product_key('https://www.newegg.com/Product/Product.aspx?Item=N82E16814137632&cm_re=x'),
+                         'newegg:N82E16814137632')
+        self.assertEqual(product_key('https://www.newegg.com/p/N82E16814137632'), 'newegg:N82E16814137632')
+        self.assertEqual(product_key('https://www.newegg.com/apple-iphone/p/1FT-000P-00123?Item=9SIA'),
+                         'newegg:1FT-000P-00123')
+
+    def test_other_urls_fall_back_to_the_normalized_url(self):
+        self.assertEqual(product_key('https://www.shop.example.com//product/1/?utm_source=x&id=7#top'),
+                         'url:shop.example.com/product/1?id=7')
+        self.assertIsNone(product_key(''))
+
+
+class ListingUpsertTests(TestCase):
+
+    def test_reingesting_a_listing_updates_it_under_the_normalized_keyword(self):
+        scraped = {'name': 'iPhone 15', 'price': '$799.00', 'reviews': 'Great phone', 'image_url': 'https://example.com/i.jpg',
+                   'product_url': 'https://www.amazon.com/Apple-iPhone/dp/B0CHX1W1XY/ref=sr_1_2'}
+        ingest_products('Amazon', 'https://www.amazon.com', [scraped], 'iPhone')
+        ingest_products('Amazon', 'https://www.amazon.com', [{
+            **scraped, 'price': '$749.00',
+            'product_url': 'https://www.amazon.com/sspa/click?url=%2Fdp%2FB0CHX1W1XY',
+        }], ' IPHONE ')
+        self.assertEqual(
+            list(Product.objects.values_list('keyword', 'product_key', 'price_cents')),
+            [('iphone', 'amazon:B0CHX1W1XY', 74900)],
+        )
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        response_cache.get_cache().clear()
+        clear_website_cache()
+        self.addCleanup(clear_website_cache)
+
+    def test_ingest_invalidates_the_queries_it_can_change(self):
+        requests = [
+            (response_cache.ENDPOINT_KEYWORD, 'iphone case'), (response_cache.ENDPOINT_KEYWORD, 'lamp'),
+            (response_cache.ENDPOINT_SEARCH, 'charger'), (response_cache.ENDPOINT_SEARCH, 'cable'),
+        ]
+        for endpoint, query in requests:
+            response_cache.set(endpoint, query, {'query': query})
+        response_cache.invalidate_for_ingest('iphone', ['iPhone Charger'])
+        cached = {query: response_cache.get(endpoint, query) is not None for endpoint, query in requests}
+        self.assertEqual(cached, {'iphone case': False, 'lamp': True, 'charger': False, 'cable': True})
+
+    def test_bumps_survive_evicted_counters(self):
+        before = response_cache.generations(response_cache.ENDPOINT_SEARCH, 'lamp')
+        response_cache.get_cache().clear()
+        after = response_cache.generations(response_cache.ENDPOINT_SEARCH, 'lamp')
+        self.assertTrue(all(old != new for old, new in zip(before, after)))
+        response_cache.clear()
+        self.assertNotEqual(response_cache.generations(response_cache.ENDPOINT_SEARCH, 'lamp')[0], after[0])
+
+    def test_keyword_data_is_refreshed_after_an_ingest(self):
+        product = {'name': 'Desk lamp', 'price': '$19.99', 'reviews': '', 'image_url': 'https://example.com/i.jpg',
+                   'product_url': 'https://www.amazon.com/dp/B000000001'}
+        url = reverse('get_keyword_data') + '?keyword=lamp'
+        with mock.patch.object(popularity, 'record_access'):
+            with self.captureOnCommitCallbacks(execute=True):
+                ingest_products('Amazon', 'https://www.amazon.com', [product], 'lamp')
+            self.assertEqual(len(self.client.get(url).data['results']), 1)
+            with mock.patch.object(search_index, 'search') as search:
+                self.assertEqual(len(self.client.get(url).data['results']), 1)
+            search.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                ingest_products('Amazon', 'https://www.amazon.com', [
+                    {**product, 'name': 'Floor lamp', 'product_url': 'https://www.amazon.com/dp/B000000002'},
+                ], 'lamp')
+            names = [row['name'] for row in self.client.get(url).data['results']]
+        self.assertEqual(sorted(names), ['Desk lamp', 'Floor lamp'])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ExportViewTests(TestCase):
+
+    def setUp(self):
+        amazon = Website.objects.create(name='Amazon', url='https://www.amazon.com/')
+        ebay = Website.objects.create(name='Ebay', url='https://www.ebay.com/')
+        rows = [
+            (amazon, 'Desk lamp', None, 'Bright, "warm"\nlight', '2024-01-01T10:00:00+00:00'),
+            (ebay, 'Floor lamp', 2999, 'ok', '2024-01-02T10:00:00+00:00'),
+            (ebay, 'Lamp shade', 999, '', '2024-01-03T10:00:00+00:00'),
+        ]
+        self.products = [
+            Product.objects.create(
+                name=name, price='N/A' if cents is None else f'${cents / 100:.2f}', price_cents=cents, reviews=reviews,
+                product_url=f'https://example.com/{index}', product_key=f'url:example.com/{index}',
+                image_url='https://example.com/i.jpg', website=website, keyword='lamp', scraped_at=scraped_at,
+            )
+            for index, (website, name, cents, reviews, scraped_at) in enumerate(rows)
+        ]
+        Product.objects.create(
+            name='Phone case', price='$5.00', price_cents=500, reviews='', product_url='https://example.com/case',
+            product_key='url:example.com/case', image_url='https://example.com/i.jpg', website=amazon, keyword='phone case',
+        )
+
+    def export(self, **params):
+        return self.client.get(reverse('export_products'), {'keyword': 'lamp', **params})
+
+    def test_ndjson_is_streamed_one_object_per_line(self):
+        response = self.export(chunk_size=2)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        self.assertEqual([chunk.count('\n') for chunk in chunks], [2, 1])
+        rows = [json.loads(line) for line in ''.join(chunks).splitlines()]
+        self.assertEqual([row['name'] for row in rows], ['Desk lamp', 'Floor lamp', 'Lamp shade'])
+        self.assertEqual(list(rows[0]), export.COLUMN_NAMES)
+        self.assertEqual((rows[0]['price_cents'], rows[0]['website']), (None, 'Amazon'))
+        self.assertEqual(rows[0]['scraped_at'], '2024-01-01T10:00:00+00:00')
+
+    def test_csv_has_a_header_and_quotes_fields(self):
+        response = self.export(file_format='csv', chunk_size=1)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('products.csv', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], export.COLUMN_NAMES)
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1][export.COLUMN_NAMES.index('reviews')], 'Bright, "warm"\nlight')
+
+    def test_filters(self):
+        cases = [
+            ({'website': 'EBAY'}, ['Floor lamp', 'Lamp shade']),
+            ({'since': '2024-01-02'}, ['Floor lamp', 'Lamp shade']),
+            ({'until': '2024-01-02'}, ['Desk lamp', 'Floor lamp']),
+            ({'since': '2024-01-01T12:00:00Z', 'until': '2024-01-02T12:00:00Z'}, ['Floor lamp']),
+            ({'keyword': 'phone'}, ['Phone case']),
+            ({'website': 'Newegg'}, []),
+        ]
+        for params, names in cases:
+            with self.subTest(params=params):
+                lines = b''.join(self.export(**params).streaming_content).decode().splitlines()
+                self.assertEqual([json.loads(line)['name'] for line in lines], names)
+
+    def test_bad_input_is_rejected(self):
+        for params in [{'file_format': 'xml'}, {'since': 'yesterday'}, {'until': '2024-13-01'},
+                       {'chunk_size': 'all'}, {'chunk_size': '0'}]:
+            with self.subTest(params=params):
+                response = self.export(**params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.data)
+
+    def test_chunk_size_is_capped(self):
+        with mock.patch.object(export, 'export_rows', wraps=export.export_rows) as export_rows:
+            self.assertEqual(self.export(chunk_size=10 ** 9).status_code, 200)
+        self.assertEqual(export_rows.call_args.kwargs['chunk_size'], export.MAX_EXPORT_CHUNK_SIZE)
+
+    def test_parquet_chunks_share_one_schema(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest('pyarrow is not installed')
+        # The first chunk has no parsed price, so its price_cents column is all null.
+        response = self.export(file_format='parquet', chunk_size=1)
+        self.assertEqual(response.status_code, 200)
+        table = pq.read_table(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(table.column_names, export.COLUMN_NAMES)
+        self.assertEqual(table.column('price_cents').to_pylist(), [None, 2999, 999])
+        self.assertEqual(str(table.schema.field('price_cents').type), 'int64')
+
+
+class RankingTests(TestCase):
+    """
+    Ranks a fixture small enough to score by hand. With w_price=2, w_sentiment=1, w_reviews=1:
+
+        product  site    price   percentile  sentiment  reviews  score
+        A1       Amazon  $10.00  2/3         0.6 -> .8  1        (4/3 + .8 + 1) / 4 = .7833
+        A2       Amazon  N/A     0           1.0 -> 1   1        (0 + 1 + 1) / 4    = .5
+        E1       Ebay    $20.00  1/3         0.0 -> .5  0        (2/3 + .5 + 0) / 4 = .2917
+        E2       Ebay    $5.00   1           -.2 -> .4  1        (2 + .4 + 1) / 4   = .85
+
+    The price percentile is the share of priced products that cost at least as much.
+    """
+
+    def setUp(self):
+        amazon = Website.objects.create(name='Amazon', url='https://www.amazon.com/')
+        ebay = Website.objects.create(name='Ebay', url='https://www.ebay.com/')
+        rows = [
+            ('A1', amazon, 1000, 0.6, 'Great'), ('A2', amazon, None, 1.0, 'Love it'),
+            ('E1', ebay, 2000, 0.0, 'No reviews available'), ('E2', ebay, 500, -0.2, 'meh'),
+        ]
+        for name, website, cents, sentiment, reviews in rows:
+            Product.objects.create(
+                name=name, price='N/A' if cents is None else f'${cents / 100:.2f}', price_cents=cents,
+                sentiment_score=sentiment, reviews=reviews, product_url=f'https://example.com/{name}',
+                product_key=f'url:example.com/{name}', image_url='https://example.com/i.jpg', website=website,
+                keyword='lamp',
+            )
+        self.weights = ranking.RankingWeights(price=2, sentiment=1, reviews=1, sites={})
+
+    def ranked(self, weights=None, **kwargs):
+        products = ranking.rank_products(Product.objects.all(), weights or self.weights, **kwargs)
+        return [(product.name, round(product.rank_score, 4), product.rank_position) for product in products]
+
+    def test_scores_match_the_hand_computed_fixture(self):
+        self.assertEqual(self.ranked(), [('E2', 0.85, 1), ('A1', 0.7833, 2), ('A2', 0.5, 3), ('E1', 0.2917, 4)])
+        percentiles = {product.name: product.price_percentile for product in ranking.rank_products(Product.objects.all(), self.weights)}
+        self.assertEqual(percentiles['A2'], 0.0)
+        self.assertAlmostEqual(percentiles['E1'], 1 / 3)
+
+    def test_top_k_per_website(self):
+        self.assertEqual(self.ranked(top_k=1, group_by=['website']), [('A1', 0.7833, 1), ('E2', 0.85, 1)])
+        self.assertEqual(self.ranked(top_k=2, group_by=['website', 'keyword'])[1], ('A2', 0.5, 2))
+
+    def test_site_weights_scale_the_score(self):
+        weights = ranking.RankingWeights(price=2, sentiment=1, reviews=1, sites={'AMAZON': 1.2})
+        self.assertEqual(self.ranked(weights), [('A1', 0.94, 1), ('E2', 0.85, 2), ('A2', 0.6, 3), ('E1', 0.2917, 4)])
+        self.assertEqual(ranking.best_product(Product.objects.all(), weights).name, 'A1')
+        self.assertEqual(ranking.best_product(Product.objects.all(), self.weights).name, 'E2')
+        self.assertIsNone(ranking.best_product(Product.objects.none(), weights))
+
+    def test_weights_from_query_params(self):
+        weights = ranking.RankingWeights.from_params(QueryDict('w_price=2&w_reviews=0&site_weights=Amazon:1.2, ebay:0.5'))
+        self.assertEqual(weights.as_dict(), {'price': 2.0, 'sentiment': 1.0, 'reviews': 0.0,
+                                             'sites': {'amazon': 1.2, 'ebay': 0.5}})
+        for params in ['w_price=-1', 'w_sentiment=nan', 'w_reviews=x', 'site_weights=amazon',
+                       'w_price=0&w_sentiment=0&w_reviews=0']:
+            with self.subTest(params=params), self.assertRaises(ranking.RankingError):
+                ranking.RankingWeights.from_params(QueryDict(params))
+
+    def test_rankings_view(self):
+        response = self.client.get(reverse('rank_products'), {
+            'keyword': 'lamp', 'w_price': 2, 'w_sentiment': 1, 'w_reviews': 1, 'group_by': 'website', 'k': 1,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(row['name'], row['rank_position']) for row in response.data['results']], [('A1', 1), ('E2', 1)])
+        for params in [{}, {'keyword': 'lamp', 'k': 0}, {'keyword': 'lamp', 'group_by': 'price'}]:
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(reverse('rank_products'), params).status_code, 400)
+
+
+class ProductKeyBackfillTests(TransactionTestCase):
+    """
+    Runs migration 0007 on rows stored before it, in batches of two rows.
+    """
+    before = [('product_hunt', '0006_product_price_cents')]
+    after = [('product_hunt', '0007_product_key')]
+
+    def setUp(self):
+        self.migration = importlib.import_module('product_hunt.migrations.0007_product_key')
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        self.addCleanup(self.migrate_to_latest)
+
+    def migrate_to_latest(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        search_index.ensure_search_index()
+
+    def test_keys_are_backfilled_and_duplicates_merged(self):
+        apps = MigrationExecutor(connection).loader.project_state(self.before).apps
+        Website, OldProduct = apps.get_model('product_hunt', 'Website'), apps.get_model('product_hunt', 'Product')
+        website = Website.objects.create(name='Amazon', url='https://www.amazon.com/')
+        rows = [
+            ('oldest', 'iPhone', 'https://www.amazon.com/dp/B0CHX1W1XY', 5),
+            ('newest', 'iphone ', 'https://www.amazon.com/sspa/click?url=%2Fdp%2FB0CHX1W1XY', 1),
+            ('older', 'IPHONE', 'https://www.amazon.com/gp/product/B0CHX1W1XY', 3),
+            ('case', 'iphone', 'https://www.amazon.com/dp/B000000001', 2),
+            ('lamp', 'Lamp', 'https://www.ebay.com/itm/123456789012', 2),
+            ('no url', 'lamp', '', 4),
+        ]
+        for name, keyword, url, hours in rows:
+            OldProduct.objects.create(
+                name=name, price='$1.00', reviews='', product_url=url, image_url='https://example.com/i.jpg',
+                website=website, keyword=keyword, scraped_at=timezone.now() - timedelta(hours=hours),
+            )
+        with mock.patch.object(self.migration, 'BACKFILL_BATCH_SIZE', 2):
+            MigrationExecutor(connection).migrate(self.after)
+
+        apps = MigrationExecutor(connection).loader.project_state(self.after).apps
+        stored = apps.get_model('product_hunt', 'Product').objects.order_by('id').values_list('name', 'keyword', 'product_key')
+        no_url_id = OldProduct.objects.get(name='no url').id
+        self.assertEqual(list(stored), [
+            ('newest', 'iphone', 'amazon:B0CHX1W1XY'), ('case', 'iphone', 'amazon:B000000001'),
+            ('lamp', 'lamp', 'ebay:123456789012'), ('no url', 'lamp', f'row:{no_url_id}'),
+        ])
+
+    def test_frozen_product_key_matches_identity(self):
+        urls = [
+            'https://www.amazon.com/sspa/click?ie=UTF8&url=%2FApple-iPhone-15%2Fdp%2FB0CHX1W1XY%2Fref%3Dsr_1_1',
+            'https://www.ebay.com/itm/apple-iphone-13/123456789012', 'https://www.newegg.com/p/N82E16814137632',
+            'https://www.newegg.com/Product/Product.aspx?Item=N82E16814137632&cm_re=x',
+            'https://www.shop.example.com//product/1/?utm_source=x&id=7#top', '',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.migration.product_key(url), product_key(url))
+
+
+MATCHER_PAGE = """
+<html><body><div id="root" class="list">
+  <div class="item" data-n="1">
+    <h2 data-n="2"><a href="/a" data-n="3"><span data-n="4">A</span></a></h2>
+    <span class="price" data-n="5"><span class="whole" data-n="6">1</span></span>
+  </div>
+  <div class="item sponsored" data-n="7"><section data-n="8"><span class="price" data-n="9">2</span></section></div>
+  <p data-n="10"><a data-n="11" href="/b">B</a></p>
+</div></body></html>
+"""
+
+
+@override_settings(CACHES=TEST_CACHES)
+class BulkCrawlResumeTests(TransactionTestCase):
+    """
+    Crawls with the threaded engine and stubbed scrapers; the keywords are stored by a writer
+    thread, hence a TransactionTestCase.
+    """
+    keywords = ['alpha', 'beta', 'gamma', 'delta']
+
+    def setUp(self):
+        clear_website_cache()
+        self.addCleanup(clear_website_cache)
+        self.sites = [get_site('Amazon'), get_site('Ebay')]
+        self.scraped = []
+        patcher = mock.patch.object(BaseScraper, 'scrape_pages', autospec=True, side_effect=self.scrape_pages)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def scrape_pages(self, scraper):
+        keyword = next(keyword for keyword in self.keywords if keyword in scraper.base_url)
+        self.scraped.append((keyword, scraper.website_name))
+        if keyword == 'delta':
+            return []  # nothing found, so the keyword fails
+        site = scraper.website_name.lower()
+        return [PageResult(url=scraper.base_url, items=[{
+            'name': f'{keyword} on {site}', 'price': '$10.00', 'reviews': '3', 'sentiment_score': 0.0,
+            'sentiment_label': 'Neutral', 'product_url': f'https://www.{site}.com/itm/{keyword}',
+            'image_url': 'https://example.com/i.jpg',
+        }])]
+
+    def crawl(self, entries):
+        return BulkCrawler(entries[0].run, sites=self.sites, concurrency=1, engine='threaded').crawl(entries)
+
+    def statuses(self):
+        return dict(CrawlRunKeyword.objects.values_list('keyword', 'status'))
+
+    def test_interrupted_run_resumes_with_the_sites_not_stored(self):
+        run, entries = prepare_run('keywords', self.keywords, self.sites)
+        store_site = BulkCrawler.store_site
+
+        def interrupt_beta_on_ebay(crawler, entry, site, pages):
+            if (entry.keyword, site.name) == ('beta', 'Ebay'):
+                raise KeyboardInterrupt
+            return store_site(crawler, entry, site, pages)
+
+        with mock.patch.object(BulkCrawler, 'store_site', autospec=True, side_effect=interrupt_beta_on_ebay):
+            with self.assertRaises(KeyboardInterrupt):
+                self.crawl(entries[:2])  # the process is stopped while storing beta, before gamma starts
+        self.assertEqual(self.statuses(), {
+            'alpha': CrawlRunKeyword.STATUS_SUCCEEDED, 'beta': CrawlRunKeyword.STATUS_RUNNING,
+            'gamma': CrawlRunKeyword.STATUS_PENDING, 'delta': CrawlRunKeyword.STATUS_PENDING,
+        })
+        beta = CrawlRunKeyword.objects.get(keyword='beta')
+        self.assertEqual(list(beta.progress), ['Amazon'])
+        self.assertEqual(CrawlRun.objects.get().status, CrawlRun.STATUS_RUNNING)
+
+        # Resuming puts the keyword left running back in the queue and skips its stored site.
+        self.scraped.clear()
+        run, entries = prepare_run('keywords', self.keywords, self.sites)
+        self.assertEqual([(entry.keyword, entry.status) for entry in entries],
+                         [(keyword, CrawlRunKeyword.STATUS_PENDING) for keyword in ['beta', 'gamma', 'delta']])
+        stats = self.crawl(entries)
+        self.assertCountEqual(self.scraped, [
+            ('beta', 'Ebay'), ('gamma', 'Amazon'), ('gamma', 'Ebay'), ('delta', 'Amazon'), ('delta', 'Ebay'),
+        ])
+        self.assertEqual((stats.keywords, stats.failed), (3, 1))
+        beta.refresh_from_db()
+        self.assertEqual((beta.status, beta.attempts, beta.items), (CrawlRunKeyword.STATUS_SUCCEEDED, 2, 2))
+        self.assertEqual({site['status'] for site in beta.progress.values()}, {SITE_SUCCEEDED})
+        self.assertEqual(Product.objects.filter(keyword='beta').count(), 2)
+        self.assertEqual(self.statuses()['delta'], CrawlRunKeyword.STATUS_FAILED)
+        self.assertEqual(CrawlRun.objects.get().status, CrawlRun.STATUS_FINISHED)
+
+        # A finished run only crawls its failed keywords again when asked to.
+        self.assertEqual(prepare_run('keywords', self.keywords, self.sites)[1], [])
+        run, entries = prepare_run('keywords', self.keywords, self.sites, retry_failed=True)
+        self.assertEqual([entry.keyword for entry in entries], ['delta'])
+        self.assertEqual(CrawlRun.objects.get().status, CrawlRun.STATUS_RUNNING)
+
+
+class SearchIndexTests(TestCase):
+
+    def setUp(self):
+        self.lamp, self.cable = make_products('lamp', [('Desk lamp', 1999), ('USB cable', 499)])
+
+    def names(self, query, fields=None):
+        return sorted(search_index.search(query, fields=fields).values_list('name', flat=True))
+
+    def test_index_follows_inserts_updates_and_deletes(self):
+        self.assertEqual(self.names('desk'), ['Desk lamp'])
+        self.assertEqual(self.names('lam', fields=('keyword',)), ['Desk lamp', 'USB cable'])
+        self.lamp.name = 'Floor light'
+        self.lamp.save()
+        self.assertEqual(self.names('desk'), [])
+        self.assertEqual(self.names('floor'), ['Floor light'])
+        Product.objects.filter(pk=self.cable.pk).update(keyword='charger')
+        self.assertEqual(self.names('lamp', fields=('keyword',)), ['Floor light'])
+        self.assertEqual(self.names('charg'), ['USB cable'])
+        self.lamp.delete()
+        self.assertEqual(self.names('floor'), [])
+
+    def test_triggers_dropped_by_a_migration_are_reinstalled(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {search_index.FTS_TABLE}_au')
+        Product.objects.filter(pk=self.lamp.pk).update(name='Floor light')
+        search_index.ensure_search_index()
+        self.assertEqual(self.names('floor'), ['Floor light'])
+        self.assertEqual(self.names('desk'), [])
+
+    def test_other_vendors_fall_back_to_icontains(self):
+        with mock.patch.object(search_index, 'connection', mock.Mock(vendor='mysql')):
+            self.assertIsNone(search_index.rank_sql('desk'))
+            results = search_index.search('LAMP des')
+            self.assertNotIn('search_rank', str(results.query))
+            self.assertEqual(sorted(results.values_list('name', flat=True)), ['Desk lamp'])
+            self.assertEqual(sorted(search_index.search('usb', fields=('keyword',)).values_list('name', flat=True)), [])
+
+
+class ScrapeJobTests(TestCase):
+
+    def test_post_queues_a_job_and_returns_202(self):
+        with mock.patch.object(jobs, 'get_executor') as executor, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('create_scrape_job'), {'keyword': 'lamp'}, content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        job = ScrapeJob.objects.get(pk=response.data['job_id'])
+        self.assertEqual(response.data['status'], ScrapeJob.STATUS_QUEUED)
+        self.assertEqual(response.data['status_url'], reverse('scrape_job_status', args=[job.pk]))
+        self.assertEqual(job.progress, {site.name: {'status': ScrapeJob.STATUS_QUEUED} for site in SITES})
+        executor.return_value.submit.assert_called_once_with(jobs.run_job, job.pk)
+
+        response = self.client.post(reverse('create_scrape_job'), {}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_status_reports_per_site_progress(self):
+        job = jobs.enqueue_scrape('lamp')
+
+        def crawl_keyword(keyword, on_site_done):
+            make_products(keyword, [('Desk lamp', 1999)])
+            for site in SITES[:-1]:
+                on_site_done(keyword, site, mock.Mock(rows_written=1, seconds=1.23456))
+            on_site_done(keyword, SITES[-1], None)
+
+        with mock.patch.object(jobs, 'crawl_keyword', crawl_keyword), \
+                mock.patch.object(jobs, 'crawl_once', lambda keyword, fn: fn() or True), \
+                mock.patch.object(jobs, 'connection'), mock.patch.object(jobs, 'close_old_connections'):
+            jobs.run_job(job.pk)
+
+        data = self.client.get(reverse('scrape_job_status', args=[job.pk])).data
+        self.assertEqual(data['status'], ScrapeJob.STATUS_SUCCEEDED)
+        self.assertEqual(data['product_count'], 1)
+        self.assertEqual(data['progress'][SITES[0].name], {'status': 'succeeded', 'rows_written': 1, 'seconds': 1.235})
+        self.assertEqual(data['progress'][SITES[-1].name], {'status': 'failed'})
+        self.assertEqual(data['results_url'], reverse('get_keyword_data') + '?keyword=lamp')
+        self.assertEqual(self.client.get(reverse('scrape_job_status', args=[job.pk + 1])).status_code, 404)
+
+    def test_jobs_lost_with_their_process_time_out(self):
+        long_ago = timezone.now() - timedelta(hours=1)
+        queued, running, recent, done = [jobs.enqueue_scrape('lamp') for _ in range(4)]
+        ScrapeJob.objects.filter(pk=queued.pk).update(created_at=long_ago)
+        ScrapeJob.objects.filter(pk=running.pk).update(status=ScrapeJob.STATUS_RUNNING, started_at=long_ago)
+        ScrapeJob.objects.filter(pk=recent.pk).update(status=ScrapeJob.STATUS_RUNNING, started_at=timezone.now())
+        ScrapeJob.objects.filter(pk=done.pk).update(status=ScrapeJob.STATUS_SUCCEEDED, started_at=long_ago)
+
+        data = self.client.get(reverse('scrape_job_status', args=[running.pk])).data
+        self.assertEqual(data['status'], ScrapeJob.STATUS_FAILED)
+        self.assertIn('timed out', data['error'])
+        self.assertEqual({progress['status'] for progress in data['progress'].values()}, {'failed'})
+
+        self.assertEqual(jobs.fail_stale_jobs(), 1)
+        statuses = dict(ScrapeJob.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {queued.pk: 'failed', running.pk: 'failed', recent.pk: 'running', done.pk: 'succeeded'})
+
+
+@override_settings(KEYWORD_FRESHNESS={'SOFT_TTL_SECONDS': 3600, 'HARD_TTL_SECONDS': 7200, 'REFRESH_RETRY_SECONDS': 300})
+class FreshnessTests(TestCase):
+
+    def test_states_follow_the_ttls(self):
+        scraped_at = timezone.now()
+        freshness.record_scrape(' Phone ', scraped_at=scraped_at)
+        for age, state in [(0, freshness.FRESH), (3599, freshness.FRESH), (3600, freshness.STALE),
+                           (7199, freshness.STALE), (7200, freshness.EXPIRED)]:
+            with self.subTest(age=age):
+                self.assertEqual(freshness.keyword_state('phone', now=scraped_at + timedelta(seconds=age)), state)
+        self.assertEqual(freshness.keyword_state('lamp'), freshness.MISSING)
+
+    def test_one_refresh_is_claimed_until_it_stores_or_lapses(self):
+        now = timezone.now()
+        freshness.record_scrape('phone', scraped_at=now - timedelta(hours=1))
+        self.assertTrue(freshness.claim_refresh('phone', now=now))
+        self.assertFalse(freshness.claim_refresh('Phone', now=now + timedelta(seconds=299)))
+        self.assertTrue(freshness.claim_refresh('phone', now=now + timedelta(seconds=301)))
+        # Storing products ends the refresh, so the next one can be claimed right away.
+        freshness.record_scrape('phone')
+        self.assertIsNone(KeywordFreshness.objects.get(keyword='phone').refreshing_since)
+        self.assertTrue(freshness.claim_refresh('phone', now=now + timedelta(seconds=302)))
+        self.assertFalse(freshness.claim_refresh('lamp', now=now))
+
+
+@override_settings(KEYWORD_POPULARITY={'FLUSH_SECONDS': 3600, 'FLUSH_SIZE': 1000, 'HALF_LIFE_SECONDS': 3600})
+class PopularityTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(popularity.AccessCounter, 'start_flusher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.counter = popularity.AccessCounter()
+
+    def record(self, *keywords):
+        for keyword in keywords:
+            self.counter.record(keyword)
+        return self.counter.flush()
+
+    def test_requests_decay_once_folded(self):
+        start = timezone.now()
+        self.assertEqual(self.record('Phone', 'phone ', 'phone', 'case'), 2)
+        self.assertEqual(dict(KeywordAccess.objects.values_list('keyword', 'access_count')), {'phone': 3, 'case': 1})
+        self.assertEqual(popularity.fold_accesses(now=start), 2)
+
+        hour_later = start + timedelta(hours=1)
+        phone = KeywordAccess.objects.get(keyword='phone')
+        self.assertAlmostEqual(popularity.current_popularity(phone, hour_later), 1.5)
+        # Requests not folded in yet count in full.
+        self.record('phone', 'phone')
+        phone.refresh_from_db()
+        self.assertAlmostEqual(popularity.current_popularity(phone, hour_later), 3.5)
+
+        self.assertEqual(popularity.fold_accesses(now=hour_later), 1)  # case had no new requests
+        phone.refresh_from_db()
+        case = KeywordAccess.objects.get(keyword='case')
+        self.assertEqual((phone.popularity_at, phone.counted_accesses), (hour_later, 5))
+        self.assertAlmostEqual(popularity.current_popularity(phone, start + timedelta(hours=2)), 1.75)
+        self.assertEqual(case.popularity_at, start)
+        self.assertAlmostEqual(popularity.current_popularity(case, start + timedelta(hours=2)), 0.25)
+        self.assertEqual(popularity.fold_accesses(now=hour_later), 0)
+
+
+@override_settings(
+    KEYWORD_FRESHNESS={'SOFT_TTL_SECONDS': 3600, 'HARD_TTL_SECONDS': 7200, 'REFRESH_RETRY_SECONDS': 300},
+    REFRESH_SCHEDULER={
+        'INTERVAL_SECONDS': 60, 'SITE_REQUESTS_PER_HOUR': {'default': 360}, 'PAGES_PER_CRAWL': 2,
+        'MIN_STALENESS': 0.8, 'MIN_POPULARITY': 0.5,
+    },
+)
+class RefreshSchedulerTests(TestCase):
+    """
+    Every site gets 0.1 requests/second, up to 6 per 60 second interval; a refresh reserves 2.
+    """
+
+    def setUp(self):
+        self.now = now = timezone.now()
+        for keyword, requests_decayed, age in [('hot', 10, 2), ('warm', 2, 2), ('cold', 0.1, 2), ('fresh', 50, 0.5)]:
+            KeywordAccess.objects.create(keyword=keyword, popularity=requests_decayed, popularity_at=now)
+            freshness.record_scrape(keyword, scraped_at=now - timedelta(hours=age))
+        self.rate_limiter = RateLimiter(default={'RATE': 1000, 'BURST': 1000})
+        for target, value in [('get_rate_limiter', self.rate_limiter), ('time.monotonic', 100.0)]:
+            patcher = mock.patch(f'product_hunt.refresh_scheduler.{target}', return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(freshness, 'refresh_in_background',
+                                    side_effect=lambda keyword: ScrapeJob.objects.create(keyword=keyword))
+        self.refresh = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.scheduler = RefreshScheduler()
+
+    def send(self, url, requests):
+        for _ in range(requests):
+            self.rate_limiter.reserve(url)
+
+    def test_queue_ranks_popularity_by_staleness(self):
+        self.assertEqual([(keyword, candidate.score) for _, keyword, candidate in sorted(self.scheduler.queue(now=self.now))],
+                         [('hot', 20), ('warm', 4)])
+
+    def test_sites_are_charged_the_requests_each_refresh_sent(self):
+        refreshed, queued = self.scheduler.tick()
+        self.assertEqual(([candidate.keyword for candidate in refreshed], queued), (['hot', 'warm'], 2))
+        self.assertEqual(self.scheduler.tokens, {'Amazon': 2, 'Ebay': 2, 'Newegg': 2})
+        hot, warm = ScrapeJob.objects.order_by('pk')
+
+        # hot: one Amazon page and a retry of it, a single eBay page and Newegg from the page cache.
+        self.send('https://www.amazon.com/s?k=hot', 2)
+        self.send('https://www.ebay.com/sch/i.html?_nkw=hot', 1)
+        ScrapeJob.objects.filter(pk=hot.pk).update(status=ScrapeJob.STATUS_SUCCEEDED)
+        self.scheduler.settle()
+        # The finished refresh gives back its reservation and is charged what it sent.
+        self.assertEqual(self.scheduler.tokens, {'Amazon': 2, 'Ebay': 3, 'Newegg': 4})
+        self.assertEqual(self.scheduler.in_flight, {warm.pk})
+
+        # warm is still running and has already sent three pages to Amazon; with one request
+        # left there, nothing else can be refreshed until the budget refills.
+        self.send('https://www.amazon.com/s?k=warm', 3)
+        freshness.record_scrape('lamp', scraped_at=timezone.now() - timedelta(hours=2))
+        KeywordAccess.objects.create(keyword='lamp', popularity=5, popularity_at=timezone.now())
+        refreshed, queued = self.scheduler.tick()
+        self.assertEqual((refreshed, queued), ([], 3))
+        self.assertEqual(self.scheduler.tokens['Amazon'], -1)
+
+        ScrapeJob.objects.filter(pk=warm.pk).update(status=ScrapeJob.STATUS_FAILED)
+        self.scheduler.settle()
+        self.assertEqual(self.scheduler.tokens, {'Amazon': 1, 'Ebay': 5, 'Newegg': 6})
+        self.assertEqual(self.refresh.call_count, 2)
+
+    def test_dry_run_leaves_the_budget_alone(self):
+        refreshed, queued = self.scheduler.tick(dry_run=True)
+        self.assertEqual([candidate.keyword for candidate in refreshed], ['hot', 'warm'])
+        self.assertEqual(self.scheduler.tokens, {'Amazon': 6, 'Ebay': 6, 'Newegg': 6})
+        self.refresh.assert_not_called()
+
+
+class CountingEvent(threading.Event):
+    """
+    An Event that counts the threads that started waiting on it.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.waiters = threading.Semaphore(0)
+
+    def wait(self, timeout=None):
+        self.waiters.release()
+        return super().wait(timeout)
+
+
+class SingleFlightThreadTests(SimpleTestCase):
+
+    def test_threads_share_one_call(self):
+        flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        done = CountingEvent()
+        calls, results = [], []
+
+        def crawl():
+            flight.calls['key'].done = done
+            calls.append(1)
+            started.set()
+            release.wait()
+            return 'rows'
+
+        def caller():
+            results.append(flight.do('key', crawl))
+
+        with mock.patch.object(flight, 'run_with_lease', lambda key, fn, recheck: (fn(), True)):
+            threads = [threading.Thread(target=caller) for _ in range(5)]
+            threads[0].start()
+            self.assertTrue(started.wait(5))
+            for thread in threads[1:]:
+                thread.start()
+            for _ in threads[1:]:
+                self.assertTrue(done.waiters.acquire(timeout=5))
+            release.set()
+            for thread in threads:
+                thread.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [('rows', False)] * 4 + [('rows', True)])
+        self.assertEqual(flight.calls, {})
+
+
+class CrawlLeaseTests(TestCase):
+
+    def setUp(self):
+        self.flight = SingleFlight(lease_seconds=60)
+
+    def test_only_expired_leases_are_taken_over(self):
+        self.assertTrue(self.flight.acquire_lease('crawl:lamp', 'a'))
+        self.assertFalse(self.flight.acquire_lease('crawl:lamp', 'b'))
+        CrawlLease.objects.filter(key='crawl:lamp').update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertTrue(self.flight.acquire_lease('crawl:lamp', 'b'))
+        self.assertEqual(CrawlLease.objects.get(key='crawl:lamp').owner, 'b')
+
+    def test_heartbeat_renews_the_lease_until_it_is_lost(self):
+        self.flight.acquire_lease('crawl:lamp', 'a')
+        CrawlLease.objects.update(expires_at=timezone.now() + timedelta(seconds=1))
+        stop = mock.Mock(**{'wait.side_effect': [False, True]})
+        with mock.patch('product_hunt.singleflight.connection'):
+            self.flight.keep_lease('crawl:lamp', 'a', stop)
+        self.assertGreater(CrawlLease.objects.get().expires_at, timezone.now() + timedelta(seconds=50))
+
+        CrawlLease.objects.update(owner='b')
+        self.assertFalse(self.flight.renew_lease('crawl:lamp', 'a'))
+
+    def test_a_taken_over_lease_is_not_released_by_its_old_holder(self):
+        def crawl():
+            # The lease expired and another process took it over while this crawl ran.
+            CrawlLease.objects.update(owner='other')
+            return 'rows'
+
+        with mock.patch.object(self.flight, 'keep_lease'):
+            self.assertEqual(self.flight.run_with_lease('crawl:lamp', crawl, None), ('rows', True))
+        self.assertEqual(CrawlLease.objects.get(key='crawl:lamp').owner, 'other')
+
+        with mock.patch.object(self.flight, 'keep_lease'):
+            self.assertEqual(self.flight.run_with_lease('crawl:desk', lambda: 'rows', None), ('rows', True))
+        self.assertFalse(CrawlLease.objects.filter(key='crawl:desk').exists())
+
+
+class MatcherTests(SimpleTestCase):
+
+    SELECTORS = {
+        'h2 a span': ['4'],
+        '.item .price': ['5', '9'],
+        '.item > .price': ['5'],
+        '.item > span': ['5'],
+        '.price > .whole': ['6'],
+        'div.item.sponsored .price': ['9'],
+        'a[href]': ['3', '11'],
+        'a[href="/b"]': ['11'],
+        '#root > p > a': ['11'],
+        '#root > a': [],
+    }
+
+    def matched(self, backend, selector):
+        """
+        Returns the data-n of every element below #root that the Matcher for ``selector``
+        accepts, in document order.
+        """
+        page = backend.parse(MATCHER_PAGE)
+        root = backend.select_one(page, backend.compile('#root'))
+        matcher = Matcher.compile(selector)
+        return [
+            backend.attr(node, 'data-n') for node in backend.select(root, backend.compile('[data-n]'))
+            if matcher.matches(backend, node, backend.tag(node), backend.classes(node), root)
+        ]
+
+    def test_child_and_descendant_combinators(self):
+        for name in available_parsers():
+            backend = get_parser_backend(name)
+            for selector, expected in self.SELECTORS.items():
+                with self.subTest(parser=name, selector=selector):
+                    self.assertEqual(self.matched(backend, selector), expected)
+                    native = backend.select(backend.parse(MATCHER_PAGE), backend.compile(selector))
+                    self.assertEqual([backend.attr(node, 'data-n') for node in native], expected)
+
+    def test_compiled_structure(self):
+        matcher = Matcher.compile('div.item.sponsored > section  [data-x="1"]')
+        self.assertEqual(matcher.combinators, ['>', ' '])
+        self.assertEqual([compound.tag for compound in matcher.compounds], ['div', 'section', None])
+        self.assertEqual(matcher.compounds[0].classes, frozenset({'item', 'sponsored'}))
+        self.assertEqual(matcher.subject.attrs, (('data-x', '1'),))
+
+    def test_unsupported_syntax_is_left_to_the_backend(self):
+        for selector in ['a:first-child', 'h2, h3', 'h2 + span', 'h2 ~ span', '> a', 'a >', '', 'a::before', 'div.']:
+            with self.subTest(selector=selector):
+                self.assertIsNone(Matcher.compile(selector))
+
+
+SPEC_FIELDS = ['name', 'price', 'reviews', 'product_url', 'image_url']
+
+# Hand-written results in the markup each site serves, independent of the synthetic benchmark
+# fixtures; the second item of each lacks optional fields.
+SITE_SNIPPETS = {
+    'Amazon': (
+        '<div class="s-main-slot"><div class="s-result-item" data-asin="B0TEST0001">'
+        '<h2><a href="/dp/B0TEST0001?ref=sr_1_1"><span>Apple iPhone 13, 128GB, Blue</span></a></h2>'
+        '<img class="s-image" src="https://m.media-amazon.com/images/I/iphone13.jpg">'
+        '<span class="a-price"><span class="a-price-whole">1,049.</span><span class="a-price-fraction">99</span></span>'
+        '<span class="a-size-base">2,417</span></div>'
+        '<div class="s-result-item"><h2><a href="/dp/B0TEST0002"><span>Sponsored slot</span></a></h2></div></div>'
+        '<a class="s-pagination-next" href="/s?k=iphone&amp;page=2">Next</a>',
+        [
+            ['Apple iPhone 13, 128GB, Blue', '1,049.99', '2,417', 'https://www.amazon.com/dp/B0TEST0001?ref=sr_1_1',
+             'https://m.media-amazon.com/images/I/iphone13.jpg'],
+            ['Sponsored slot', None, None, 'https://www.amazon.com/dp/B0TEST0002', None],
+        ],
+        'https://www.amazon.com/s?k=iphone&page=2',
+    ),
+    'Ebay': (
+        '<ul class="srp-results"><li class="s-item">'
+        '<div class="s-item__image-wrapper"><img src="https://i.ebayimg.com/images/g/abc/s-l225.jpg"></div>'
+        '<a class="s-item__link" href="https://www.ebay.com/itm/1"><div class="s-item__title">Apple iPhone 12</div></a>'
+        '<span class="s-item__price">$289.00 to\n  $319.00</span></li>'
+        '<li class="s-item"><div class="s-item__image-wrapper"><img src="https://i.ebayimg.com/2.jpg"></div>'
+        '<a class="s-item__link" href="https://www.ebay.com/itm/2"><div class="s-item__title">iPhone SE case</div></a>'
+        '<span class="s-item__price">$9.99</span>'
+        '<span class="s-item__reviews-count"><span>31 product ratings</span></span></li></ul>'
+        '<a class="pagination__next" href="https://www.ebay.com/sch/i.html?_nkw=iphone&amp;_pgn=2">Next</a>',
+        [
+            ['Apple iPhone 12', '$289.00 to $319.00', 'No reviews available', 'https://www.ebay.com/itm/1',
+             'https://i.ebayimg.com/images/g/abc/s-l225.jpg'],
+            ['iPhone SE case', '$9.99', '31 product ratings', 'https://www.ebay.com/itm/2', 'https://i.ebayimg.com/2.jpg'],
+        ],
+        'https://www.ebay.com/sch/i.html?_nkw=iphone&_pgn=2',
+    ),
+    'Newegg': (
+        '<div class="item-cells-wrap"><div class="item-cell">'
+        '<a class="item-img" href="https://www.newegg.com/p/N1"><img src="https://c1.neweggimages.com/1.jpg"></a>'
+        '<a class="item-rating" href="#"><i class="rating rating-4" aria-label="rated 4 out of 5"></i></a>'
+        '<a class="item-title" href="https://www.newegg.com/p/N1">Apple iPhone 14 Pro</a>'
+        '<ul class="price"><li class="price-current">$<strong>999</strong><sup>.00</sup></li></ul></div>'
+        '<div class="item-cell"><a class="item-title" href="https://www.newegg.com/p/N2">Lightning cable</a></div></div>'
+        '<div class="list-tool-pagination"><div class="btn-group-cell">'
+        '<a title="Next" href="https://www.newegg.com/p/pl?d=iphone&amp;page=2">&gt;</a></div></div>',
+        [
+            ['Apple iPhone 14 Pro', '$999.00', '4/5', 'https://www.newegg.com/p/N1', 'https://c1.neweggimages.com/1.jpg'],
+            ['Lightning cable', 'N/A', None, 'https://www.newegg.com/p/N2', 'Image URL not found'],
+        ],
+        'https://www.newegg.com/p/pl?d=iphone&page=2',
+    ),
+}
+
+
+class SiteExtractionTests(SimpleTestCase):
+
+    def test_snippets_extract_every_field(self):
+        for site, (html, rows, next_page) in SITE_SNIPPETS.items():
+            for parser in available_parsers():
+                for partial in (False, True):
+                    with self.subTest(site=site, parser=parser, partial=partial):
+                        items, next_url = build_scraper(site, parser, partial=partial).extract_page(html)
+                        self.assertEqual([[item[field] for field in SPEC_FIELDS] for item in items], rows)
+                        self.assertEqual(next_url, next_page)
+
+
+class RegionFilterTests(SimpleTestCase):
+
+    def test_cut_keeps_regions_and_drops_the_rest(self):
+        regions = RegionFilter(['.item', '#next'])
+        page = (
+            '<div><script>var s = "<div class=item>script</div>"</script><!-- <div class="item">comment</div> -->'
+            '<div class="item a"><div>in</div><div class=item>nested</div></div><p>chrome</p>'
+            '<a id=next href="/2">2</a><div class="item">unclosed'
+        )
+        self.assertEqual(
+            regions.cut(page),
+            '<html><body><div class="item a"><div>in</div><div class=item>nested</div></div>'
+            '<a id=next href="/2">2</a><div class="item">unclosed</body></html>',
+        )
+        self.assertIsNone(regions.cut('<p>no results</p>'))
+
+    def test_malformed_pages_extract_like_full_pages(self):
+        pages = {
+            # No </li>: the items end at </ul>, so the rail after the list is not part of the last one.
+            'list items closed by the list': ('Ebay', (
+                '<ul class="srp-results"><li class="s-item"><a class=s-item__link href=/itm/1>'
+                '<div class=s-item__title>A</div></a><li class=s-item>'
+                '<a class=s-item__link href=https://www.ebay.com/itm/2?a=1&b=2><div class=s-item__title>B</div></a></ul>'
+                '<div class=rail><span class="s-item__price">$5.00</span>'
+                '<span class=s-item__reviews-count><span>9 ratings</span></span></div>'
+                '<a class=pagination__next href=/sch/i.html?_pgn=2>Next</a>'
+            )),
+            'paragraph closed by its parent': ('Amazon', (
+                '<div class="s-main-slot"><p class="s-result-item"><span class=a-price-whole>5.</span></div>'
+                '<span class="a-size-base">12</span><h2><a href="/dp/X"><span>outside</span></a></h2>'
+            )),
+            'tags inside attribute values': ('Ebay', (
+                '<ul><li data-track=\'{"rule":"a>b"}\' class="s-item"><div class=s-item__title>A</div>'
+                '<span class=s-item__price title="<li>">$1.00</span></li>'
+                '<li class="s-item" data-x="</li>"><div class=s-item__title>B</div></li></ul>'
+            )),
+            'self-closed region': ('Ebay', (
+                '<ul><li class="s-item"/><div class=s-item__title>A</div><span class=s-item__price>$2.00</span></li></ul>'
+            )),
+            'stray end tags': ('Newegg', (
+                '<div class=item-cell></span><a class=item-title href=/p/1>A</a></b>'
+                '<ul><li class=price-current>$3.00</li></ul></div>'
+                '<div class=item-cell><a class=item-title href=/p/2>B</a></div>'
+            )),
+        }
+        for case, (site, html) in pages.items():
+            self.assertIsNotNone(RegionFilter(get_site(site).scraper_class.SPEC.regions).cut(html), case)
+            for parser in available_parsers():
+                with self.subTest(case=case, parser=parser):
+                    full = build_scraper(site, parser, partial=False).extract_page(html)
+                    self.assertTrue(full[0])
+                    self.assertEqual(build_scraper(site, parser, partial=True).extract_page(html), full)
+
+    def test_region_selectors_must_be_simple(self):
+        for selector in ['.item .price', 'a:first-child']:
+            with self.subTest(selector=selector), self.assertRaises(ValueError):
+                RegionFilter([selector])
+
+    def test_cut_fixtures_extract_like_full_pages(self):
+        for fixture in load_fixtures():
+            regions = RegionFilter(get_site(fixture['site']).scraper_class.SPEC.regions)
+            cut = regions.cut(fixture['html'])
+            self.assertIsNotNone(cut, fixture['file'])
+            self.assertLess(len(cut), len(fixture['html']))
+            for parser in available_parsers():
+                with self.subTest(file=fixture['file'], parser=parser):
+                    full = build_scraper(fixture['site'], parser, partial=False).extract_page(fixture['html'])
+                    partial = build_scraper(fixture['site'], parser, partial=True).extract_page(fixture['html'])
+                    self.assertEqual(partial, full)
+                    items, next_url = partial
+                    self.assertEqual(len(items), fixture['items'])
+                    self.assertEqual(next_url, fixture['next_page'])
+
+
+class PageCacheTests(SimpleTestCase):
+
+    def make_cache(self, **kwargs):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        options = {'ttl_seconds': 60, 'max_bytes': 10 ** 9, 'compression': 'gzip', **kwargs}
+        return PageCache(directory.name, **options)
+
+    def page(self, index):
+        # Random bytes do not compress, so every page takes about the same room on disk.
+        return f'<html>{index}:{os.urandom(2048).hex()}</html>'
+
+    def test_pages_expire_after_the_ttl_except_in_replay(self):
+        cache = self.make_cache()
+        replay = PageCache(cache.directory, ttl_seconds=60, max_bytes=10 ** 9, compression='gzip', replay=True)
+        with mock.patch('product_hunt.scrapers.page_cache.time.time', return_value=1000.0) as clock:
+            digest = cache.put('https://WWW.ebay.com/sch?b=2&a=1#top', '<html>a</html>')
+            cache.put_parsed(digest, 'EbayScraper', [{'name': 'a'}], None)
+            clock.return_value = 1060.0
+            self.assertEqual(cache.get('https://www.ebay.com/sch?a=1&b=2').html, '<html>a</html>')
+            self.assertEqual(cache.get_parsed(digest, 'EbayScraper'), {'items': [{'name': 'a'}], 'next_url': None})
+            clock.return_value = 1061.0
+            self.assertIsNone(cache.get('https://www.ebay.com/sch?a=1&b=2'))
+            # Replay serves the expired page but always parses it again.
+            self.assertEqual(replay.get('https://www.ebay.com/sch?a=1&b=2').html, '<html>a</html>')
+            self.assertIsNone(replay.get_parsed(digest, 'EbayScraper'))
+            self.assertIsNone(replay.get('https://www.ebay.com/sch?a=3'))
+
+    def test_running_size_matches_the_disk_without_walking_it_per_store(self):
+        cache = self.make_cache()
+        with mock.patch.object(cache, 'disk_usage', wraps=cache.disk_usage) as disk_usage:
+            for index in range(5):
+                cache.put(f'https://www.ebay.com/sch?p={index}', self.page(index))
+            # Overwritten entries and shared pages must not be counted twice.
+            cache.put('https://www.ebay.com/sch?p=0', self.page(0))
+            cache.put('https://www.ebay.com/sch?p=9', cache.get('https://www.ebay.com/sch?p=1').html)
+        self.assertEqual(disk_usage.call_count, 1)
+        self.assertEqual(cache.size, cache.disk_usage())
+
+    def test_least_recently_used_pages_are_evicted(self):
+        cache = self.make_cache()
+        urls = [f'https://www.ebay.com/sch?p={index}' for index in range(4)]
+        for index, url in enumerate(urls):
+            cache.put(url, self.page(index))
+        # p=shared holds the same page as p=0, so the page must outlive p=0's entry.
+        cache.put('https://www.ebay.com/sch?p=shared', cache.get(urls[0]).html)
+        for mtime, url in enumerate(urls + ['https://www.ebay.com/sch?p=shared']):
+            os.utime(cache.url_path(url), (mtime, mtime))
+        self.assertIsNotNone(cache.get(urls[1]))  # a hit makes p=1 the most recently used
+
+        cache.max_bytes = cache.disk_usage() - 1
+        with mock.patch.object(cache, 'disk_usage', wraps=cache.disk_usage) as disk_usage:
+            cache.put('https://www.ebay.com/sch?p=4', self.page(4))
+        self.assertEqual(disk_usage.call_count, 1)  # eviction re-measures the directory once
+        # Eviction goes by last use down to 90% of the cap: p=0 (whose page p=shared still
+        # holds), p=2 and p=3 make room for p=4.
+        for url in [urls[0], urls[2], urls[3]]:
+            with self.subTest(url=url):
+                self.assertIsNone(cache.get(url))
+        for url in ['https://www.ebay.com/sch?p=shared', urls[1], 'https://www.ebay.com/sch?p=4']:
+            with self.subTest(url=url):
+                self.assertIsNotNone(cache.get(url))
+        self.assertEqual(cache.size, cache.disk_usage())
+        self.assertLessEqual(cache.size, cache.max_bytes * 0.9)
+
+
+class ParsePoolOptInTests(SimpleTestCase):
+
+    def test_commands_start_the_pool_only_when_asked(self):
+        target = 'product_hunt.management.commands.refresh_scheduler'
+        for args, calls in [([], []), (['--parse-workers', '4'], [mock.call(4)])]:
+            with self.subTest(args=args), mock.patch(f'{target}.enable_parse_pool') as enable, \
+                    mock.patch(f'{target}.RefreshScheduler') as scheduler:
+                call_command('refresh_scheduler', '--once', *args, stdout=io.StringIO())
+                self.assertEqual(enable.call_args_list, calls)
+                scheduler.return_value.run.assert_called_once()
+
+    def test_pool_is_off_by_default(self):
+        self.assertIsNone(parse_pool.get_parse_pool())
+
+
+class TokenBucketTests(SimpleTestCase):
+
+    def test_reservations_beyond_the_burst_go_into_debt(self):
+        with mock.patch('product_hunt.scrapers.rate_limiter.time.monotonic', return_value=100.0) as clock:
+            bucket = TokenBucket(rate=2, burst=2)
+            self.assertEqual([bucket.reserve() for _ in range(4)], [0.0, 0.0, 0.5, 1.0])
+            # Refilled tokens first pay off the debt of the earlier reservations.
+            clock.return_value = 101.0
+            self.assertEqual(bucket.reserve(), 0.5)
+            clock.return_value = 110.0
+            self.assertEqual(bucket.reserve(), 0.0)
+            self.assertEqual(bucket.tokens, 1.0)  # capped at the burst before the reservation
+
+    def test_hosts_have_their_own_limits(self):
+        limiter = RateLimiter({'www.amazon.com': {'RATE': 0.5, 'BURST': 1}}, default={'RATE': 1, 'BURST': 3})
+        self.assertEqual(limiter.limit_for('amazon.com'), {'RATE': 0.5, 'BURST': 1})
+        self.assertEqual(limiter.limit_for('www.ebay.com'), {'RATE': 1, 'BURST': 3})
+        self.assertIs(limiter.bucket_for('www.ebay.com'), limiter.bucket_for('www.ebay.com'))
+
+
+def http_response(status_code, headers=None):
+    return mock.Mock(status_code=status_code, headers=headers or {})
+
+
+class HttpClientRetryTests(SimpleTestCase):
+
+    def setUp(self):
+        self.limiter = mock.Mock()
+        self.client = HttpClient(rate_limiter=self.limiter, max_retries=2)
+        self.client.retry.max_retry_after = 30
+        sleep = mock.patch('product_hunt.scrapers.http_client.time.sleep')
+        self.sleep = sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def test_every_retry_takes_a_token(self):
+        with mock.patch.object(self.client.session, 'get', side_effect=[
+            http_response(503), http_response(429), http_response(200),
+        ]) as get:
+            self.assertEqual(self.client.get('https://www.ebay.com/sch').status_code, 200)
+        self.assertEqual(get.call_count, 3)
+        self.assertEqual(self.limiter.acquire.call_count, 3)
+
+    def test_retry_after_is_honoured_up_to_the_cap(self):
+        with mock.patch.object(self.client.session, 'get', side_effect=[
+            http_response(429, {'Retry-After': '7'}), http_response(429, {'Retry-After': '3600'}), http_response(200),
+        ]):
+            self.client.get('https://www.ebay.com/sch')
+        self.assertEqual([call.args[0] for call in self.sleep.call_args_list], [7.0, 30])
+
+    def test_last_error_response_is_returned(self):
+        with mock.patch.object(self.client.session, 'get', return_value=http_response(503)) as get:
+            self.assertEqual(self.client.get('https://www.ebay.com/sch').status_code, 503)
+        self.assertEqual(get.call_count, 3)
+
+    def test_connection_errors_are_retried_then_raised(self):
+        with mock.patch.object(self.client.session, 'get', side_effect=requests.ConnectionError('refused')) as get:
+            with self.assertRaises(requests.ConnectionError):
+                self.client.get('https://www.ebay.com/sch')
+        self.assertEqual(get.call_count, 3)
+        self.assertEqual(self.limiter.acquire.call_count, 3)
+
+
+class FakeAsyncResponse:
+
+    def __init__(self, status, headers=None, text=''):
+        self.status = status
+        self.headers = headers or {}
+        self.body = text
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(mock.Mock(), (), status=self.status)
+
+    async def text(self):
+        return self.body
+
+
+class AsyncEngineTests(SimpleTestCase):
+
+    def setUp(self):
+        self.engine = AsyncScrapeEngine(max_pages=3)
+        self.engine.rate_limiter = mock.Mock(**{'reserve.return_value': 0})
+        self.engine.retry.max_retries = 2
+        self.engine.retry.max_retry_after = 30
+        self.scraper = mock.Mock(**{'request_headers.return_value': {}})
+        for target in ('cached_html', 'replaying', 'store_html'):
+            patcher = mock.patch(f'product_hunt.scrapers.page_cache.{target}', return_value=None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        sleep = mock.patch('product_hunt.scrapers.async_engine.asyncio.sleep', new=mock.AsyncMock())
+        self.sleep = sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def fetch(self, *responses):
+        session = mock.Mock(**{'get.side_effect': list(responses)})
+        html = asyncio.run(self.engine.fetch_html(session, self.scraper, 'https://www.ebay.com/sch'))
+        return html, session
+
+    def test_retries_share_the_http_client_policy(self):
+        html, session = self.fetch(
+            FakeAsyncResponse(429, {'Retry-After': '7'}), FakeAsyncResponse(503, {'Retry-After': '3600'}),
+            FakeAsyncResponse(200, text='<html></html>'),
+        )
+        self.assertEqual(html, '<html></html>')
+        self.assertEqual(session.get.call_count, 3)
+        self.assertEqual(self.engine.rate_limiter.reserve.call_count, 3)
+        self.assertEqual([call.args[0] for call in self.sleep.await_args_list], [7.0, 30])
+
+    def test_connection_errors_are_retried_then_given_up(self):
+        html, session = self.fetch(*[aiohttp.ClientConnectionError('refused')] * 3)
+        self.assertIsNone(html)
+        self.assertEqual(session.get.call_count, 3)
+
+    def test_other_errors_are_not_retried(self):
+        html, session = self.fetch(FakeAsyncResponse(404), FakeAsyncResponse(200, text='late'))
+        self.assertIsNone(html)
+        self.assertEqual(session.get.call_count, 1)
+
+    def crawl(self, pages):
+        async def scrape_page(session, scraper, url):
+            return pages[url]
+
+        with mock.patch.object(self.engine, 'scrape_page', side_effect=scrape_page) as scrape:
+            results = asyncio.run(self.engine.crawl_site(None, get_site('Ebay'), 'lamp'))
+        return results, [call.args[2] for call in scrape.call_args_list]
+
+    def test_pages_are_prefetched_only_after_page_one_links_to_a_next_page(self):
+        first = 'https://www.ebay.com/sch/i.html?_nkw=lamp'
+        results, fetched = self.crawl({first: PageResult(url=first, items=[{'name': 'lamp'}])})
+        self.assertEqual(fetched, [first])
+        self.assertEqual(len(results), 1)
+
+        pages = {first: PageResult(url=first, items=[{'name': 'lamp'}], next_url=first + '&_pgn=2')}
+        for number in (2, 3):
+            url = f'{first}&_pgn={number}'
+            pages[url] = PageResult(url=url, items=[{'name': f'lamp {number}'}] if number == 2 else [])
+        results, fetched = self.crawl(pages)
+        self.assertEqual(fetched, list(pages))
+        self.assertEqual([page.url for page in results], list(pages)[:2])
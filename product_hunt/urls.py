@@ -22,4 +22,8 @@ urlpatterns = [
     path('product_hunt/api/search/', search_products, name='api_search_products'),
     path('product_hunt/api/get_keyword_data/', views.get_keyword_data, name='get_keyword_data'),
     path('product_hunt/api/scrape_and_store/', views.scrape_and_store, name='scrape_and_store'),
+    path('product_hunt/api/scrape_jobs/', views.create_scrape_job, name='create_scrape_job'),
+    path('product_hunt/api/scrape_jobs/<int:job_id>/', views.scrape_job_status, name='scrape_job_status'),
+    path('product_hunt/api/export/', views.export_products, name='export_products'),
+    path('product_hunt/api/rankings/', views.rank_products, name='rank_products'),
 ]
\ No newline at end of file
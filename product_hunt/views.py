@@ -1,19 +1,18 @@
 from django.shortcuts import render
 from rest_framework import status
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.utils import timezone
-from django.http import HttpResponseRedirect
 from django.urls import reverse
-from rest_framework import viewsets
-from .models import Product, Website
-from .serializers import ProductSerializer, WebsiteSerializer
+from .models import Product, ScrapeJob
+from .serializers import ProductSerializer, RankedProductSerializer, ScrapeJobSerializer
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from .scrapers import AmazonScraper, EbayScraper, NeweggScraper,utils  # Add other scrapers here
-from textblob import TextBlob
+from .crawler import crawl_keyword
+from .singleflight import crawl_once
+from .pagination import PaginationError, ProductPage
+from . import export, freshness, jobs, popularity, ranking, response_cache, search_index
 import logging
-import requests
-import threading
+from urllib.parse import urlencode
 
 logger = logging.getLogger(__name__)
 
@@ -27,16 +26,26 @@ def get_keyword_data(request):
     keyword = request.query_params.get('keyword', None)
     if not keyword:
         return Response({"message": "Keyword is not given"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        page = ProductPage(request.query_params, search=(keyword, ('keyword',)))
+    except PaginationError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    popularity.record_access(keyword)
     
     try:
+        cached = response_cache.get(response_cache.ENDPOINT_KEYWORD, keyword, page.cache_params)
+        if cached is not None:
+            return Response(cached, status=status.HTTP_200_OK)
+
         logger.info(f"Searching for products with keyword: {keyword}")
-        products = Product.objects.filter(keyword__icontains=keyword)
+        products = search_index.search(keyword, fields=('keyword',))
         # if not products.exists():
         #     logger.info(f"No products found for keyword: {keyword}")
         #     return Response({"message": "No products found for the given keyword"}, status=status.HTTP_404_NOT_FOUND)
         
-        products_data = ProductSerializer(products, many=True).data
-        logger.info(f"Found {len(products_data)} products for keyword: {keyword}")
+        products_data = page.serialize(products, request.path)
+        logger.info(f"Found {len(products_data['results'])} products for keyword: {keyword}")
+        response_cache.set(response_cache.ENDPOINT_KEYWORD, keyword, products_data, page.cache_params)
         return Response(products_data, status=status.HTTP_200_OK)
     
     except Exception as e:
@@ -48,51 +57,101 @@ def scrape_and_store(request):
     keyword = request.data.get('keyword')
     if not keyword:
         return Response({'error': 'Keyword not provided'}, status=status.HTTP_400_BAD_REQUEST)
-
-    # Check if the keyword already exists in the database
-    existing_products = Product.objects.filter(keyword__icontains=keyword)
-    if existing_products.exists():
-        products_data = ProductSerializer(existing_products, many=True).data
+    try:
+        page = ProductPage(request.query_params, search=(keyword, ('keyword',)))
+    except PaginationError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Stored results are served while fresh, and while stale with a refresh running in the
+    # background; missing, expired and empty keywords wait for a crawl.
+    state = freshness.keyword_state(keyword)
+    existing_products = search_index.search(keyword, fields=('keyword',))
+    if state in (freshness.FRESH, freshness.STALE) and existing_products.exists():
+        if state == freshness.STALE:
+            freshness.refresh_in_background(keyword)
+        products_data = page.serialize(existing_products, request.path)
         return Response(products_data, status=status.HTTP_200_OK)
 
-    urls = [
-        f'https://www.amazon.com/s?k={keyword}',
-        f'https://www.ebay.com/sch/i.html?_nkw={keyword}',
-        f'https://www.newegg.com/p/pl?d={keyword}'
-    ]
-
-    scrapers = [AmazonScraper.AmazonScraper, EbayScraper.EbayScraper, NeweggScraper.NeweggScraper]
-
-    def run_scraper(Scraper, url):
-        try:
-            scraper = Scraper(url)
-            scraper.scrape(keyword)  # Pass the keyword to the scrape method
-        except requests.exceptions.RequestException as e:
-            logging.error(f'Network error occurred while scraping {url}: {str(e)}')
-        except Exception as e:
-            logging.error(f'An unexpected error occurred while scraping {url}: {str(e)}')
-
-    threads = []
-    for url, Scraper in zip(urls, scrapers):
-        thread = threading.Thread(target=run_scraper, args=(Scraper, url))
-        threads.append(thread)
-        thread.start()
-
-    for thread in threads:
-        thread.join()
-
-    # Fetch the newly scraped data
-    try:
-        new_products = Product.objects.filter(keyword__icontains=keyword)
-        if not new_products.exists():
-            return Response({'error': 'Failed to scrape data'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    # Concurrent requests for the same keyword share a single crawl.
+    crawl_once(
+        keyword,
+        lambda: crawl_keyword(keyword),
+        recheck=lambda: freshness.needs_crawl(keyword),
+    )
 
-        products_data = ProductSerializer(new_products, many=True).data
+    # Fetch the newly scraped data; a crawl that found nothing returns an empty page.
+    try:
+        new_products = search_index.search(keyword, fields=('keyword',))
+        products_data = page.serialize(new_products, request.path)
         return Response(products_data, status=status.HTTP_200_OK)
     
     except Exception as e:
         return Response({'error': f'An unexpected error occurred: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['POST'])
+def create_scrape_job(request):
+    """
+    Queues a background scrape of the given keyword and returns 202 with the job id.
+    """
+    keyword = request.data.get('keyword')
+    if not keyword:
+        return Response({'error': 'Keyword not provided'}, status=status.HTTP_400_BAD_REQUEST)
+
+    job = jobs.enqueue_scrape(keyword)
+    return Response({
+        'job_id': job.pk,
+        'status': job.status,
+        'status_url': reverse('scrape_job_status', args=[job.pk]),
+    }, status=status.HTTP_202_ACCEPTED)
+
+@api_view(['GET'])
+def scrape_job_status(request, job_id):
+    """
+    Returns the status and per-site progress of a scrape job, plus where to read its products.
+    A job whose process stopped before finishing it is reported as failed once it times out.
+    """
+    jobs.fail_stale_jobs(ScrapeJob.objects.filter(pk=job_id))
+    try:
+        job = ScrapeJob.objects.get(pk=job_id)
+    except ScrapeJob.DoesNotExist:
+        return Response({'error': 'Scrape job not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    data = ScrapeJobSerializer(job).data
+    if job.status == ScrapeJob.STATUS_SUCCEEDED:
+        data['results_url'] = f"{reverse('get_keyword_data')}?{urlencode({'keyword': job.keyword})}"
+    return Response(data, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+def export_products(request):
+    """
+    Streams every product matching keyword/website/since/until as NDJSON, CSV or Parquet.
+    The format is chosen with ``file_format``; DRF reserves ``format`` for content negotiation.
+    """
+    params = request.query_params
+    export_format = params.get('file_format', 'ndjson').lower()
+    if export_format not in ('ndjson', 'csv', 'parquet'):
+        return Response({'error': 'file_format must be ndjson, csv or parquet'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        chunk_size = export.parse_chunk_size(params.get('chunk_size'))
+        rows = export.export_rows(
+            keyword=params.get('keyword'),
+            website=params.get('website'),
+            since=params.get('since'),
+            until=params.get('until'),
+            chunk_size=chunk_size,
+        )
+        if export_format == 'parquet':
+            response = FileResponse(export.write_parquet(rows, chunk_size), content_type='application/vnd.apache.parquet')
+        elif export_format == 'csv':
+            response = StreamingHttpResponse(export.iter_csv(rows, chunk_size), content_type='text/csv')
+        else:
+            response = StreamingHttpResponse(export.iter_ndjson(rows, chunk_size), content_type='application/x-ndjson')
+    except (export.ExportError, ValueError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    response['Content-Disposition'] = f'attachment; filename="products.{export_format}"'
+    return response
+
 def current_time(request):
     now = timezone.now()
     html = f"<html><body>Current time: {now}</body></html>"
@@ -112,38 +171,74 @@ def search_products(request):
     
     if not query:
         return Response({'error': 'Query parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        page = ProductPage(request.query_params, search=(query, ('name',)))
+        weights = ranking.RankingWeights.from_params(request.query_params)
+    except (PaginationError, ranking.RankingError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    popularity.record_access(query)
+    cache_params = {**page.cache_params, 'weights': weights.as_dict()}
 
     try:
-        products = Product.objects.filter(name__icontains=query)
+        cached = response_cache.get(response_cache.ENDPOINT_SEARCH, query, cache_params)
+        if cached is not None:
+            return Response(cached, status=status.HTTP_200_OK)
+
+        products = search_index.search(query, fields=('name',))
         if not products.exists():
             return Response({'message': 'No products found'}, status=status.HTTP_404_NOT_FOUND)
 
-        product_serializer = ProductSerializer(products, many=True)
-        
-        for product in products:
-            product.sentiment_score = utils.sentiment_score(product.reviews)
-            product.save()
+        products_page = page.serialize(products, request.path)
+        best_product = ranking.best_product(page.filter(products), weights)
 
-        best_product = find_best_product(products)
-
-        return Response({
-            'products': product_serializer.data,
+        payload = {
+            'products': products_page['results'],
+            'next_cursor': products_page['next_cursor'],
+            'next': products_page['next'],
             'best_product': ProductSerializer(best_product).data if best_product else None
-        }, status=status.HTTP_200_OK)
+        }
+        response_cache.set(response_cache.ENDPOINT_SEARCH, query, payload, cache_params)
+        return Response(payload, status=status.HTTP_200_OK)
 
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-def find_best_product(products):
+@api_view(['GET'])
+def rank_products(request):
     """
-    Finds the best product based on price and sentiment score.
+    Returns the top ``k`` products per group for a keyword or name query, ranked in the
+    database by weighted price percentile, sentiment, reviews and site weights.
     """
-    best_product = None
-    highest_score = float('-inf')
-    
-    for product in products:
-        score = product.sentiment_score - product.price  # Example scoring formula
-        if score > highest_score:
-            highest_score = score
-            best_product = product
-    return best_product
+    params = request.query_params
+    keyword = params.get('keyword')
+    query = params.get('query')
+    if not keyword and not query:
+        return Response({'error': 'keyword or query parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        page = ProductPage(params)
+        weights = ranking.RankingWeights.from_params(params)
+        group_by = ranking.parse_group_by(params.get('group_by'))
+        top_k = int(params.get('k') or ranking.DEFAULT_RANKING_TOP_K)
+        if top_k < 1:
+            raise ValueError('k must be positive')
+        top_k = min(top_k, ranking.MAX_RANKING_TOP_K)
+    except (PaginationError, ranking.RankingError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except ValueError:
+        return Response({'error': 'k must be a positive integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        if keyword:
+            candidates = search_index.search(keyword, fields=('keyword',))
+        else:
+            candidates = search_index.search(query, fields=('name',))
+        ranked = ranking.rank_products(page.filter(candidates), weights, top_k=top_k, group_by=group_by)
+        return Response({
+            'weights': weights.as_dict(),
+            'group_by': group_by,
+            'k': top_k,
+            'results': RankedProductSerializer(ranked, many=True).data,
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        logger.error(f"An error occurred while ranking products: {str(e)}")
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -13,7 +13,7 @@ document.addEventListener('DOMContentLoaded', () => {
         }
 
         loadingDiv.style.display = 'block';
-        fetch(`/api/search/?query=${encodeURIComponent(query)}`)
+        fetch(`/product_hunt/api/search/?query=${encodeURIComponent(query)}`)
             .then(response => response.json())
             .then(data => {
                 loadingDiv.style.display = 'none';
@@ -30,6 +30,7 @@ document.addEventListener('DOMContentLoaded', () => {
                     return;
                 }
 
+                // One page of results; data.next holds the URL of the next page, if any.
                 data.products.forEach(product => {
                     const row = resultsTable.insertRow();
                     row.insertCell(0).innerText = product.name;